@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from dataclasses import asdict
+
+from benchmarks import bench_orchestrator, bench_pages, bench_solver
+from benchmarks.harness import BenchmarkResult, BenchmarkSuite, measure
+
+SUITES: dict[str, BenchmarkSuite] = {
+    "pages": bench_pages.benchmarks,
+    "solver": bench_solver.benchmarks,
+    "orchestrator": bench_orchestrator.benchmarks,
+}
+RESULTS_DIRECTORY = "benchmarks/results"
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_medians(path: str) -> dict[str, float]:
+    with open(path) as f:
+        return {
+            result["name"]: result["median_seconds"]
+            for result in json.load(f)["results"]
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmarks.")
+    parser.add_argument("suites", nargs="*", help=", ".join(SUITES.keys()))
+    parser.add_argument("--quick", action="store_true", help="smaller inputs")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--compare", help="JSON file of a previous run")
+    args = parser.parse_args()
+    unknown_suites = set(args.suites) - SUITES.keys()
+    if unknown_suites:
+        parser.error(f"unknown suites {', '.join(unknown_suites)}")
+
+    baseline = load_medians(args.compare) if args.compare else {}
+    results: list[BenchmarkResult] = []
+    for suite_name in args.suites or SUITES.keys():
+        for name, function, repeat in SUITES[suite_name](args.quick):
+            result = measure(name, function, repeat)
+            results.append(result)
+            line = f"{name:<50} {result.median_seconds * 1000:>10.2f} ms"
+            if name in baseline:
+                line += f" {result.median_seconds / baseline[name]:>6.2f}x"
+            print(line, flush=True)
+
+    commit = git_commit()
+    output = args.output or os.path.join(
+        RESULTS_DIRECTORY, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "commit": commit,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "quick": args.quick,
+                "results": [asdict(result) for result in results],
+            },
+            f,
+            indent=2,
+        )
+    print(f'Results written to "{output}".')
+
+
+main()
@@ -0,0 +1,67 @@
+import re
+from typing import Iterator
+
+from benchmarks.bench_pages import (
+    CARD_PATH,
+    SELLER_OFFERS_PATH,
+    WANTS_LIST_PATH,
+    file_text_contents,
+)
+from benchmarks.harness import BenchmarkCase
+from cm_wizard.services.cardmarket.async_cardmarket_service import (
+    AsyncCardmarketService,
+)
+from cm_wizard.services.cardmarket.cardmarket_service import CardmarketService
+from cm_wizard.services.cardmarket.enums.cardmarket_game import CardmarketGame
+from cm_wizard.services.cardmarket.enums.cardmarket_language import CardmarketLanguage
+from cm_wizard.services.locale import Locale
+from cm_wizard.services.shopping_wizard_service import shopping_wizard_service
+from cm_wizard.services.wizard_orchestrator_service import WizardOrchestratorService
+
+WANTS_LIST_ID = "15628908"
+
+
+class FixtureCardmarketService(CardmarketService):
+    """
+    Answers requests with the saved responses instead of sending them.
+    """
+
+    def __init__(self):
+        self._language = CardmarketLanguage.ENGLISH
+        self._locale = Locale(self._language)
+        self._game = CardmarketGame.YU_GI_OH
+        self._fixtures = [
+            (r"Wants/\d+", file_text_contents(WANTS_LIST_PATH)),
+            (r"Cards/.+", file_text_contents(CARD_PATH)),
+            (r"Users/.+/Offers/Singles", file_text_contents(SELLER_OFFERS_PATH)),
+        ]
+
+    def request_page_text(self, endpoint: str, params: dict | None = None) -> str:
+        for pattern, page_text in self._fixtures:
+            if re.fullmatch(pattern, endpoint):
+                return page_text
+        raise NotImplementedError(f"No fixture for endpoint {endpoint}.")
+
+
+def benchmarks(quick: bool) -> Iterator[BenchmarkCase]:
+    cardmarket_service = FixtureCardmarketService()
+    wizard_orchestrator_service = WizardOrchestratorService(
+        cardmarket_service,
+        shopping_wizard_service,
+        AsyncCardmarketService(cardmarket_service),
+    )
+    yield (
+        "orchestrator/run",
+        lambda: wizard_orchestrator_service.run(
+            WANTS_LIST_ID, on_progress=lambda progress, stage: None, incremental=False
+        ),
+        3 if quick else 10,
+    )
+    # re-runs an unchanged wants list, after the first repetition
+    yield (
+        "orchestrator/incremental_run",
+        lambda: wizard_orchestrator_service.run(
+            WANTS_LIST_ID, on_progress=lambda progress, stage: None
+        ),
+        3 if quick else 10,
+    )
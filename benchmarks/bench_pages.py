@@ -0,0 +1,96 @@
+from functools import cached_property
+from typing import Iterator
+
+from benchmarks.harness import BenchmarkCase
+from cm_wizard.services.cardmarket.enums.cardmarket_language import CardmarketLanguage
+from cm_wizard.services.cardmarket.offer_stream import (
+    parse_card_offers,
+    parse_seller_offers,
+)
+from cm_wizard.services.cardmarket.pages.card_page import CardPage
+from cm_wizard.services.cardmarket.pages.html_element import HtmlElement
+from cm_wizard.services.cardmarket.pages.html_parser import HtmlParser
+from cm_wizard.services.cardmarket.pages.seller_offers_page import SellerOffersPage
+from cm_wizard.services.cardmarket.pages.wants_list_page import WantsListPage
+from cm_wizard.services.locale import Locale
+
+WANTS_LIST_PATH = "responses/en_Yugioh_Wants_15628908.html"
+CARD_PATH = "responses/en_Yugioh_Cards_A-Feather-of-the-Phoenix.html"
+SELLER_OFFERS_PATH = (
+    "responses/en_Yugioh_Users_wkleebe1_Offers_Singles_idWantslist_15628908.html"
+)
+
+locale = Locale(CardmarketLanguage.ENGLISH)
+
+
+def file_text_contents(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def touch_fields(value: object):
+    """
+    Evaluates all public properties of page elements, which are parsed lazily.
+    """
+    if isinstance(value, list):
+        for item in value:
+            touch_fields(item)
+    if not isinstance(value, HtmlElement):
+        return
+    for name, attribute in vars(type(value)).items():
+        if isinstance(attribute, cached_property) and not name.startswith("_"):
+            touch_fields(getattr(value, name))
+
+
+def html_parser_benchmarks(
+    parsers: list[HtmlParser],
+    repeat: int,
+    wants_list_text: str,
+    card_text: str,
+    seller_offers_text: str,
+) -> Iterator[BenchmarkCase]:
+    name = parsers[0].value
+    yield (
+        f"pages/WantsListPage.items[{name}]",
+        lambda: touch_fields(WantsListPage(wants_list_text, locale, parsers).items),
+        repeat,
+    )
+    yield (
+        f"pages/CardPage.offers[{name}]",
+        lambda: touch_fields(CardPage(card_text, locale, parsers).offers),
+        repeat,
+    )
+    yield (
+        f"pages/SellerOffersPage.offers[{name}]",
+        lambda: touch_fields(
+            SellerOffersPage(seller_offers_text, locale, parsers).offers
+        ),
+        repeat,
+    )
+
+
+def benchmarks(quick: bool) -> Iterator[BenchmarkCase]:
+    repeat = 3 if quick else 10
+    wants_list_text = file_text_contents(WANTS_LIST_PATH)
+    card_text = file_text_contents(CARD_PATH)
+    seller_offers_text = file_text_contents(SELLER_OFFERS_PATH)
+
+    for html_parser in HtmlParser:
+        try:
+            WantsListPage("<html><body></body></html>", locale, [html_parser])
+        except RuntimeError:
+            continue  # the optional parser is not installed
+        yield from html_parser_benchmarks(
+            [html_parser], repeat, wants_list_text, card_text, seller_offers_text
+        )
+
+    yield (
+        "pages/parse_card_offers[stream]",
+        lambda: parse_card_offers(card_text, locale),
+        repeat,
+    )
+    yield (
+        "pages/parse_seller_offers[stream]",
+        lambda: parse_seller_offers(seller_offers_text, locale),
+        repeat,
+    )
@@ -0,0 +1,91 @@
+import random
+from functools import partial
+from typing import Iterator
+
+from benchmarks.harness import BenchmarkCase
+from cm_wizard.services.offer_matrix import OfferMatrix, OfferMatrixBuilder
+from cm_wizard.services.shopping_wizard_service import (
+    WizardSolver,
+    shopping_wizard_service,
+)
+
+SHIPPING_COST = 200
+SIZES = [10, 100, 1000]
+BRANCH_AND_BOUND_TIME_BUDGET_SECONDS = 2
+PLAYSET_SIZE = 4
+MULTI_START_TIME_BUDGET_SECONDS = 2
+
+
+def synthetic_offers(
+    card_count: int, seller_count: int, seed: int = 0
+) -> tuple[list[str], OfferMatrix]:
+    """
+    Every seller offers one or two copies of up to 20 random cards.
+    Every card is offered by at least one seller.
+    """
+    rng = random.Random(seed)
+    card_ids = [f"card {index}" for index in range(card_count)]
+    builder = OfferMatrixBuilder()
+    for card_index, card_id in enumerate(card_ids):
+        builder.add_offer(
+            card_id, f"seller {card_index % seller_count}", rng.randint(10, 500)
+        )
+    for seller_index in range(seller_count):
+        seller_id = f"seller {seller_index}"
+        offered_count = rng.randint(1, min(card_count, 20))
+        for card_id in rng.sample(card_ids, offered_count):
+            for _ in range(rng.randint(1, 2)):
+                builder.add_offer(card_id, seller_id, rng.randint(10, 500))
+    return card_ids, builder.build()
+
+
+def benchmarks(quick: bool) -> Iterator[BenchmarkCase]:
+    sizes = SIZES[:2] if quick else SIZES
+    for card_count in sizes:
+        for seller_count in sizes:
+            wanted_cards, offers = synthetic_offers(card_count, seller_count)
+            size = f"{card_count}x{seller_count}"
+            yield (
+                f"solver/dynamic_programming[{size}]",
+                partial(
+                    shopping_wizard_service.find_best_offers,
+                    wanted_cards,
+                    offers,
+                    SHIPPING_COST,
+                ),
+                3,
+            )
+            yield (
+                f"solver/dynamic_programming_playsets[{size}]",
+                partial(
+                    shopping_wizard_service.find_best_offers,
+                    wanted_cards * PLAYSET_SIZE,
+                    offers,
+                    SHIPPING_COST,
+                ),
+                3,
+            )
+            yield (
+                f"solver/branch_and_bound[{size}]",
+                partial(
+                    shopping_wizard_service.find_best_offers,
+                    wanted_cards,
+                    offers,
+                    SHIPPING_COST,
+                    solver=WizardSolver.BRANCH_AND_BOUND,
+                    time_budget_seconds=BRANCH_AND_BOUND_TIME_BUDGET_SECONDS,
+                ),
+                1,
+            )
+            yield (
+                f"solver/multi_start[{size}]",
+                partial(
+                    shopping_wizard_service.find_best_offers,
+                    wanted_cards,
+                    offers,
+                    SHIPPING_COST,
+                    solver=WizardSolver.MULTI_START,
+                    time_budget_seconds=MULTI_START_TIME_BUDGET_SECONDS,
+                ),
+                1,
+            )
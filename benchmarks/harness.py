@@ -0,0 +1,37 @@
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+BenchmarkCase = tuple[str, Callable[[], object], int]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    repeat: int
+    min_seconds: float
+    median_seconds: float
+    mean_seconds: float
+
+
+def measure(name: str, function: Callable[[], object], repeat: int) -> BenchmarkResult:
+    """
+    Calls the function repeat times (after one warm-up call) and times each call.
+    """
+    function()
+    durations: list[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return BenchmarkResult(
+        name=name,
+        repeat=repeat,
+        min_seconds=min(durations),
+        median_seconds=statistics.median(durations),
+        mean_seconds=statistics.fmean(durations),
+    )
+
+
+BenchmarkSuite = Callable[[bool], Iterator[BenchmarkCase]]
@@ -7,6 +7,17 @@ from cm_wizard.screens.login.login_screen import LoginScreen
 from cm_wizard.screens.wants_list.wants_list_screen import WantsListScreen
 from cm_wizard.screens.wants_lists.wants_lists_screen import WantsListsScreen
 from cm_wizard.screens.wizard.wizard_screen import WizardScreen
+from cm_wizard.services.cardmarket.async_cardmarket_service import (
+    async_cardmarket_service,
+)
+from cm_wizard.services.cardmarket.card_id_mapping_store import CardIdMappingStore
+from cm_wizard.services.cardmarket.cardmarket_service import cardmarket_service
+from cm_wizard.services.cardmarket.offer_cache import OfferCache
+from cm_wizard.services.cardmarket.page_cache import PageCache
+from cm_wizard.services.cardmarket.page_parser_pool import PageParserPool
+from cm_wizard.services.shipping_costs import ShippingTariffTable
+from cm_wizard.services.wizard_checkpoint import WizardRunStore
+from cm_wizard.services.wizard_orchestrator_service import wizard_orchestrator_service
 
 
 def main(page: ft.Page):
@@ -56,4 +67,11 @@ logging.basicConfig(
     level=logging.WARNING,
     format="%(asctime)s %(levelname)-8s %(message)s",
 )
+cardmarket_service.page_cache = PageCache()
+cardmarket_service.offer_cache = OfferCache()
+# pass max_workers=0 to parse pages serially, e.g. for debugging
+async_cardmarket_service.page_parser_pool = PageParserPool()
+wizard_orchestrator_service.card_id_mapping_store = CardIdMappingStore()
+wizard_orchestrator_service.run_store = WizardRunStore()
+wizard_orchestrator_service.shipping_tariffs = ShippingTariffTable.load()
 ft.app(target=main)
@@ -1,10 +1,17 @@
+import asyncio
 import threading
 
 import flet as ft
 
 from cm_wizard.screens.wizard.controls.wizard_loading_view import WizardLoadingView
 from cm_wizard.screens.wizard.controls.wizard_result_view import WizardResultView
+from cm_wizard.services.cardmarket.async_cardmarket_service import (
+    async_cardmarket_service,
+)
+from cm_wizard.services.cardmarket.cardmarket_service import cardmarket_service
+from cm_wizard.services.metrics import ProgressEstimator
 from cm_wizard.services.wizard_orchestrator_service import (
+    WizardOrchestratorResult,
     WizardOrchestratorStage,
     wizard_orchestrator_service,
 )
@@ -14,26 +21,58 @@ class Wizard(ft.UserControl):
     _wants_list_id: str
     _stage: WizardOrchestratorStage
     _loading_ref: ft.Ref[WizardLoadingView]
+    _interim_result_ref: ft.Ref[ft.Container]
 
     def __init__(self, ref: ft.Ref["Wizard"], id: str):
         super().__init__(ref=ref, expand=True)
         self._wants_list_id = id
         self._stage = WizardOrchestratorStage.GET_WANTS_LIST
         self._loading_ref = ft.Ref[WizardLoadingView]()
+        self._interim_result_ref = ft.Ref[ft.Container]()
         self.stop_event = threading.Event()
+        self._progress_estimator = ProgressEstimator(
+            cardmarket_service.rate_limit_wait_seconds,
+            async_cardmarket_service.max_concurrent_requests,
+        )
 
     def on_progress(self, progress: float, stage: WizardOrchestratorStage):
         if self.stop_event.is_set():
             raise InterruptedError("Wizard was stopped.")
         self._stage = stage
-        self._loading_ref.current.progress(progress, stage)
+        self._loading_ref.current.progress(
+            progress,
+            stage,
+            self._progress_estimator.estimate_remaining_seconds(progress, stage),
+        )
+        self.update()
+
+    def on_result(self, result: WizardOrchestratorResult):
+        """
+        Shows the best combination so far, while the wizard keeps searching.
+        """
+        if self.stop_event.is_set():
+            raise InterruptedError("Wizard was stopped.")
+        self._interim_result_ref.current.content = WizardResultView(
+            self._wants_list_id, result, is_final=False
+        )
+        self._interim_result_ref.current.visible = True
         self.update()
 
     def on_visit(self):
         self.stop_event.clear()
         try:
-            result = wizard_orchestrator_service.run(
-                self._wants_list_id, self.on_progress
+            # continues where a failed or stopped run left off
+            run_id = wizard_orchestrator_service.find_unfinished_run_id(
+                self._wants_list_id
+            )
+            result = asyncio.run(
+                wizard_orchestrator_service.run_async(
+                    self._wants_list_id, self.on_progress, on_result=self.on_result
+                )
+                if run_id is None
+                else wizard_orchestrator_service.resume_async(
+                    run_id, self.on_progress, on_result=self.on_result
+                )
             )
             self.controls = [WizardResultView(self._wants_list_id, result)]
             self.update()
@@ -46,7 +85,18 @@ class Wizard(ft.UserControl):
         self.stop_event.set()
 
     def build(self) -> ft.Control:
-        return ft.Container(
-            alignment=ft.Alignment(0, 0),
-            content=WizardLoadingView(ref=self._loading_ref),
+        return ft.Column(
+            horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+            controls=[
+                ft.Container(
+                    alignment=ft.Alignment(0, 0),
+                    expand=True,
+                    content=WizardLoadingView(ref=self._loading_ref),
+                ),
+                ft.Container(
+                    ref=self._interim_result_ref,
+                    expand=True,
+                    visible=False,
+                ),
+            ],
         )
@@ -6,6 +6,7 @@ from cm_wizard.services.wizard_orchestrator_service import WizardOrchestratorSta
 class WizardLoadingView(ft.UserControl):
     _progress_ring_ref: ft.Ref[ft.ProgressRing]
     _text_ref: ft.Ref[ft.Text]
+    _remaining_time_text_ref: ft.Ref[ft.Text]
 
     _stage_to_label = {
         WizardOrchestratorStage.GET_WANTS_LIST: "getting wants list",
@@ -22,10 +23,29 @@ class WizardLoadingView(ft.UserControl):
         super().__init__(ref=ref)
         self._progress_ring_ref = ft.Ref[ft.ProgressRing]()
         self._text_ref = ft.Ref[ft.Text]()
+        self._remaining_time_text_ref = ft.Ref[ft.Text]()
 
-    def progress(self, new_value: float, stage: WizardOrchestratorStage):
+    def _remaining_time_label(self, remaining_seconds: float | None) -> str:
+        if remaining_seconds is None:
+            return ""
+        if remaining_seconds < 60:
+            return "less than a minute left"
+        return f"about {round(remaining_seconds / 60)} min left"
+
+    def progress(
+        self,
+        new_value: float,
+        stage: WizardOrchestratorStage,
+        remaining_seconds: float | None = None,
+    ):
+        """
+        The remaining_seconds are estimated for the current stage.
+        """
         self._progress_ring_ref.current.value = new_value
         self._text_ref.current.value = self._stage_to_label[stage]
+        self._remaining_time_text_ref.current.value = self._remaining_time_label(
+            remaining_seconds
+        )
         self.update()
 
     def build(self) -> ft.Control:
@@ -44,5 +64,9 @@ class WizardLoadingView(ft.UserControl):
                     ref=self._text_ref,
                     value=self._stage_to_label[WizardOrchestratorStage.GET_WANTS_LIST],
                 ),
+                ft.Text(
+                    ref=self._remaining_time_text_ref,
+                    value="",
+                ),
             ],
         )
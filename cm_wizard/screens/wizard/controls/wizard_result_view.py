@@ -9,10 +9,25 @@ class WizardResultView(ft.UserControl):
         self,
         wants_list_id: str,
         result: WizardOrchestratorResult,
+        is_final: bool = True,
     ):
+        """
+        A result that is not final may still be improved by the wizard.
+        """
         super().__init__(expand=True)
         self._wants_list_id = wants_list_id
         self._result = result
+        self._is_final = is_final
+
+    def _subtitle(self) -> ft.Text | None:
+        lines = []
+        if not self._is_final:
+            lines.append("Best combination so far, still searching for a better one")
+        if len(self._result.missing_cards) > 0:
+            lines.append(f"Failed to find {', '.join(self._result.missing_cards)}")
+        if len(lines) == 0:
+            return None
+        return ft.Text("\n".join(lines))
 
     def build(self) -> ft.Control:
         return ft.ListView(
@@ -21,11 +36,7 @@ class WizardResultView(ft.UserControl):
                     title=ft.Text(
                         f"Total: {format_price(self._result.total_price_euro_cents)} euro cents"
                     ),
-                    subtitle=None
-                    if len(self._result.missing_cards) == 0
-                    else ft.Text(
-                        f"Failed to find {', '.join(self._result.missing_cards)}"
-                    ),
+                    subtitle=self._subtitle(),
                 ),
                 *[
                     ft.Card(
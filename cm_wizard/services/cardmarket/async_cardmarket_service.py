@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from functools import partial
+from typing import Callable, Sequence, TypeVar
+
+from cm_wizard.services.cardmarket.card_query import CardQuery
+from cm_wizard.services.cardmarket.cardmarket_service import (
+    MAX_CONCURRENT_REQUESTS,
+    CardmarketService,
+    cardmarket_service,
+)
+from cm_wizard.services.cardmarket.offer_records import (
+    CardOffer,
+    PagedSellerOffers,
+    SellerOffer,
+)
+from cm_wizard.services.cardmarket.offer_stream import (
+    parse_card_offers,
+    parse_paged_seller_offers,
+)
+from cm_wizard.services.cardmarket.page_parser_pool import PageParserPool
+from cm_wizard.services.cardmarket.pages.card_page import CardPage
+from cm_wizard.services.cardmarket.pages.wants_list_page import WantsListPage
+from cm_wizard.services.locale import Locale
+from cm_wizard.services.metrics import metrics
+
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.DEBUG)
+
+P = TypeVar("P")
+
+
+class AsyncCardmarketService:
+    """
+    Sends requests of the authenticated CardmarketService concurrently.
+    Requests are sent with CardmarketService.request_page_text in worker threads,
+    so they share the session's connection pool, the rate limiter and its retries
+    with synchronous requests.
+    Pages are parsed in worker threads, so parsing one page overlaps with requests
+    that are still in flight.
+    Offer records are parsed in the page parser pool instead, if it is set.
+    """
+
+    def __init__(
+        self,
+        cardmarket_service: CardmarketService,
+        max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+    ):
+        self.cardmarket_service = cardmarket_service
+        self.max_concurrent_requests = max_concurrent_requests
+        self._semaphores: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self.page_parser_pool: PageParserPool | None = None
+
+    @property
+    def locale(self) -> Locale:
+        return self.cardmarket_service.locale
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # a semaphore is bound to the event loop it is first used in
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores = {loop: asyncio.Semaphore(self.max_concurrent_requests)}
+        return self._semaphores[loop]
+
+    async def get_wants_list(self, id: str) -> WantsListPage:
+        return await self._request_page(f"Wants/{id}", None, WantsListPage)
+
+    async def get_card(self, query: CardQuery) -> CardPage:
+        params = self.cardmarket_service.card_params(query)
+        return await self._request_page(f"Cards/{query.id}", params, CardPage)
+
+    async def get_card_offers(
+        self, query: CardQuery, max_offers: int | None = None
+    ) -> list[CardOffer]:
+        service = self.cardmarket_service
+        params = service.card_params(query)
+        offers = service.cached_card_offers(query.id, params, max_offers)
+        if offers is None:
+            offers = await self._request_records(
+                f"Cards/{query.id}",
+                params,
+                partial(parse_card_offers, max_offers=max_offers),
+            )
+            service.cache_card_offers(query.id, params, max_offers, offers)
+        return offers
+
+    async def get_seller_offers(
+        self,
+        seller_id: str,
+        wants_list_id: str,
+        wanted_queries: Sequence[CardQuery] | None = None,
+    ) -> list[SellerOffer]:
+        """
+        Returns the seller's offers for cards on the wants list from all pages.
+        After the first page, the remaining pages are requested concurrently,
+        sharing the request limits with all other requests.
+        Like CardmarketService.get_seller_offers, the offers are only cached for
+        the wanted_queries, if given.
+        """
+        service = self.cardmarket_service
+        offers = service.cached_seller_offers(seller_id, wants_list_id, wanted_queries)
+        if offers is None:
+            first_page = await self.get_seller_offers_page(seller_id, wants_list_id)
+            other_pages = await asyncio.gather(
+                *[
+                    self.get_seller_offers_page(seller_id, wants_list_id, page)
+                    for page in range(2, first_page.page_count + 1)
+                ]
+            )
+            offers = [
+                offer
+                for paged_offers in [first_page, *other_pages]
+                for offer in paged_offers.offers
+            ]
+            service.cache_seller_offers(
+                seller_id, wants_list_id, wanted_queries, offers
+            )
+        return offers
+
+    async def get_seller_offers_page(
+        self, seller_id: str, wants_list_id: str, page: int = 1
+    ) -> PagedSellerOffers:
+        return await self._request_records(
+            f"Users/{seller_id}/Offers/Singles",
+            self.cardmarket_service.seller_offers_params(wants_list_id, page),
+            parse_paged_seller_offers,
+        )
+
+    async def _request_page(
+        self,
+        endpoint: str,
+        params: dict | None,
+        page_class: Callable[[str, Locale], P],
+    ) -> P:
+        page_text = await self._request_page_text(endpoint, params)
+        label = self.cardmarket_service.endpoint_label(endpoint)
+        with metrics.timer("parse", endpoint=label):
+            return await asyncio.to_thread(page_class, page_text, self.locale)
+
+    async def _request_records(
+        self,
+        endpoint: str,
+        params: dict | None,
+        parse_records: Callable[[str, Locale], P],
+    ) -> P:
+        if self.page_parser_pool is None:
+            return await self._request_page(endpoint, params, parse_records)
+        page_text = await self._request_page_text(endpoint, params)
+        label = self.cardmarket_service.endpoint_label(endpoint)
+        with metrics.timer("parse", endpoint=label):
+            return await self.page_parser_pool.parse(
+                parse_records, page_text, self.locale
+            )
+
+    async def _request_page_text(
+        self, endpoint: str, params: dict | None = None
+    ) -> str:
+        # waiting for the rate limiter blocks one of max_concurrent_requests threads
+        async with self._semaphore():
+            return await asyncio.to_thread(
+                self.cardmarket_service.request_page_text, endpoint, params
+            )
+
+
+async_cardmarket_service = AsyncCardmarketService(cardmarket_service)
@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+DEFAULT_CARD_ID_MAPPING_PATH = ".cache/card_ids.sqlite3"
+# SQLite limits the number of variables per statement
+_QUERY_BATCH_SIZE = 500
+
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.DEBUG)
+
+
+@dataclass
+class CardIdMapping:
+    offer_id: str
+    card_id: str
+    # how the mapping was found: "slug", "version" or "fuzzy"
+    source: str
+
+
+class CardIdMappingStore:
+    """
+    Persists resolutions of offered product IDs to card IDs in an SQLite database,
+    so they are found without fuzzy matching in later runs.
+    Mappings can be exported and imported as JSON, e.g. to correct mismatches.
+    """
+
+    def __init__(self, path: str = DEFAULT_CARD_ID_MAPPING_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS card_id_mappings (
+                    offer_id TEXT PRIMARY KEY,
+                    card_id TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get_all(self, offer_ids: list[str]) -> dict[str, str]:
+        """
+        Returns the card IDs of all offer IDs that were mapped before.
+        """
+        card_ids: dict[str, str] = {}
+        unique_offer_ids = list(set(offer_ids))
+        with self._lock:
+            for start in range(0, len(unique_offer_ids), _QUERY_BATCH_SIZE):
+                batch = unique_offer_ids[start : start + _QUERY_BATCH_SIZE]
+                rows = self._connection.execute(
+                    f"""
+                    SELECT offer_id, card_id FROM card_id_mappings
+                    WHERE offer_id IN ({", ".join("?" * len(batch))})
+                    """,
+                    batch,
+                ).fetchall()
+                card_ids.update(rows)
+        return card_ids
+
+    def put_all(self, mappings: list[CardIdMapping]):
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO card_id_mappings VALUES (?, ?, ?, ?)",
+                [
+                    (mapping.offer_id, mapping.card_id, mapping.source, now)
+                    for mapping in mappings
+                ],
+            )
+
+    def mappings(self) -> list[CardIdMapping]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT offer_id, card_id, source FROM card_id_mappings ORDER BY offer_id"
+            ).fetchall()
+        return [CardIdMapping(*row) for row in rows]
+
+    def export_json(self, path: str) -> int:
+        mappings = self.mappings()
+        with open(path, "w") as f:
+            json.dump([asdict(mapping) for mapping in mappings], f, indent=2)
+        _logger.info(f'Exported {len(mappings)} card ID mappings to "{path}".')
+        return len(mappings)
+
+    def import_json(self, path: str) -> int:
+        """
+        Imports mappings exported by export_json.
+        Imported mappings replace existing mappings of the same offer IDs.
+        """
+        with open(path) as f:
+            mappings = [CardIdMapping(**mapping) for mapping in json.load(f)]
+        self.put_all(mappings)
+        _logger.info(f'Imported {len(mappings)} card ID mappings from "{path}".')
+        return len(mappings)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
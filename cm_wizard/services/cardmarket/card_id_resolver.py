@@ -0,0 +1,155 @@
+import logging
+import re
+from typing import Callable, Iterable
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from cm_wizard.services.cardmarket.card_id_mapping_store import (
+    CardIdMapping,
+    CardIdMappingStore,
+)
+from cm_wizard.services.metrics import metrics
+
+# fuzzy matches scoring above this are recorded for later runs, weaker ones are
+# only used in the current run
+SAVED_FUZZY_SCORE_THRESHOLD: float = 90
+
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.DEBUG)
+
+
+def slug_key(card_id: str) -> str:
+    """
+    Ignores case and punctuation, e.g. "Dragon-s-Fighting-Spirit" and
+    "Dragons-Fighting-Spirit" share the key "dragonsfightingspirit".
+    """
+    return re.sub(r"[^a-z0-9]", "", card_id.lower())
+
+
+def version_stripped_key(card_id: str) -> str:
+    """
+    Cuts product versions, e.g. "Time-Wizard-V1-Ultra-Rare" becomes "timewizard".
+    """
+    return slug_key(re.sub(r"-V-?\d+(?:-[\w-]*)?$", "", card_id))
+
+
+class CardIdResolver:
+    """
+    Maps the IDs of offered products to the IDs of wanted cards.
+    Built once per wizard run from the wants list.
+
+    IDs are resolved by exact lookup, then by slug and version-stripped keys,
+    then by the mappings of previous runs.
+    Only the remaining IDs are scored fuzzily, all at once.
+    New resolutions are memoized for the run. Key resolutions and fuzzy matches
+    above the SAVED_FUZZY_SCORE_THRESHOLD are recorded in the mapping store.
+    """
+
+    def __init__(
+        self,
+        wants_ids: Iterable[str],
+        mapping_store: CardIdMappingStore | None = None,
+    ):
+        self._wants_ids = sorted(set(wants_ids))
+        self._wants_id_set = set(self._wants_ids)
+        self._key_lookups: list[tuple[str, Callable[[str], str], dict[str, str]]] = [
+            ("slug", slug_key, self._unique_keys(slug_key)),
+            ("version", version_stripped_key, self._unique_keys(version_stripped_key)),
+        ]
+        self.mapping_store = mapping_store
+        self._memo: dict[str, str] = {}
+        self._new_mappings: list[CardIdMapping] = []
+        self.fuzzy_resolution_count = 0
+
+    def _unique_keys(self, key_function: Callable[[str], str]) -> dict[str, str]:
+        """
+        Keys that are shared by several wanted cards are ambiguous and left out.
+        """
+        keys: dict[str, str | None] = {}
+        for wants_id in self._wants_ids:
+            key = key_function(wants_id)
+            keys[key] = None if key in keys else wants_id
+        return {key: wants_id for key, wants_id in keys.items() if wants_id}
+
+    def _resolve_by_keys(self, offer_id: str) -> CardIdMapping | None:
+        for source, key_function, keys in self._key_lookups:
+            card_id = keys.get(key_function(offer_id))
+            if card_id is not None:
+                return CardIdMapping(offer_id, card_id, source)
+        return None
+
+    def _resolve_fuzzily(
+        self, offer_ids: list[str]
+    ) -> list[tuple[CardIdMapping, float]]:
+        """
+        Returns the closest wanted card of each offer ID with its score.
+        """
+        scores = process.cdist(
+            offer_ids, self._wants_ids, scorer=fuzz.WRatio, workers=-1
+        )
+        mappings: list[tuple[CardIdMapping, float]] = []
+        for offer_id, offer_scores in zip(offer_ids, scores):
+            best_index = int(np.argmax(offer_scores))
+            card_id = self._wants_ids[best_index]
+            score = float(offer_scores[best_index])
+            _logger.debug(
+                f"Closest card match for {offer_id} is {card_id} with score {score}."
+            )
+            mappings.append((CardIdMapping(offer_id, card_id, "fuzzy"), score))
+        self.fuzzy_resolution_count += len(offer_ids)
+        metrics.increment("fuzzy_matches", len(offer_ids))
+        return mappings
+
+    def resolve(self, offer_id: str) -> str:
+        return self.resolve_all([offer_id])[0]
+
+    @metrics.timed("match")
+    def resolve_all(self, offer_ids: list[str]) -> list[str]:
+        unresolved_ids = {
+            offer_id
+            for offer_id in offer_ids
+            if offer_id not in self._wants_id_set and offer_id not in self._memo
+        }
+
+        new_mappings: list[CardIdMapping] = []
+        remaining_ids: set[str] = set()
+        for offer_id in unresolved_ids:
+            mapping = self._resolve_by_keys(offer_id)
+            if mapping is None:
+                remaining_ids.add(offer_id)
+            else:
+                new_mappings.append(mapping)
+
+        if self.mapping_store is not None and len(remaining_ids) > 0:
+            for offer_id, card_id in self.mapping_store.get_all(
+                list(remaining_ids)
+            ).items():
+                if card_id in self._wants_id_set:
+                    self._memo[offer_id] = card_id
+                    remaining_ids.remove(offer_id)
+
+        saved_mappings = list(new_mappings)
+        if len(remaining_ids) > 0:
+            for mapping, score in self._resolve_fuzzily(sorted(remaining_ids)):
+                new_mappings.append(mapping)
+                if score > SAVED_FUZZY_SCORE_THRESHOLD:
+                    saved_mappings.append(mapping)
+
+        for mapping in new_mappings:
+            self._memo[mapping.offer_id] = mapping.card_id
+        self._new_mappings.extend(saved_mappings)
+
+        return [
+            offer_id if offer_id in self._wants_id_set else self._memo[offer_id]
+            for offer_id in offer_ids
+        ]
+
+    def save(self):
+        """
+        Records the reliable resolutions of this run in the mapping store.
+        """
+        if self.mapping_store is None or len(self._new_mappings) == 0:
+            return
+        self.mapping_store.put_all(self._new_mappings)
+        self._new_mappings = []
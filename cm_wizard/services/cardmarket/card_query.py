@@ -1,4 +1,7 @@
+import hashlib
+import json
 from dataclasses import dataclass
+from typing import Iterable
 
 from cm_wizard.services.cardmarket.enums.card_condition import CardCondition
 from cm_wizard.services.cardmarket.enums.card_language import CardLanguage
@@ -14,3 +17,51 @@ class CardQuery:
     is_signed: bool | None
     is_first_edition: bool | None
     is_altered: bool | None
+
+    def to_row(self) -> list:
+        return [
+            self.id,
+            self.expansions,
+            None
+            if self.languages is None
+            else [language.name for language in self.languages],
+            self.min_condition.name,
+            self.is_reverse_holo,
+            self.is_signed,
+            self.is_first_edition,
+            self.is_altered,
+        ]
+
+    @classmethod
+    def from_row(cls, row: list) -> "CardQuery":
+        (
+            id,
+            expansions,
+            languages,
+            min_condition,
+            is_reverse_holo,
+            is_signed,
+            is_first_edition,
+            is_altered,
+        ) = row
+        return CardQuery(
+            id=id,
+            expansions=expansions,
+            languages=None
+            if languages is None
+            else [CardLanguage[language] for language in languages],
+            min_condition=CardCondition[min_condition],
+            is_reverse_holo=is_reverse_holo,
+            is_signed=is_signed,
+            is_first_edition=is_first_edition,
+            is_altered=is_altered,
+        )
+
+
+def card_queries_fingerprint(queries: Iterable[CardQuery]) -> str:
+    """
+    Returns a hash of the card IDs and filters of the queries, regardless of their
+    order, e.g. to detect changes to a wants list.
+    """
+    rows = sorted(json.dumps(query.to_row()) for query in queries)
+    return hashlib.sha256(json.dumps(rows).encode()).hexdigest()
@@ -1,29 +1,52 @@
 import logging
 import re
 from http.cookiejar import CookieJar
+from typing import Sequence
 
 import browser_cookie3
 import requests
 from bs4 import BeautifulSoup
-from ratelimit import limits, sleep_and_retry
 from requests.adapters import HTTPAdapter
 
 from cm_wizard.services.browser import Browser
-from cm_wizard.services.cardmarket.card_query import CardQuery
+from cm_wizard.services.cardmarket.card_query import (
+    CardQuery,
+    card_queries_fingerprint,
+)
 from cm_wizard.services.cardmarket.enums.cardmarket_game import CardmarketGame
 from cm_wizard.services.cardmarket.enums.cardmarket_language import CardmarketLanguage
+from cm_wizard.services.cardmarket.enums.endpoint_class import EndpointClass
 from cm_wizard.services.cardmarket.enums.location import Location
+from cm_wizard.services.cardmarket.enums.page_type import PageType
 from cm_wizard.services.cardmarket.log_retry import LogRetry
+from cm_wizard.services.cardmarket.offer_cache import OfferCache
+from cm_wizard.services.cardmarket.offer_records import (
+    CardOffer,
+    PagedSellerOffers,
+    SellerOffer,
+)
+from cm_wizard.services.cardmarket.offer_stream import (
+    parse_card_offers,
+    parse_paged_seller_offers,
+)
+from cm_wizard.services.cardmarket.page_cache import PageCache
 from cm_wizard.services.cardmarket.pages.card_page import CardPage
 from cm_wizard.services.cardmarket.pages.seller_offers_page import SellerOffersPage
 from cm_wizard.services.cardmarket.pages.wants_list_page import WantsListPage
 from cm_wizard.services.cardmarket.pages.wants_lists_page import WantsListsPage
+from cm_wizard.services.cardmarket.rate_limiter import SlidingWindowRateLimiter
 from cm_wizard.services.locale import Locale
+from cm_wizard.services.metrics import metrics
 
 CARDMARKET_COOKIE_DOMAIN = ".cardmarket.com"
 CARDMARKET_BASE_URL = f"https://www{CARDMARKET_COOKIE_DOMAIN}"
-RATE_LIMIT_PERIOD_SECONDS: float = 1
-RATE_LIMIT_CALL_COUNT: int = 1
+# Cardmarket counts requests within about 30 seconds against a budget shared by
+# all endpoints (see manual_tests/test_too_many_requests.py), plus 2 seconds to be safe.
+# A request costs RATE_LIMIT_BUDGET / EndpointClass.value of it.
+RATE_LIMIT_BUDGET: int = 30
+RATE_LIMIT_WINDOW_SECONDS: float = 32
+TOO_MANY_REQUESTS_RETRIES: int = 3
+MAX_CONCURRENT_REQUESTS: int = 4
 
 _logger = logging.getLogger(__name__)
 _logger.setLevel(logging.DEBUG)
@@ -45,6 +68,12 @@ class CardmarketService:
     _locale: Locale
     _game: CardmarketGame
     _rate_limited: bool = True
+    _rate_limiter = SlidingWindowRateLimiter(
+        budget=RATE_LIMIT_BUDGET,
+        window_seconds=RATE_LIMIT_WINDOW_SECONDS,
+    )
+    _page_cache: PageCache | None = None
+    _offer_cache: OfferCache | None = None
 
     def _cardmarket_url(self) -> str:
         return f"{CARDMARKET_BASE_URL}/{self._language.value}/{self._game.value}"
@@ -61,6 +90,41 @@ class CardmarketService:
     def game(self) -> CardmarketGame:
         return self._game
 
+    @property
+    def rate_limiter(self) -> SlidingWindowRateLimiter:
+        return self._rate_limiter
+
+    @property
+    def page_cache(self) -> PageCache | None:
+        return self._page_cache
+
+    @page_cache.setter
+    def page_cache(self, page_cache: PageCache | None):
+        self._page_cache = page_cache
+
+    @property
+    def offer_cache(self) -> OfferCache | None:
+        return self._offer_cache
+
+    @offer_cache.setter
+    def offer_cache(self, offer_cache: OfferCache | None):
+        self._offer_cache = offer_cache
+
+    def rate_limit_cost(self, endpoint_class: EndpointClass) -> float:
+        if not self._rate_limited:
+            return 0
+        return RATE_LIMIT_BUDGET / endpoint_class.value
+
+    def rate_limit_wait_seconds(self, request_count: int) -> float:
+        """
+        Estimates how long the rate limit delays as many more page requests.
+        """
+        if not self._rate_limited:
+            return 0
+        return self._rate_limiter.wait_seconds(
+            request_count * self.rate_limit_cost(EndpointClass.GAME)
+        )
+
     def login(
         self,
         username: str,
@@ -74,6 +138,7 @@ class CardmarketService:
 
         session = self._open_new_session(browser, user_agent, language, game)
 
+        self._rate_limiter.acquire(self.rate_limit_cost(EndpointClass.ROOT))
         login_page_response = session.get(f"{CARDMARKET_BASE_URL}/Login")
         if login_page_response.status_code != 200:
             _logger.error(
@@ -98,6 +163,7 @@ class CardmarketService:
             return
         token = token_match.group("token")
 
+        self._rate_limiter.acquire(self.rate_limit_cost(EndpointClass.GAME))
         login_response = session.post(
             f"{self._cardmarket_url()}/PostGetAction/User_Login",
             data={
@@ -132,14 +198,71 @@ class CardmarketService:
         self._close_session()
 
     def get_wants_lists(self) -> WantsListsPage:
-        page_text = self._request_authenticated_page("Wants")
+        page_text = self.request_page_text("Wants")
         return WantsListsPage(page_text, self.locale)
 
     def get_wants_list(self, id: str) -> WantsListPage:
-        page_text = self._request_authenticated_page(f"Wants/{id}")
+        page_text = self.request_page_text(f"Wants/{id}")
         return WantsListPage(page_text, self.locale)
 
-    def get_card(self, query: CardQuery):
+    def get_card(self, query: CardQuery) -> CardPage:
+        page_text = self.request_page_text(f"Cards/{query.id}", self.card_params(query))
+        return CardPage(page_text, self.locale)
+
+    def get_card_offers(
+        self, query: CardQuery, max_offers: int | None = None
+    ) -> list[CardOffer]:
+        """
+        Returns the offers of the card, cheapest first.
+        Parsing stops after max_offers, if given.
+        """
+        params = self.card_params(query)
+        offers = self.cached_card_offers(query.id, params, max_offers)
+        if offers is None:
+            endpoint = f"Cards/{query.id}"
+            page_text = self.request_page_text(endpoint, params)
+            with metrics.timer("parse", endpoint=self.endpoint_label(endpoint)):
+                offers = parse_card_offers(page_text, self.locale, max_offers)
+            self.cache_card_offers(query.id, params, max_offers, offers)
+        return offers
+
+    def _card_offers_filters(
+        self, params: dict[str, str], max_offers: int | None
+    ) -> dict[str, str]:
+        if max_offers is None:
+            return params
+        return {**params, "maxOffers": str(max_offers)}
+
+    def cached_card_offers(
+        self, card_id: str, params: dict[str, str], max_offers: int | None
+    ) -> list[CardOffer] | None:
+        if self._offer_cache is None:
+            return None
+        return self._offer_cache.get_card_offers(
+            self._language,
+            self._game,
+            card_id,
+            self._card_offers_filters(params, max_offers),
+        )
+
+    def cache_card_offers(
+        self,
+        card_id: str,
+        params: dict[str, str],
+        max_offers: int | None,
+        offers: list[CardOffer],
+    ):
+        if self._offer_cache is None:
+            return
+        self._offer_cache.put_card_offers(
+            self._language,
+            self._game,
+            card_id,
+            self._card_offers_filters(params, max_offers),
+            offers,
+        )
+
+    def card_params(self, query: CardQuery) -> dict[str, str]:
         params = {}
         if query.languages is not None:
             params["language"] = ",".join([str(l.value) for l in query.languages])
@@ -155,41 +278,174 @@ class CardmarketService:
             if value is None:
                 continue
             params[key] = "Y" if value else "N"
-        page_text = self._request_authenticated_page(f"Cards/{query.id}", params)
-        return CardPage(page_text, self.locale)
+        return params
 
     def get_seller_wanted_offers(
         self, seller_id: str, wants_list_id: str
     ) -> SellerOffersPage:
-        page_text = self._request_authenticated_page(
+        page_text = self.request_page_text(
             f"Users/{seller_id}/Offers/Singles",
             params={"idWantslist": wants_list_id},
         )
         return SellerOffersPage(page_text, self.locale)
 
+    def get_seller_offers(
+        self,
+        seller_id: str,
+        wants_list_id: str,
+        wanted_queries: Sequence[CardQuery] | None = None,
+    ) -> list[SellerOffer]:
+        """
+        Returns the seller's offers for cards on the wants list from all pages.
+        The offers depend on the wants list's contents, so they are only cached
+        for the wanted_queries (i.e. the items of the wants list), if given.
+        """
+        offers = self.cached_seller_offers(seller_id, wants_list_id, wanted_queries)
+        if offers is None:
+            first_page = self.get_seller_offers_page(seller_id, wants_list_id)
+            offers = list(first_page.offers)
+            for page in range(2, first_page.page_count + 1):
+                offers += self.get_seller_offers_page(
+                    seller_id, wants_list_id, page
+                ).offers
+            self.cache_seller_offers(seller_id, wants_list_id, wanted_queries, offers)
+        return offers
+
+    def get_seller_offers_page(
+        self, seller_id: str, wants_list_id: str, page: int = 1
+    ) -> PagedSellerOffers:
+        endpoint = f"Users/{seller_id}/Offers/Singles"
+        page_text = self.request_page_text(
+            endpoint,
+            params=self.seller_offers_params(wants_list_id, page),
+        )
+        with metrics.timer("parse", endpoint=self.endpoint_label(endpoint)):
+            return parse_paged_seller_offers(page_text, self.locale)
+
+    def seller_offers_params(self, wants_list_id: str, page: int) -> dict[str, str]:
+        params = {"idWantslist": wants_list_id}
+        if page > 1:
+            params["site"] = str(page)
+        return params
+
+    def cached_seller_offers(
+        self,
+        seller_id: str,
+        wants_list_id: str,
+        wanted_queries: Sequence[CardQuery] | None,
+    ) -> list[SellerOffer] | None:
+        if self._offer_cache is None or wanted_queries is None:
+            return None
+        return self._offer_cache.get_seller_offers(
+            self._language,
+            self._game,
+            seller_id,
+            wants_list_id,
+            card_queries_fingerprint(wanted_queries),
+        )
+
+    def cache_seller_offers(
+        self,
+        seller_id: str,
+        wants_list_id: str,
+        wanted_queries: Sequence[CardQuery] | None,
+        offers: list[SellerOffer],
+    ):
+        if self._offer_cache is None or wanted_queries is None:
+            return
+        self._offer_cache.put_seller_offers(
+            self._language,
+            self._game,
+            seller_id,
+            wants_list_id,
+            card_queries_fingerprint(wanted_queries),
+            offers,
+        )
+
     def _log_to_file(self, path: str, content: str):
         with open(path, "w") as out:
             out.write(content)
         _logger.info(f'Log file written "{path}".')
 
-    @sleep_and_retry
-    @limits(calls=RATE_LIMIT_CALL_COUNT, period=RATE_LIMIT_PERIOD_SECONDS)
-    def _request_rate_limited(self, url: str, params: dict):
-        return self.session.get(url, params=params)
+    def endpoint_label(self, endpoint: str) -> str:
+        """
+        Labels the metrics of requests by page type, rather than by each card or seller.
+        """
+        page_type = PageType.find_by_endpoint(endpoint)
+        return "other" if page_type is None else page_type.value.name
+
+    def _get(self, url: str, params: dict | None, label: str) -> requests.Response:
+        with metrics.timer("request", endpoint=label):
+            page_response = self.session.get(url, params=params)
+        metrics.increment("requests", endpoint=label)
+        metrics.increment("response_bytes", len(page_response.content), endpoint=label)
+        if page_response.status_code == 429:
+            metrics.increment("too_many_requests", endpoint=label)
+        return page_response
+
+    def _request_rate_limited(
+        self, url: str, params: dict | None, label: str
+    ) -> requests.Response:
+        cost = self.rate_limit_cost(EndpointClass.GAME)
+        retry_count = 0
+        while True:
+            with metrics.timer("limiter_wait", endpoint=label):
+                self._rate_limiter.acquire(cost)
+            page_response = self._get(url, params, label)
+            if (
+                page_response.status_code != 429
+                or retry_count == TOO_MANY_REQUESTS_RETRIES
+            ):
+                return page_response
+            retry_count += 1
+            metrics.increment("retries", endpoint=label)
+            _logger.warn(f"Retrying GET {url} for status 429.")
+            self._rate_limiter.on_too_many_requests()
+
+    def request_page_text(self, endpoint: str, params: dict | None = None) -> str:
+        """
+        Returns the text of an authenticated page from the page cache, or requests it
+        within the rate limit. Requests answered with 429 are retried.
+        Thread-safe, so the AsyncCardmarketService sends requests with it, too.
+        """
+        page_text = self._cached_page_text(endpoint, params)
+        if page_text is not None:
+            return page_text
 
-    def _request_authenticated_page(
-        self, endpoint: str, params: dict | None = None
-    ) -> str:
         _logger.info(f"GET {endpoint}{'' if params is None else ' ' + str(params)}")
 
-        session = self.session
-        url = f"{self._cardmarket_url()}/{endpoint}"
+        url = self._endpoint_url(endpoint)
+        label = self.endpoint_label(endpoint)
 
         if self._rate_limited:
-            page_response = self._request_rate_limited(url, params)
+            page_response = self._request_rate_limited(url, params, label)
         else:
-            page_response = session.get(url, params=params)
+            page_response = self._get(url, params, label)
+
+        page_text = self._page_text(endpoint, page_response)
+        self._cache_page_text(endpoint, params, page_text)
+        return page_text
+
+    def _cached_page_text(self, endpoint: str, params: dict | None) -> str | None:
+        if self._page_cache is None:
+            return None
+        page_text = self._page_cache.get(self._language, self._game, endpoint, params)
+        if page_text is not None:
+            metrics.increment("page_cache_hits", endpoint=self.endpoint_label(endpoint))
+            _logger.info(
+                f"GET {endpoint}{'' if params is None else ' ' + str(params)} from cache"
+            )
+        return page_text
 
+    def _cache_page_text(self, endpoint: str, params: dict | None, page_text: str):
+        if self._page_cache is None:
+            return
+        self._page_cache.put(self._language, self._game, endpoint, params, page_text)
+
+    def _endpoint_url(self, endpoint: str) -> str:
+        return f"{self._cardmarket_url()}/{endpoint}"
+
+    def _page_text(self, endpoint: str, page_response: requests.Response) -> str:
         if page_response.status_code != 200:
             _logger.error(
                 f"Failed to request {endpoint} with status {page_response.status_code}."
@@ -254,13 +510,16 @@ class CardmarketService:
             self._session.cookies.set_cookie(cookie)
 
         if with_retries:
+            # 429 is handled by the rate limiter, which knows when the budget recovers
             retries = LogRetry(
-                status_forcelist=[429, 502, 503, 504],
-                # the retry-after headers says 60 seconds, which is often longer than necessary
+                status_forcelist=[502, 503, 504],
                 respect_retry_after_header=False,
                 constant_sleep=32,
             )
-            self._session.mount("https://", HTTPAdapter(max_retries=retries))
+            self._session.mount(
+                "https://",
+                HTTPAdapter(max_retries=retries, pool_maxsize=MAX_CONCURRENT_REQUESTS),
+            )
 
         _logger.debug("New session opened.")
         return self._session
@@ -0,0 +1,16 @@
+from enum import Enum
+
+
+class EndpointClass(Enum):
+    """
+    Endpoints share one rate limit budget, but each class of endpoints
+    may only be requested a different number of times per window.
+    The values are the requests per window, if only that class was requested.
+    """
+
+    ROOT = 10
+    GAME = 30
+
+    @property
+    def value(self) -> int:
+        return super().value
@@ -0,0 +1,31 @@
+import re
+from dataclasses import dataclass
+from enum import Enum
+
+
+@dataclass
+class _PageType:
+    name: str
+    endpoint_pattern: str
+    # prices change quickly, but a wizard run should not see its own pages expire
+    # pages with a TTL of 0 are never cached
+    default_ttl_seconds: float
+
+
+class PageType(Enum):
+    # the user edits wants lists, which must be seen by the next (incremental) run
+    WANTS_LISTS = _PageType("wants_lists", r"Wants", 0)
+    WANTS_LIST = _PageType("wants_list", r"Wants/\d+", 0)
+    CARD = _PageType("card", r"Cards/[^/]+", 60 * 60)
+    SELLER_OFFERS = _PageType("seller_offers", r"Users/[^/]+/Offers/Singles", 60 * 60)
+
+    @property
+    def value(self) -> _PageType:
+        return super().value
+
+    @classmethod
+    def find_by_endpoint(cls, endpoint: str) -> "PageType | None":
+        for page_type in PageType:
+            if re.fullmatch(page_type.value.endpoint_pattern, endpoint):
+                return page_type
+        return None
@@ -3,6 +3,8 @@ import logging
 from requests.adapters import Retry
 from urllib3.util.retry import RequestHistory
 
+from cm_wizard.services.metrics import metrics
+
 _logger = logging.getLogger(__name__)
 _logger.setLevel(logging.DEBUG)
 
@@ -20,6 +22,7 @@ class LogRetry(Retry):
         if "history" in kwargs:
             history: tuple[RequestHistory] = kwargs["history"]
             request = history[-1]
+            metrics.increment("server_error_retries")
             _logger.warn(
                 f"Retrying {request.method} {request.url} for status {request.status}."
             )
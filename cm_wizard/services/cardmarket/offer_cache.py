@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from cm_wizard.services.cardmarket.enums.cardmarket_game import CardmarketGame
+from cm_wizard.services.cardmarket.enums.cardmarket_language import CardmarketLanguage
+from cm_wizard.services.cardmarket.enums.page_type import PageType
+from cm_wizard.services.cardmarket.offer_records import CardOffer, SellerOffer
+
+DEFAULT_OFFER_CACHE_PATH = ".cache/offers.sqlite3"
+# the number of offer lists kept per table, the oldest are evicted beyond it
+DEFAULT_MAX_ENTRIES = 20_000
+# tables of an older schema are dropped, their offers are requested again
+_SCHEMA_VERSION = 2
+
+_TABLE_PAGE_TYPES = {
+    "card_offers": PageType.CARD,
+    "seller_offers": PageType.SELLER_OFFERS,
+}
+
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.DEBUG)
+
+
+@dataclass
+class OfferCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return 0 if requests == 0 else self.hits / requests
+
+
+class OfferCache:
+    """
+    Persists parsed offers of card and seller pages as JSON rows in an SQLite database,
+    so cached offers need neither a request nor parsing.
+
+    Only the offers for the latest filters of each card are kept,
+    i.e. changing the filters of a wants list item invalidates its offers.
+    Likewise, a seller's offers for a wants list are only kept for the latest
+    fingerprint of the wants list's contents, because the seller's page only
+    shows offers for cards on the wants list.
+    Offers expire after the TTL of their page type and are evicted when the cache
+    is opened. Beyond max_entries per table, the oldest offers are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_OFFER_CACHE_PATH,
+        ttl_seconds: dict[PageType, float] | None = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = {
+            page_type: page_type.value.default_ttl_seconds for page_type in PageType
+        }
+        if ttl_seconds is not None:
+            self.ttl_seconds.update(ttl_seconds)
+        self.stats = OfferCacheStats()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # the async service accesses the cache from its event loop thread
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            (schema_version,) = self._connection.execute(
+                "PRAGMA user_version"
+            ).fetchone()
+            if schema_version != _SCHEMA_VERSION:
+                self._connection.execute("DROP TABLE IF EXISTS card_offers")
+                self._connection.execute("DROP TABLE IF EXISTS seller_offers")
+                self._connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS card_offers (
+                    key TEXT PRIMARY KEY,
+                    filters TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    offers TEXT NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS seller_offers (
+                    key TEXT PRIMARY KEY,
+                    filters TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    offers TEXT NOT NULL
+                )
+                """
+            )
+            for table in _TABLE_PAGE_TYPES:
+                self._connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_created_at"
+                    f" ON {table} (created_at)"
+                )
+        self.evict_expired()
+
+    def _get_rows(
+        self, table: str, page_type: PageType, key: str, filters: str
+    ) -> list[list] | None:
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                f"SELECT created_at, offers, filters FROM {table} WHERE key = ?",
+                (key,),
+            ).fetchone()
+            is_hit = (
+                row is not None
+                and row[2] == filters
+                and time.time() - row[0] <= self.ttl_seconds[page_type]
+            )
+            if is_hit:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+                if row is not None:
+                    self._connection.execute(
+                        f"DELETE FROM {table} WHERE key = ?", (key,)
+                    )
+        return json.loads(row[1]) if is_hit else None
+
+    def _put_rows(self, table: str, key: str, filters: str, rows: list[list]):
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?)",
+                (key, filters, time.time(), json.dumps(rows)),
+            )
+            cursor = self._connection.execute(
+                f"""
+                DELETE FROM {table} WHERE key IN (
+                    SELECT key FROM {table} ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+        if cursor.rowcount > 0:
+            _logger.debug(f"Evicted {cursor.rowcount} oldest offer lists.")
+
+    def get_card_offers(
+        self,
+        language: CardmarketLanguage,
+        game: CardmarketGame,
+        card_id: str,
+        filters: dict[str, str],
+    ) -> list[CardOffer] | None:
+        rows = self._get_rows(
+            "card_offers",
+            PageType.CARD,
+            json.dumps([language.value, game.value, card_id]),
+            json.dumps(filters, sort_keys=True),
+        )
+        return None if rows is None else [CardOffer.from_row(row) for row in rows]
+
+    def put_card_offers(
+        self,
+        language: CardmarketLanguage,
+        game: CardmarketGame,
+        card_id: str,
+        filters: dict[str, str],
+        offers: list[CardOffer],
+    ):
+        self._put_rows(
+            "card_offers",
+            json.dumps([language.value, game.value, card_id]),
+            json.dumps(filters, sort_keys=True),
+            [offer.to_row() for offer in offers],
+        )
+
+    def get_seller_offers(
+        self,
+        language: CardmarketLanguage,
+        game: CardmarketGame,
+        seller_id: str,
+        wants_list_id: str,
+        wants_list_fingerprint: str,
+    ) -> list[SellerOffer] | None:
+        rows = self._get_rows(
+            "seller_offers",
+            PageType.SELLER_OFFERS,
+            json.dumps([language.value, game.value, seller_id, wants_list_id]),
+            wants_list_fingerprint,
+        )
+        return None if rows is None else [SellerOffer.from_row(row) for row in rows]
+
+    def put_seller_offers(
+        self,
+        language: CardmarketLanguage,
+        game: CardmarketGame,
+        seller_id: str,
+        wants_list_id: str,
+        wants_list_fingerprint: str,
+        offers: list[SellerOffer],
+    ):
+        self._put_rows(
+            "seller_offers",
+            json.dumps([language.value, game.value, seller_id, wants_list_id]),
+            wants_list_fingerprint,
+            [offer.to_row() for offer in offers],
+        )
+
+    def evict(self, page_type: PageType | None = None) -> int:
+        """
+        Removes all offers of the page type (card or seller offers),
+        or all offers if no type is given. Returns the number of removed entries.
+        """
+        tables = [
+            table
+            for table, table_page_type in _TABLE_PAGE_TYPES.items()
+            if page_type is None or table_page_type == page_type
+        ]
+        evicted_count = 0
+        with self._lock, self._connection:
+            for table in tables:
+                evicted_count += self._connection.execute(
+                    f"DELETE FROM {table}"
+                ).rowcount
+        _logger.info(f"Evicted {evicted_count} cached offer lists.")
+        return evicted_count
+
+    def evict_expired(self) -> int:
+        """
+        Removes all offers older than the TTL of their page type.
+        Returns the number of removed entries.
+        """
+        now = time.time()
+        evicted_count = 0
+        with self._lock, self._connection:
+            for table, page_type in _TABLE_PAGE_TYPES.items():
+                evicted_count += self._connection.execute(
+                    f"DELETE FROM {table} WHERE created_at < ?",
+                    (now - self.ttl_seconds[page_type],),
+                ).rowcount
+        if evicted_count > 0:
+            _logger.debug(f"Evicted {evicted_count} expired offer lists.")
+        return evicted_count
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
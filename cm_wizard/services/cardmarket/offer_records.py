@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+
+from cm_wizard.services.cardmarket.enums.card_condition import CardCondition
+from cm_wizard.services.cardmarket.enums.card_language import CardLanguage
+from cm_wizard.services.cardmarket.enums.location import Location
+from cm_wizard.services.cardmarket.pages.card_page import CardPageOffer
+from cm_wizard.services.cardmarket.pages.seller_offers_page import (
+    SellerSinglesPageOffer,
+)
+
+
+@dataclass
+class CardOfferSeller:
+    id: str
+    rating: str | None = None
+    location: Location | None = None
+
+
+@dataclass
+class CardOffer:
+    """
+    The parsed fields of a CardPageOffer, detached from the HTML document.
+    """
+
+    price_euro_cents: int
+    quantity: int
+    seller: CardOfferSeller
+    condition: CardCondition | None = None
+    language: CardLanguage | None = None
+
+    @classmethod
+    def from_page_offer(cls, offer: CardPageOffer) -> "CardOffer":
+        return cls(
+            price_euro_cents=offer.price_euro_cents,
+            quantity=offer.quantity,
+            seller=CardOfferSeller(
+                id=offer.seller.id,
+                rating=offer.seller.rating,
+                location=offer.seller.location,
+            ),
+            condition=offer.product.condition,
+            language=offer.product.language,
+        )
+
+    def to_row(self) -> list:
+        return [
+            self.price_euro_cents,
+            self.quantity,
+            self.seller.id,
+            self.seller.rating,
+            None if self.seller.location is None else self.seller.location.name,
+            None if self.condition is None else self.condition.name,
+            None if self.language is None else self.language.name,
+        ]
+
+    @classmethod
+    def from_row(cls, row: list) -> "CardOffer":
+        price, quantity, seller_id, rating, location, condition, language = row
+        return cls(
+            price_euro_cents=price,
+            quantity=quantity,
+            seller=CardOfferSeller(
+                id=seller_id,
+                rating=rating,
+                location=None if location is None else Location[location],
+            ),
+            condition=None if condition is None else CardCondition[condition],
+            language=None if language is None else CardLanguage[language],
+        )
+
+
+@dataclass
+class SellerOffer:
+    """
+    The parsed fields of a SellerSinglesPageOffer, detached from the HTML document.
+    """
+
+    card_id: str
+    price_euro_cents: int
+    quantity: int
+    condition: CardCondition | None = None
+    language: CardLanguage | None = None
+
+    @classmethod
+    def from_page_offer(cls, offer: SellerSinglesPageOffer) -> "SellerOffer":
+        return cls(
+            card_id=offer.id,
+            price_euro_cents=offer.price_euro_cents,
+            quantity=offer.quantity,
+            condition=offer.product.condition,
+            language=offer.product.language,
+        )
+
+    def to_row(self) -> list:
+        return [
+            self.card_id,
+            self.price_euro_cents,
+            self.quantity,
+            None if self.condition is None else self.condition.name,
+            None if self.language is None else self.language.name,
+        ]
+
+    @classmethod
+    def from_row(cls, row: list) -> "SellerOffer":
+        card_id, price, quantity, condition, language = row
+        return cls(
+            card_id=card_id,
+            price_euro_cents=price,
+            quantity=quantity,
+            condition=None if condition is None else CardCondition[condition],
+            language=None if language is None else CardLanguage[language],
+        )
+
+
+@dataclass
+class PagedSellerOffers:
+    """
+    The offers on one page of a seller's offers and the number of pages.
+    """
+
+    offers: list[SellerOffer]
+    page_count: int
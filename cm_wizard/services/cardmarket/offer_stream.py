@@ -0,0 +1,284 @@
+import itertools
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from html.parser import HTMLParser
+from typing import Generic, Iterator, TypeVar
+
+from cm_wizard.services.cardmarket.enums.card_condition import CardCondition
+from cm_wizard.services.cardmarket.enums.card_language import CardLanguage
+from cm_wizard.services.cardmarket.enums.location import Location
+from cm_wizard.services.cardmarket.offer_records import (
+    CardOffer,
+    CardOfferSeller,
+    PagedSellerOffers,
+    SellerOffer,
+)
+from cm_wizard.services.cardmarket.pages.helpers import extract_card_id_from_url
+from cm_wizard.services.currency import parse_euro_cents
+from cm_wizard.services.locale import Locale
+
+STREAM_CHUNK_SIZE = 16 * 1024
+
+_VOID_ELEMENTS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+
+R = TypeVar("R")
+
+
+class _ArticleRowsParser(HTMLParser, ABC, Generic[R]):
+    """
+    Walks the article rows of an offers table without building a document tree.
+    Only the classes of the currently open elements are kept,
+    so memory does not grow with the size of the page.
+    Subclasses pick the fields of each row from start tags and texts.
+    """
+
+    def __init__(self, locale: Locale):
+        super().__init__(convert_charrefs=True)
+        self._locale = locale
+        self._stack: list[tuple[str, list[str]]] = []
+        self._open_classes = Counter[str]()
+        self._row_depth: int | None = None
+        self._fields: dict[str, str] = {}
+        self._text_field: str | None = None
+        self._text_depth = 0
+        self._texts: list[str] = []
+        self.records: list[R] = []
+
+    def _is_inside(self, *class_names: str) -> bool:
+        return all(self._open_classes[class_name] > 0 for class_name in class_names)
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]):
+        attributes = {name: value or "" for name, value in attrs}
+        classes = attributes.get("class", "").split()
+        if tag not in _VOID_ELEMENTS:
+            self._stack.append((tag, classes))
+            self._open_classes.update(classes)
+
+        if self._row_depth is None:
+            if "article-row" in classes and self._is_inside("table-body"):
+                self._row_depth = len(self._stack)
+                self._fields = {}
+            elif self._text_field is None:
+                self._handle_outside_row_starttag(tag, classes, attributes)
+        elif self._text_field is None:
+            self._handle_row_starttag(tag, classes, attributes)
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str):
+        if not any(open_tag == tag for open_tag, _ in self._stack):
+            return  # ignore unmatched end tags, like browsers do
+        while self._stack:
+            open_tag, classes = self._stack.pop()
+            self._open_classes.subtract(classes)
+            self._on_element_closed()
+            if open_tag == tag:
+                break
+
+    def _on_element_closed(self):
+        depth = len(self._stack)
+        if self._text_field is not None and depth < self._text_depth:
+            self._fields[self._text_field] = "".join(self._texts)
+            self._text_field = None
+        if self._row_depth is not None and depth < self._row_depth:
+            self._row_depth = None
+            self.records.append(self._build_record(self._fields))
+
+    def handle_data(self, data: str):
+        if self._text_field is not None:
+            self._texts.append(data)
+
+    def _capture_text(self, field: str):
+        """
+        Collects the text of the element that was just opened into the field.
+        """
+        if field in self._fields:
+            return
+        self._text_field = field
+        self._text_depth = len(self._stack)
+        self._texts = []
+
+    def _capture_attribute(self, field: str, value: str):
+        self._fields.setdefault(field, value)
+
+    def _handle_product_starttag(
+        self, tag: str, classes: list[str], attributes: dict[str, str]
+    ):
+        if self._is_inside("col-offer"):
+            if "price-container" in classes:
+                self._capture_text("price")
+            elif "amount-container" in classes:
+                self._capture_text("quantity")
+            return
+
+        if not self._is_inside("product-attributes"):
+            return
+        if tag == "span" and self._is_inside("article-condition"):
+            self._capture_text("condition")
+        elif (
+            attributes.get("data-toggle") == "tooltip"
+            and "ssMain2" in attributes.get("style", "")
+            and re.search(r"background-position: -\d+px -0px;", attributes["style"])
+        ):
+            self._capture_attribute("language", attributes["data-original-title"])
+
+    def _handle_outside_row_starttag(
+        self, tag: str, classes: list[str], attributes: dict[str, str]
+    ):
+        pass
+
+    @abstractmethod
+    def _handle_row_starttag(
+        self, tag: str, classes: list[str], attributes: dict[str, str]
+    ):
+        pass
+
+    @abstractmethod
+    def _build_record(self, fields: dict[str, str]) -> R:
+        pass
+
+    def pop_records(self) -> list[R]:
+        records = self.records
+        self.records = []
+        return records
+
+
+class _CardOffersParser(_ArticleRowsParser[CardOffer]):
+    def _handle_row_starttag(
+        self, tag: str, classes: list[str], attributes: dict[str, str]
+    ):
+        if self._is_inside("seller-extended"):
+            for class_name in classes:
+                rating_match = re.fullmatch(
+                    r"fonticon-seller-rating-(?P<rating>[\w-]+)", class_name
+                )
+                if rating_match is not None:
+                    self._capture_attribute("rating", rating_match.group("rating"))
+        elif self._is_inside("seller-name"):
+            if tag == "a":
+                self._capture_text("seller_id")
+            elif attributes.get("data-toggle") == "tooltip":
+                self._capture_attribute("location", attributes["title"])
+        else:
+            self._handle_product_starttag(tag, classes, attributes)
+
+    def _build_record(self, fields: dict[str, str]) -> CardOffer:
+        location_matches = re.findall(r":\s*(.+)", fields["location"])
+        assert (
+            len(location_matches) == 1
+        ), f'Location not found in tooltip title "{fields["location"]}".'
+        rating = fields["rating"]
+
+        return CardOffer(
+            price_euro_cents=parse_euro_cents(fields["price"]),
+            quantity=int(fields["quantity"]),
+            seller=CardOfferSeller(
+                id=fields["seller_id"],
+                rating=None if rating == "none" else rating,
+                location=Location.find_by_label(self._locale, location_matches[0]),
+            ),
+            condition=CardCondition.find_by_abbreviation(fields["condition"]),
+            language=CardLanguage.find_by_label(self._locale, fields["language"]),
+        )
+
+
+class _SellerOffersParser(_ArticleRowsParser[SellerOffer]):
+    def __init__(self, locale: Locale):
+        super().__init__(locale)
+        self.page_count: int | None = None
+
+    def _handle_outside_row_starttag(
+        self, tag: str, classes: list[str], attributes: dict[str, str]
+    ):
+        if (
+            self.page_count is None
+            and tag == "span"
+            and "mx-1" in classes
+            and self._is_inside("pagination")
+        ):
+            self._capture_text("pagination")
+
+    def _on_element_closed(self):
+        super()._on_element_closed()
+        if "pagination" in self._fields:
+            # e.g. "Page 1 of 3"
+            counts = re.findall(r"\d+", self._fields.pop("pagination"))
+            assert len(counts) == 2, f"Could not find page counts in {counts}."
+            self.page_count = int(counts[1])
+
+    def _handle_row_starttag(
+        self, tag: str, classes: list[str], attributes: dict[str, str]
+    ):
+        if tag == "a" and self._is_inside("col-sellerProductInfo", "col-seller"):
+            self._capture_attribute("href", attributes["href"])
+        else:
+            self._handle_product_starttag(tag, classes, attributes)
+
+    def _build_record(self, fields: dict[str, str]) -> SellerOffer:
+        return SellerOffer(
+            card_id=extract_card_id_from_url(fields["href"]),
+            price_euro_cents=parse_euro_cents(fields["price"]),
+            quantity=int(fields["quantity"]),
+            condition=CardCondition.find_by_abbreviation(fields["condition"]),
+            language=CardLanguage.find_by_label(self._locale, fields["language"]),
+        )
+
+
+def _stream_records(parser: _ArticleRowsParser[R], page_text: str) -> Iterator[R]:
+    for start in range(0, len(page_text), STREAM_CHUNK_SIZE):
+        parser.feed(page_text[start : start + STREAM_CHUNK_SIZE])
+        yield from parser.pop_records()
+    parser.close()
+    yield from parser.pop_records()
+
+
+def stream_card_offers(page_text: str, locale: Locale) -> Iterator[CardOffer]:
+    """
+    Yields the offers of a card page in order (i.e. cheapest first),
+    while the page is parsed.
+    """
+    return _stream_records(_CardOffersParser(locale), page_text)
+
+
+def stream_seller_offers(page_text: str, locale: Locale) -> Iterator[SellerOffer]:
+    return _stream_records(_SellerOffersParser(locale), page_text)
+
+
+def parse_card_offers(
+    page_text: str, locale: Locale, max_offers: int | None = None
+) -> list[CardOffer]:
+    """
+    Parsing stops after max_offers, if given.
+    """
+    return list(itertools.islice(stream_card_offers(page_text, locale), max_offers))
+
+
+def parse_seller_offers(page_text: str, locale: Locale) -> list[SellerOffer]:
+    return list(stream_seller_offers(page_text, locale))
+
+
+def parse_paged_seller_offers(page_text: str, locale: Locale) -> PagedSellerOffers:
+    parser = _SellerOffersParser(locale)
+    offers = list(_stream_records(parser, page_text))
+    return PagedSellerOffers(
+        offers=offers,
+        page_count=1 if parser.page_count is None else parser.page_count,
+    )
@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from cm_wizard.services.cardmarket.enums.cardmarket_game import CardmarketGame
+from cm_wizard.services.cardmarket.enums.cardmarket_language import CardmarketLanguage
+from cm_wizard.services.cardmarket.enums.page_type import PageType
+
+DEFAULT_PAGE_CACHE_PATH = ".cache/pages.sqlite3"
+DEFAULT_MAX_SIZE_BYTES = 200 * 1024 * 1024
+
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.DEBUG)
+
+
+class PageCache:
+    """
+    Persists the HTML of Cardmarket pages zlib compressed in an SQLite database.
+    Pages are keyed by language, game, endpoint and query parameters.
+    Each page type expires after its own time to live (TTL).
+    Page types with a TTL of 0 (by default the wants lists) are not cached.
+    When the compressed pages exceed max_size_bytes,
+    the least recently used pages are evicted.
+    Expired pages are evicted when the cache is opened.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PAGE_CACHE_PATH,
+        max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES,
+        ttl_seconds: dict[PageType, float] | None = None,
+    ):
+        self.path = path
+        self.max_size_bytes = max_size_bytes
+        self.ttl_seconds = {
+            page_type: page_type.value.default_ttl_seconds for page_type in PageType
+        }
+        if ttl_seconds is not None:
+            self.ttl_seconds.update(ttl_seconds)
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # the async service accesses the cache from its event loop thread
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # sum of the cached page sizes, kept up to date to avoid scanning the pages
+        self._size_bytes = 0
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    key TEXT PRIMARY KEY,
+                    page_type TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    content BLOB NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS pages_page_type_created_at"
+                " ON pages (page_type, created_at)"
+            )
+        self.evict_expired()
+
+    @staticmethod
+    def _key(
+        language: CardmarketLanguage,
+        game: CardmarketGame,
+        endpoint: str,
+        params: dict | None,
+    ) -> str:
+        return json.dumps(
+            [language.value, game.value, endpoint, sorted((params or {}).items())]
+        )
+
+    def get(
+        self,
+        language: CardmarketLanguage,
+        game: CardmarketGame,
+        endpoint: str,
+        params: dict | None = None,
+    ) -> str | None:
+        page_type = PageType.find_by_endpoint(endpoint)
+        if page_type is None or self.ttl_seconds[page_type] <= 0:
+            return None
+        key = self._key(language, game, endpoint, params)
+        now = time.time()
+
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT created_at, size, content FROM pages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            created_at, size, content = row
+            if now - created_at > self.ttl_seconds[page_type]:
+                self._connection.execute("DELETE FROM pages WHERE key = ?", (key,))
+                self._size_bytes -= size
+                return None
+            self._connection.execute(
+                "UPDATE pages SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return zlib.decompress(content).decode("utf-8")
+
+    def put(
+        self,
+        language: CardmarketLanguage,
+        game: CardmarketGame,
+        endpoint: str,
+        params: dict | None,
+        page_text: str,
+    ):
+        page_type = PageType.find_by_endpoint(endpoint)
+        if page_type is None or self.ttl_seconds[page_type] <= 0:
+            return
+        key = self._key(language, game, endpoint, params)
+        content = zlib.compress(page_text.encode("utf-8"))
+        now = time.time()
+
+        with self._lock, self._connection:
+            replaced_row = self._connection.execute(
+                "SELECT size FROM pages WHERE key = ?", (key,)
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (key, page_type.value.name, now, now, len(content), content),
+            )
+            if replaced_row is not None:
+                self._size_bytes -= replaced_row[0]
+            self._size_bytes += len(content)
+            self._evict_least_recently_used()
+
+    def _evict_least_recently_used(self):
+        excess_size = self._size_bytes - self.max_size_bytes
+        if excess_size <= 0:
+            return
+        # walk the accessed_at index only as far as needed to free the excess
+        cursor = self._connection.execute("SELECT size FROM pages ORDER BY accessed_at")
+        evicted_count = 0
+        evicted_size = 0
+        while evicted_size < excess_size:
+            row = cursor.fetchone()
+            if row is None:
+                break
+            evicted_count += 1
+            evicted_size += row[0]
+        cursor.close()
+        self._connection.execute(
+            "DELETE FROM pages WHERE key IN"
+            " (SELECT key FROM pages ORDER BY accessed_at LIMIT ?)",
+            (evicted_count,),
+        )
+        self._size_bytes -= evicted_size
+        _logger.debug(f"Evicted {evicted_count} least recently used pages.")
+
+    def _query_size_bytes(self) -> int:
+        (size,) = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM pages"
+        ).fetchone()
+        return size
+
+    def evict(self, page_type: PageType | None = None) -> int:
+        """
+        Removes all pages of the page type, or all pages if no type is given.
+        Returns the number of removed pages.
+        """
+        with self._lock, self._connection:
+            if page_type is None:
+                cursor = self._connection.execute("DELETE FROM pages")
+            else:
+                cursor = self._connection.execute(
+                    "DELETE FROM pages WHERE page_type = ?", (page_type.value.name,)
+                )
+            self._size_bytes = self._query_size_bytes()
+        _logger.info(f"Evicted {cursor.rowcount} cached pages.")
+        return cursor.rowcount
+
+    def evict_expired(self) -> int:
+        """
+        Removes all pages older than the TTL of their page type.
+        Returns the number of removed pages.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            evicted_count = 0
+            for page_type, ttl_seconds in self.ttl_seconds.items():
+                cursor = self._connection.execute(
+                    "DELETE FROM pages WHERE page_type = ? AND created_at < ?",
+                    (page_type.value.name, now - ttl_seconds),
+                )
+                evicted_count += cursor.rowcount
+            self._size_bytes = self._query_size_bytes()
+        if evicted_count > 0:
+            _logger.debug(f"Evicted {evicted_count} expired pages.")
+        return evicted_count
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._query_size_bytes()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, TypeVar
+
+from cm_wizard.services.locale import Locale
+
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.DEBUG)
+
+R = TypeVar("R")
+
+
+class PageParserPool:
+    """
+    Parses page texts into plain records in worker processes.
+    Unlike threads, workers do not hold the interpreter lock of the event loop,
+    so parsing one page never delays sending the next request.
+
+    The parse functions and their results must be picklable,
+    i.e. module level functions (or partials of them) returning offer records.
+    With max_workers=0, pages are parsed serially in the calling thread,
+    which blocks the event loop, but is easier to debug.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        """
+        By default, there is one worker per CPU.
+        """
+        self.max_workers = max_workers
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # workers are started on first use
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                # forking a process with running threads (e.g. of the UI) is unsafe
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _logger.debug("Started the page parser processes.")
+        return self._executor
+
+    async def parse(
+        self,
+        parse_page: Callable[[str, Locale], R],
+        page_text: str,
+        locale: Locale,
+    ) -> R:
+        if self.max_workers == 0:
+            return parse_page(page_text, locale)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), parse_page, page_text, locale
+        )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
@@ -22,6 +22,8 @@ _logger.setLevel(logging.DEBUG)
 
 
 class CardPage(HtmlPageElement):
+    _root_selector = "#table .table-body"
+
     @cached_property
     def _card_infos(self) -> Tag:
         return self._tag.find(id="info").find(class_="infoContainer")
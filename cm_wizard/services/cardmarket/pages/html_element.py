@@ -1,7 +1,8 @@
 from typing import Generic, TypeVar
 
-from bs4 import BeautifulSoup, Tag
+from bs4 import Tag
 
+from cm_wizard.services.cardmarket.pages.html_parser import HtmlParser, parse_html
 from cm_wizard.services.locale import Locale
 
 
@@ -12,8 +13,18 @@ class HtmlElement:
 
 
 class HtmlPageElement(HtmlElement):
-    def __init__(self, page_text: str, locale: Locale):
-        super().__init__(BeautifulSoup(page_text, "html.parser"), locale)
+    # the CSS selector of the element the page's properties are read from
+    _root_selector: str | None = None
+
+    def __init__(
+        self,
+        page_text: str,
+        locale: Locale,
+        html_parsers: list[HtmlParser] | None = None,
+    ):
+        super().__init__(
+            parse_html(page_text, html_parsers, self._root_selector), locale
+        )
 
 
 T = TypeVar("T", bound=HtmlElement)
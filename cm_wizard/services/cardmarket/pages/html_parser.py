@@ -0,0 +1,52 @@
+import logging
+from enum import Enum
+
+from bs4 import BeautifulSoup, FeatureNotFound
+
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.DEBUG)
+
+
+class HtmlParser(Enum):
+    # lxml is an optional dependency and parses large pages several times faster
+    LXML = "lxml"
+    HTML_PARSER = "html.parser"
+
+
+default_html_parsers = [HtmlParser.LXML, HtmlParser.HTML_PARSER]
+_unavailable_html_parsers: set[HtmlParser] = set()
+
+
+def parse_html(
+    page_text: str,
+    html_parsers: list[HtmlParser] | None = None,
+    root_selector: str | None = None,
+) -> BeautifulSoup:
+    """
+    Parses the page with the first of the html_parsers that is installed.
+    Parsers build different trees from malformed HTML, so if the element of the
+    root_selector (CSS) is missing, the page is parsed by the next parser.
+    If no parser finds it, the first parsed page is returned anyway.
+    """
+    if html_parsers is None:
+        html_parsers = default_html_parsers
+
+    fallback_soup: BeautifulSoup | None = None
+    for html_parser in html_parsers:
+        if html_parser in _unavailable_html_parsers:
+            continue
+        try:
+            soup = BeautifulSoup(page_text, html_parser.value)
+        except FeatureNotFound:
+            _logger.debug(f"HTML parser {html_parser.value} is not installed.")
+            _unavailable_html_parsers.add(html_parser)
+            continue
+        if root_selector is None or soup.select_one(root_selector) is not None:
+            return soup
+        _logger.warn(f'HTML parser {html_parser.value} found no "{root_selector}".')
+        if fallback_soup is None:
+            fallback_soup = soup
+
+    if fallback_soup is not None:
+        return fallback_soup
+    raise RuntimeError("None of the HTML parsers is installed.")
@@ -22,6 +22,8 @@ _logger.setLevel(logging.DEBUG)
 
 
 class SellerOffersPage(HtmlPageElement):
+    _root_selector = "#UserOffersTable .table-body"
+
     @cached_property
     def _main(self) -> Tag:
         return self._tag.find("body").find("main")
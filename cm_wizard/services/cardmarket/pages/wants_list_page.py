@@ -24,6 +24,8 @@ _logger.setLevel(logging.DEBUG)
 
 
 class WantsListPage(HtmlPageElement):
+    _root_selector = ".data-table tbody"
+
     @cached_property
     def title(self) -> str:
         return self._tag.find("h1").text
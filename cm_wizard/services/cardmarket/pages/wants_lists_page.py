@@ -14,6 +14,8 @@ _logger.setLevel(logging.DEBUG)
 
 
 class WantsListsPage(HtmlPageElement):
+    _root_selector = "main"
+
     @cached_property
     def items(self) -> list["WantsListsPageItem"]:
         cards: ResultSet[Tag] = self._tag.find_all(class_="card")
@@ -0,0 +1,123 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.DEBUG)
+
+
+class SlidingWindowRateLimiter:
+    """
+    Models a server that counts the cost of all requests within the last
+    window_seconds against a shared budget.
+    Bursts may use the full budget, afterwards requests are delayed until the
+    oldest ones leave the window.
+
+    Requests reserve their slot immediately, so concurrent threads are served
+    in order and never oversubscribe the budget.
+    If the server still responds with 429, the budget is lowered to what was
+    actually used and recovers by one unit per window without another 429.
+    """
+
+    def __init__(self, budget: float, window_seconds: float):
+        self.max_budget = budget
+        self.window_seconds = window_seconds
+        self._budget = budget
+        self._budget_updated_at = time.monotonic()
+        # (time, cost) of all reservations, sorted by time
+        self._reservations: deque[tuple[float, float]] = deque()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def budget(self) -> float:
+        with self._lock:
+            return self._recover_budget(time.monotonic())
+
+    def _recover_budget(self, now: float) -> float:
+        recovered_units = int((now - self._budget_updated_at) / self.window_seconds)
+        if recovered_units > 0:
+            self._budget = min(self.max_budget, self._budget + recovered_units)
+            self._budget_updated_at += recovered_units * self.window_seconds
+        return self._budget
+
+    def _reserve(self, cost: float) -> float:
+        """
+        Reserves the cost and returns the seconds to wait before sending the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            while (
+                self._reservations
+                and self._reservations[0][0] <= now - self.window_seconds
+            ):
+                self._reservations.popleft()
+
+            budget = max(cost, self._recover_budget(now))
+            start = max(now, self._blocked_until)
+            if self._reservations:
+                start = max(start, self._reservations[-1][0])
+            used = sum(
+                reservation_cost
+                for reservation_time, reservation_cost in self._reservations
+                if reservation_time > start - self.window_seconds
+            )
+            for reservation_time, reservation_cost in self._reservations:
+                if used + cost <= budget:
+                    break
+                if reservation_time <= start - self.window_seconds:
+                    continue  # already outside of the window
+                start = reservation_time + self.window_seconds
+                used -= reservation_cost
+
+            self._reservations.append((start, cost))
+            return start - now
+
+    def acquire(self, cost: float = 1):
+        wait_seconds = self._reserve(cost)
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+    def wait_seconds(self, cost: float) -> float:
+        """
+        Estimates how long it takes until requests of the total cost are sent,
+        if they were reserved now.
+        """
+        with self._lock:
+            now = time.monotonic()
+            budget = self._recover_budget(now)
+            window_reservations = [
+                (reservation_time, reservation_cost)
+                for reservation_time, reservation_cost in self._reservations
+                if reservation_time > now - self.window_seconds
+            ]
+            used = sum(reservation_cost for _, reservation_cost in window_reservations)
+            # each budget's worth of cost leaves the window one window later
+            window_count = math.ceil((used + cost) / budget) - 1
+            if window_count <= 0:
+                wait_seconds = 0.0
+            else:
+                oldest_time = window_reservations[0][0] if window_reservations else now
+                wait_seconds = window_count * self.window_seconds - (now - oldest_time)
+            return max(wait_seconds, self._blocked_until - now, 0.0)
+
+    def on_too_many_requests(self):
+        """
+        Call when the server responded with 429 despite the limit.
+        The whole budget is considered used for the next window.
+        """
+        with self._lock:
+            now = time.monotonic()
+            used = sum(
+                reservation_cost
+                for reservation_time, reservation_cost in self._reservations
+                if now - self.window_seconds < reservation_time <= now
+            )
+            self._budget = max(1, min(self._budget, used))
+            self._budget_updated_at = now
+            self._blocked_until = now + self.window_seconds
+            _logger.warn(
+                f"Too many requests, lowered the budget to {self._budget} and pausing for {self.window_seconds} seconds."
+            )
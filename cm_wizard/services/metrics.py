@@ -0,0 +1,258 @@
+import functools
+import inspect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Iterator, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+_Key = tuple[str, tuple[tuple[str, str], ...]]
+
+
+def _key(name: str, labels: dict[str, str]) -> _Key:
+    return name, tuple(sorted(labels.items()))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@dataclass
+class CounterSample:
+    name: str
+    labels: dict[str, str]
+    value: float
+
+
+@dataclass
+class TimerSample:
+    name: str
+    labels: dict[str, str]
+    count: int = 0
+    total_seconds: float = 0
+    max_seconds: float = 0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / max(self.count, 1)
+
+
+@dataclass
+class MetricsReport:
+    counters: list[CounterSample] = field(default_factory=list)
+    timers: list[TimerSample] = field(default_factory=list)
+
+    def counter(self, name: str, **labels: str) -> float:
+        """
+        Returns the sum of all counters with the name and (at least) the labels.
+        """
+        return sum(
+            counter.value
+            for counter in self.counters
+            if counter.name == name and labels.items() <= counter.labels.items()
+        )
+
+    def timer(self, name: str, **labels: str) -> TimerSample:
+        """
+        Returns the combination of all timers with the name and (at least) the labels.
+        """
+        combined = TimerSample(name, labels)
+        for timer in self.timers:
+            if timer.name == name and labels.items() <= timer.labels.items():
+                combined.count += timer.count
+                combined.total_seconds += timer.total_seconds
+                combined.max_seconds = max(combined.max_seconds, timer.max_seconds)
+        return combined
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2)
+
+    def to_prometheus(self, prefix: str = "cm_wizard") -> str:
+        """
+        Returns the report in the Prometheus text format.
+        Timers are exported as summaries without quantiles.
+        """
+        lines: list[str] = []
+
+        def labels_text(labels: dict[str, str]) -> str:
+            if len(labels) == 0:
+                return ""
+            label_texts = [
+                f'{name}="{_escape_label_value(value)}"'
+                for name, value in sorted(labels.items())
+            ]
+            return "{" + ",".join(label_texts) + "}"
+
+        for name in sorted({counter.name for counter in self.counters}):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for counter in self.counters:
+                if counter.name == name:
+                    lines.append(
+                        f"{prefix}_{name}_total{labels_text(counter.labels)} {counter.value}"
+                    )
+        for name in sorted({timer.name for timer in self.timers}):
+            lines.append(f"# TYPE {prefix}_{name}_seconds summary")
+            for timer in self.timers:
+                if timer.name == name:
+                    labels = labels_text(timer.labels)
+                    lines.append(
+                        f"{prefix}_{name}_seconds_sum{labels} {timer.total_seconds}"
+                    )
+                    lines.append(f"{prefix}_{name}_seconds_count{labels} {timer.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """
+        Returns one line per timer and counter, e.g. for logging.
+        """
+        lines = [
+            f"{timer.name}{timer.labels or ''}: {timer.total_seconds:.3f} s total, "
+            f"{timer.count} times, {timer.max_seconds:.3f} s max"
+            for timer in self.timers
+        ]
+        lines += [
+            f"{counter.name}{counter.labels or ''}: {counter.value:g}"
+            for counter in self.counters
+        ]
+        return "\n".join(lines)
+
+
+class Metrics:
+    """
+    Thread-safe counters and timers, identified by a name and labels,
+    e.g. the endpoint or stage they were measured for.
+    Measuring costs a lock and a dictionary lookup, so it can stay in hot paths.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[_Key, float] = {}
+        self._timers: dict[_Key, TimerSample] = {}
+
+    def increment(self, name: str, value: float = 1, **labels: str):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: str):
+        key = _key(name, labels)
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is None:
+                timer = self._timers[key] = TimerSample(name, labels)
+            timer.count += 1
+            timer.total_seconds += seconds
+            timer.max_seconds = max(timer.max_seconds, seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, **labels: str) -> Callable[[F], F]:
+        """
+        Decorates a function or coroutine function to be measured by a timer.
+        """
+
+        def decorator(function: F) -> F:
+            if inspect.iscoroutinefunction(function):
+
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    with self.timer(name, **labels):
+                        return await function(*args, **kwargs)
+
+                return async_wrapper  # type: ignore[return-value]
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return function(*args, **kwargs)
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+    def report(self) -> MetricsReport:
+        with self._lock:
+            return MetricsReport(
+                counters=[
+                    CounterSample(name, dict(labels), value)
+                    for (name, labels), value in self._counters.items()
+                ],
+                timers=[
+                    TimerSample(
+                        timer.name,
+                        dict(timer.labels),
+                        timer.count,
+                        timer.total_seconds,
+                        timer.max_seconds,
+                    )
+                    for timer in self._timers.values()
+                ],
+            )
+
+
+class ProgressEstimator:
+    """
+    Estimates the remaining time of a stage from its remaining requests:
+    They take the request latency measured so far, spread over the concurrent
+    requests, plus the wait of the rate limiter, if given.
+    The remaining requests are extrapolated from the requests per progress so far.
+    Stages without requests are extrapolated from the time they took so far.
+    """
+
+    def __init__(
+        self,
+        rate_limit_wait_seconds: Callable[[int], float] | None = None,
+        concurrent_requests: int = 1,
+    ):
+        self.rate_limit_wait_seconds = rate_limit_wait_seconds
+        self.concurrent_requests = concurrent_requests
+        self._stage: object = None
+        self._started_at = 0.0
+        self._started_requests = TimerSample("request", {})
+
+    def estimate_remaining_seconds(
+        self, progress: float, stage: object
+    ) -> float | None:
+        """
+        Call with every progress update. A new stage restarts the measurement.
+        Returns None, until there is progress to extrapolate from.
+        """
+        now = time.monotonic()
+        requests = metrics.report().timer("request")
+        if stage != self._stage:
+            self._stage = stage
+            self._started_at = now
+            self._started_requests = requests
+        if progress <= 0:
+            return None
+
+        request_count = requests.count - self._started_requests.count
+        if request_count <= 0:
+            return (now - self._started_at) * (1 - progress) / progress
+        request_seconds = (
+            requests.total_seconds - self._started_requests.total_seconds
+        ) / request_count
+        remaining_request_count = round(request_count * (1 - progress) / progress)
+        remaining_seconds = (
+            remaining_request_count * request_seconds / self.concurrent_requests
+        )
+        if self.rate_limit_wait_seconds is not None:
+            remaining_seconds += self.rate_limit_wait_seconds(remaining_request_count)
+        return remaining_seconds
+
+
+metrics = Metrics()
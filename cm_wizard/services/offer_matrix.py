@@ -0,0 +1,454 @@
+import json
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+# the arrays an OfferMatrix is constructed from
+_ARRAY_NAMES = [
+    "card_pair_pointers",
+    "pair_sellers",
+    "pair_run_pointers",
+    "run_prices",
+    "run_quantities",
+]
+# the arrays derived from them, shared as well, so attaching computes nothing
+_DERIVED_ARRAY_NAMES = [
+    "pair_cards",
+    "run_pairs",
+    "run_copy_pointers",
+    "run_copy_offsets",
+    "pair_copy_counts",
+    "run_price_offsets",
+]
+# the header size is stored in the first bytes of shared memory
+_HEADER_SIZE_BYTES = 8
+
+
+def _align(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+class OfferMatrix:
+    """
+    Compact, read-only storage of the offers of sellers for cards.
+    Card and seller IDs are interned to integer indices in order of appearance.
+
+    The layout is similar to a CSR sparse matrix:
+    The (card, seller) pairs of each card are stored consecutively, sorted by seller.
+    Each pair references a run of distinct prices, sorted ascendingly,
+    with the quantity of copies offered at each price.
+    """
+
+    def __init__(
+        self,
+        card_ids: list[str],
+        seller_ids: list[str],
+        card_pair_pointers: np.ndarray,
+        pair_sellers: np.ndarray,
+        pair_run_pointers: np.ndarray,
+        run_prices: np.ndarray,
+        run_quantities: np.ndarray,
+        derived_arrays: dict[str, np.ndarray] | None = None,
+    ):
+        """
+        The derived_arrays (e.g. of another OfferMatrix with the same arrays)
+        are computed, unless given.
+        """
+        self.card_ids = card_ids
+        self.seller_ids = seller_ids
+        self.card_pair_pointers = card_pair_pointers
+        self.pair_sellers = pair_sellers
+        self.pair_run_pointers = pair_run_pointers
+        self.run_prices = run_prices
+        self.run_quantities = run_quantities
+
+        self._card_indices = {card_id: index for index, card_id in enumerate(card_ids)}
+        self._seller_indices = {
+            seller_id: index for index, seller_id in enumerate(seller_ids)
+        }
+        if derived_arrays is None:
+            derived_arrays = self._derive_arrays()
+        self.pair_cards: np.ndarray = derived_arrays["pair_cards"]
+        self.run_pairs: np.ndarray = derived_arrays["run_pairs"]
+        self.run_copy_pointers: np.ndarray = derived_arrays["run_copy_pointers"]
+        self.run_copy_offsets: np.ndarray = derived_arrays["run_copy_offsets"]
+        self.pair_copy_counts: np.ndarray = derived_arrays["pair_copy_counts"]
+        self.run_price_offsets: np.ndarray = derived_arrays["run_price_offsets"]
+
+    def _derive_arrays(self) -> dict[str, np.ndarray]:
+        pair_run_pointers = self.pair_run_pointers
+        run_pairs = np.repeat(
+            np.arange(len(self.pair_sellers), dtype=np.int64),
+            np.diff(pair_run_pointers),
+        )
+        # the index of the first copy of each run among all copies
+        run_copy_pointers = np.concatenate(
+            ([0], np.cumsum(self.run_quantities))
+        ).astype(np.int64)
+        pair_offsets = run_copy_pointers[pair_run_pointers[:-1]]
+        # the total price of the cheaper copies within the same pair for each run
+        cumulative_prices = np.concatenate(
+            ([0], np.cumsum(self.run_prices * self.run_quantities))
+        )
+        return {
+            "pair_cards": np.repeat(
+                np.arange(len(self.card_ids), dtype=np.int32),
+                np.diff(self.card_pair_pointers),
+            ),
+            "run_pairs": run_pairs,
+            "run_copy_pointers": run_copy_pointers,
+            # the number of cheaper copies within the same pair for each run
+            "run_copy_offsets": run_copy_pointers[:-1] - pair_offsets[run_pairs],
+            "pair_copy_counts": run_copy_pointers[pair_run_pointers[1:]] - pair_offsets,
+            "run_price_offsets": cumulative_prices[:-1]
+            - cumulative_prices[pair_run_pointers[:-1]][run_pairs],
+        }
+
+    @property
+    def card_count(self) -> int:
+        return len(self.card_ids)
+
+    @property
+    def seller_count(self) -> int:
+        return len(self.seller_ids)
+
+    @property
+    def pair_count(self) -> int:
+        return len(self.pair_sellers)
+
+    def card_index(self, card_id: str) -> int | None:
+        return self._card_indices.get(card_id)
+
+    def seller_index(self, seller_id: str) -> int | None:
+        return self._seller_indices.get(seller_id)
+
+    def pair_index(self, card_index: int, seller_index: int) -> int | None:
+        """
+        The sellers of a card are sorted, so the pair is searched in the card's slice.
+        """
+        start = int(self.card_pair_pointers[card_index])
+        end = int(self.card_pair_pointers[card_index + 1])
+        pair_index = start + int(
+            np.searchsorted(self.pair_sellers[start:end], seller_index)
+        )
+        if pair_index == end or self.pair_sellers[pair_index] != seller_index:
+            return None
+        return pair_index
+
+    def card_pairs(self, card_index: int) -> range:
+        return range(
+            self.card_pair_pointers[card_index],
+            self.card_pair_pointers[card_index + 1],
+        )
+
+    def card_sellers(self, card_index: int) -> np.ndarray:
+        """
+        Returns the indices of all sellers offering the card, sorted ascendingly.
+        """
+        pairs = self.card_pairs(card_index)
+        return self.pair_sellers[pairs.start : pairs.stop]
+
+    def copy_count(self, card_index: int, seller_index: int) -> int:
+        pair_index = self.pair_index(card_index, seller_index)
+        if pair_index is None:
+            return 0
+        return int(self.pair_copy_counts[pair_index])
+
+    def copy_price(self, card_index: int, seller_index: int, copy: int) -> int | None:
+        """
+        Returns the price of the copy-th cheapest copy (starting at 0)
+        or None if the seller does not offer that many copies.
+        The pair's price runs are searched for the run containing the copy.
+        """
+        pair_index = self.pair_index(card_index, seller_index)
+        if pair_index is None or copy >= self.pair_copy_counts[pair_index]:
+            return None
+        start = self.pair_run_pointers[pair_index]
+        end = self.pair_run_pointers[pair_index + 1]
+        run_index = (
+            start
+            + int(np.searchsorted(self.run_copy_offsets[start:end], copy, "right"))
+            - 1
+        )
+        return int(self.run_prices[run_index])
+
+    def copies_price(
+        self, card_index: int, seller_index: int, count: int
+    ) -> int | None:
+        """
+        Returns the total price of the count cheapest copies
+        or None if the seller does not offer that many copies.
+        """
+        if count == 0:
+            return 0
+        pair_index = self.pair_index(card_index, seller_index)
+        if pair_index is None or count > self.pair_copy_counts[pair_index]:
+            return None
+        return self.copies_prices(np.array([pair_index]), np.array([count]))[0].item()
+
+    def copies_prices(self, pair_indices: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """
+        Returns the total price of the counts cheapest copies of each pair,
+        which must offer at least that many copies.
+        The run of each pair's last copy is searched among all copies,
+        so its price follows from the prices of the cheaper runs.
+        """
+        last_copies = (
+            self.run_copy_pointers[self.pair_run_pointers[pair_indices]] + counts - 1
+        )
+        run_indices = np.maximum(
+            np.searchsorted(self.run_copy_pointers, last_copies, side="right") - 1, 0
+        )
+        return np.where(
+            counts > 0,
+            self.run_price_offsets[run_indices]
+            + (counts - self.run_copy_offsets[run_indices])
+            * self.run_prices[run_indices],
+            0,
+        )
+
+    def seller_card_counts(self) -> np.ndarray:
+        """
+        Returns the number of distinct cards offered by each seller.
+        """
+        return np.bincount(self.pair_sellers, minlength=self.seller_count)
+
+    def expand_copies(
+        self, max_copies_per_card: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the card indices, seller indices and prices of single copies,
+        sorted by card, seller and price.
+        Only the cheapest max_copies_per_card[card_index] copies of each pair are
+        expanded, because a buyer never needs more copies from a single seller.
+        """
+        run_cards = self.pair_cards[self.run_pairs]
+        run_take = np.clip(
+            max_copies_per_card[run_cards] - self.run_copy_offsets,
+            0,
+            self.run_quantities,
+        )
+        return (
+            np.repeat(run_cards, run_take),
+            np.repeat(self.pair_sellers[self.run_pairs], run_take),
+            np.repeat(self.run_prices, run_take),
+        )
+
+    @classmethod
+    def from_sellers_offers(
+        cls, sellers_offers: dict[str, dict[str, list[int]]]
+    ) -> "OfferMatrix":
+        builder = OfferMatrixBuilder()
+        for seller_id, seller_offers in sellers_offers.items():
+            builder.add_seller(seller_id)
+            for card_id, prices in seller_offers.items():
+                for price in prices:
+                    builder.add_offer(card_id, seller_id, price)
+        return builder.build()
+
+    def to_sellers_offers(self) -> dict[str, dict[str, list[int]]]:
+        """
+        Expands the matrix into lists of prices per copy. Mostly useful for debugging.
+        """
+        sellers_offers: dict[str, dict[str, list[int]]] = {
+            seller_id: {} for seller_id in self.seller_ids
+        }
+        for pair_index, (card_index, seller_index) in enumerate(
+            zip(self.pair_cards, self.pair_sellers)
+        ):
+            runs = slice(
+                self.pair_run_pointers[pair_index],
+                self.pair_run_pointers[pair_index + 1],
+            )
+            prices = np.repeat(self.run_prices[runs], self.run_quantities[runs])
+            seller_offers = sellers_offers[self.seller_ids[seller_index]]
+            seller_offers[self.card_ids[card_index]] = prices.tolist()
+        return sellers_offers
+
+
+class OfferMatrixBuilder:
+    """
+    Collects offers in any order and builds an OfferMatrix from them.
+    """
+
+    def __init__(self):
+        self._card_indices: dict[str, int] = {}
+        self._seller_indices: dict[str, int] = {}
+        self._offer_cards: list[int] = []
+        self._offer_sellers: list[int] = []
+        self._offer_prices: list[int] = []
+        self._offer_quantities: list[int] = []
+
+    def add_card(self, card_id: str) -> int:
+        return self._card_indices.setdefault(card_id, len(self._card_indices))
+
+    def add_seller(self, seller_id: str) -> int:
+        return self._seller_indices.setdefault(seller_id, len(self._seller_indices))
+
+    def add_offer(
+        self,
+        card_id: str,
+        seller_id: str,
+        price_euro_cents: int,
+        quantity: int = 1,
+    ):
+        self._offer_cards.append(self.add_card(card_id))
+        self._offer_sellers.append(self.add_seller(seller_id))
+        self._offer_prices.append(price_euro_cents)
+        self._offer_quantities.append(quantity)
+
+    def build(self) -> OfferMatrix:
+        cards = np.array(self._offer_cards, dtype=np.int32)
+        sellers = np.array(self._offer_sellers, dtype=np.int32)
+        prices = np.array(self._offer_prices, dtype=np.int64)
+        quantities = np.array(self._offer_quantities, dtype=np.int64)
+
+        order = np.lexsort((prices, sellers, cards))
+        cards, sellers, prices, quantities = (
+            cards[order],
+            sellers[order],
+            prices[order],
+            quantities[order],
+        )
+
+        # merge offers with the same price into a single run
+        is_new_pair = np.ones(len(order), dtype=bool)
+        is_new_pair[1:] = (np.diff(cards) != 0) | (np.diff(sellers) != 0)
+        is_new_run = is_new_pair.copy()
+        is_new_run[1:] |= np.diff(prices) != 0
+        run_starts = np.nonzero(is_new_run)[0]
+        run_quantities = (
+            np.add.reduceat(quantities, run_starts)
+            if len(run_starts) > 0
+            else np.array([], dtype=np.int64)
+        )
+
+        pair_starts = np.nonzero(is_new_pair)[0]
+        pair_cards = cards[pair_starts]
+        card_count = len(self._card_indices)
+
+        return OfferMatrix(
+            card_ids=list(self._card_indices.keys()),
+            seller_ids=list(self._seller_indices.keys()),
+            card_pair_pointers=np.searchsorted(
+                pair_cards, np.arange(card_count + 1)
+            ).astype(np.int64),
+            pair_sellers=sellers[pair_starts],
+            pair_run_pointers=np.append(
+                np.searchsorted(run_starts, pair_starts), len(run_starts)
+            ).astype(np.int64),
+            run_prices=prices[run_starts],
+            run_quantities=run_quantities,
+        )
+
+
+class SharedOfferMatrix:
+    """
+    An OfferMatrix materialized once into a named block of shared memory,
+    so other processes (e.g. solver workers) attach to it by name without copying.
+    The block starts with a JSON header of the card and seller ID tables and the
+    layout of the arrays, followed by the arrays, each aligned to 8 bytes.
+    The derived arrays are shared too, so attaching only maps the block and
+    indexes the IDs.
+
+    The offers are read-only views of the block. Pickling only pickles the name,
+    so passing a shared matrix to a worker process attaches it there.
+    The creator unlinks the block when leaving the context (or by unlink),
+    but attached processes keep it mapped until they close it.
+    """
+
+    def __init__(self, shared_memory: SharedMemory, is_owner: bool = False):
+        self._shared_memory = shared_memory
+        self._is_owner = is_owner
+        self._is_closed = False
+        self._is_unlinked = False
+        buffer = shared_memory.buf
+        assert buffer is not None, "The shared memory is closed."
+        header_size = int.from_bytes(buffer[:_HEADER_SIZE_BYTES], "little")
+        header = json.loads(
+            bytes(buffer[_HEADER_SIZE_BYTES : _HEADER_SIZE_BYTES + header_size])
+        )
+        data_offset = _align(_HEADER_SIZE_BYTES + header_size)
+        arrays: dict[str, np.ndarray] = {}
+        for name, dtype, shape, offset in header["arrays"]:
+            array = np.ndarray(
+                tuple(shape), dtype, buffer=buffer, offset=data_offset + offset
+            )
+            array.flags.writeable = False
+            arrays[name] = array
+        self.offers = OfferMatrix(
+            header["card_ids"],
+            header["seller_ids"],
+            **{name: arrays[name] for name in _ARRAY_NAMES},
+            derived_arrays={name: arrays[name] for name in _DERIVED_ARRAY_NAMES},
+        )
+
+    @property
+    def name(self) -> str:
+        return self._shared_memory.name
+
+    @classmethod
+    def create(cls, offers: OfferMatrix) -> "SharedOfferMatrix":
+        arrays = {
+            name: getattr(offers, name) for name in _ARRAY_NAMES + _DERIVED_ARRAY_NAMES
+        }
+        layout = []
+        data_size = 0
+        for name, array in arrays.items():
+            layout.append((name, array.dtype.str, array.shape, data_size))
+            data_size += _align(array.nbytes)
+        header = json.dumps(
+            {
+                "card_ids": offers.card_ids,
+                "seller_ids": offers.seller_ids,
+                "arrays": layout,
+            }
+        ).encode()
+        data_offset = _align(_HEADER_SIZE_BYTES + len(header))
+
+        shared_memory = SharedMemory(create=True, size=data_offset + data_size)
+        buffer = shared_memory.buf
+        assert buffer is not None, "The shared memory is closed."
+        buffer[:_HEADER_SIZE_BYTES] = len(header).to_bytes(_HEADER_SIZE_BYTES, "little")
+        buffer[_HEADER_SIZE_BYTES : _HEADER_SIZE_BYTES + len(header)] = header
+        for name, dtype, shape, offset in layout:
+            np.ndarray(shape, dtype, buffer=buffer, offset=data_offset + offset)[
+                :
+            ] = arrays[name]
+        return cls(shared_memory, is_owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedOfferMatrix":
+        return cls(SharedMemory(name=name))
+
+    def close(self):
+        """
+        Unmaps the block. The offers must not be used anymore.
+        Closing again does nothing.
+        """
+        if self._is_closed:
+            return
+        # views of the block prevent closing it
+        del self.offers
+        self._shared_memory.close()
+        self._is_closed = True
+
+    def unlink(self):
+        """
+        Unlinking again does nothing.
+        """
+        if self._is_unlinked:
+            return
+        self._shared_memory.unlink()
+        self._is_unlinked = True
+
+    def __enter__(self) -> "SharedOfferMatrix":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+        if self._is_owner:
+            self.unlink()
+
+    def __reduce__(self):
+        return SharedOfferMatrix.attach, (self.name,)
@@ -0,0 +1,151 @@
+from collections import Counter
+from typing import Iterable
+
+import numpy as np
+
+from cm_wizard.services.offer_matrix import OfferMatrix
+from cm_wizard.services.shipping_costs import ShippingCosts, shipping_cost_matrix
+from cm_wizard.services.solvers.wizard_result import WizardResult
+
+
+def _seller_surcharges(
+    wanted_cards: Iterable[str], offers: OfferMatrix
+) -> tuple[int, np.ndarray]:
+    """
+    Returns the price of the cheapest copies of all wanted cards and,
+    by seller and wanted card, how much more buying a copy from the seller costs.
+    The offers must be the cheapest offers of each card, like those of card pages.
+    Any other offer of a card costs at least as much as its most expensive known
+    offer, so each seller's cheapest known price (or that maximum) bounds what
+    its copies of the card cost. Cards without known offers are ignored.
+    """
+    card_demands = Counter(wanted_cards)
+    max_copies_per_card = np.zeros(offers.card_count, dtype=np.int64)
+    for card_id, demand in card_demands.items():
+        offers_card_index = offers.card_index(card_id)
+        if offers_card_index is not None:
+            max_copies_per_card[offers_card_index] = demand
+    wanted_card_indices = np.flatnonzero(max_copies_per_card)
+
+    copy_cards, _, copy_prices = offers.expand_copies(max_copies_per_card)
+    card_copy_pointers = np.searchsorted(copy_cards, np.arange(offers.card_count + 1))
+    card_run_pointers = offers.pair_run_pointers[offers.card_pair_pointers]
+
+    base_price = 0
+    # the price of the most expensive copy a buyer needs of each card
+    last_copy_prices = np.zeros(offers.card_count, dtype=np.int64)
+    max_prices = np.zeros(offers.card_count, dtype=np.int64)
+    for card_index in wanted_card_indices:
+        max_prices[card_index] = offers.run_prices[
+            card_run_pointers[card_index] : card_run_pointers[card_index + 1]
+        ].max()
+        demand = max_copies_per_card[card_index]
+        copy_range = slice(
+            card_copy_pointers[card_index], card_copy_pointers[card_index + 1]
+        )
+        prices = np.sort(copy_prices[copy_range])[:demand]
+        # copies that are not known cost at least the most expensive known offer
+        prices = np.concatenate(
+            (prices, np.full(demand - len(prices), max_prices[card_index]))
+        )
+        base_price += int(prices.sum())
+        last_copy_prices[card_index] = prices[-1]
+
+    # the cheapest price of each seller's first copy, if it is known
+    seller_prices = np.tile(max_prices, (offers.seller_count, 1))
+    seller_prices[offers.pair_sellers, offers.pair_cards] = offers.run_prices[
+        offers.pair_run_pointers[:-1]
+    ]
+    # buying a copy from the seller instead of the most expensive needed copy
+    surcharges = np.maximum(
+        seller_prices[:, wanted_card_indices] - last_copy_prices[wanted_card_indices],
+        0,
+    )
+    return base_price, surcharges
+
+
+def seller_lower_bounds(
+    wanted_cards: Iterable[str],
+    offers: OfferMatrix,
+    shipping_cost: int | ShippingCosts,
+) -> np.ndarray:
+    """
+    Returns a lower bound on the total price of every combination that buys
+    at least one card from a seller, by seller index.
+    The offers must be the cheapest offers of each card, like those of card pages.
+    Shipping is bounded by the cheapest tier of each seller.
+    """
+    min_shipping_costs = shipping_cost_matrix(
+        shipping_cost, offers.seller_ids
+    ).min_costs
+    base_price, surcharges = _seller_surcharges(wanted_cards, offers)
+    if surcharges.size == 0:
+        return min_shipping_costs.copy()
+    # either the seller sells every card, or at least one other seller is needed
+    return (
+        base_price
+        + min_shipping_costs
+        + np.minimum(
+            surcharges.sum(axis=1),
+            surcharges.min(axis=1) + min_shipping_costs.min(),
+        )
+    )
+
+
+def rank_seller_ids(
+    wanted_cards: Iterable[str],
+    offers: OfferMatrix,
+    shipping_cost: int | ShippingCosts,
+    seller_ids: Iterable[str],
+) -> list[str]:
+    """
+    Returns the seller_ids, those expected to save the most first:
+    Sellers with the lowest lower bound, then those offering the most wanted cards,
+    then those with the lowest surcharges over the cheapest offers.
+    Sellers without known offers come last.
+    """
+    wanted_cards = list(wanted_cards)
+    lower_bounds = seller_lower_bounds(wanted_cards, offers, shipping_cost)
+    _, surcharges = _seller_surcharges(wanted_cards, offers)
+    total_surcharges = surcharges.sum(axis=1)
+    card_counts = offers.seller_card_counts()
+
+    def rank(seller_id: str) -> tuple:
+        seller_index = offers.seller_index(seller_id)
+        if seller_index is None:
+            return (1, 0, 0, 0, seller_id)
+        return (
+            0,
+            int(lower_bounds[seller_index]),
+            -int(card_counts[seller_index]),
+            int(total_surcharges[seller_index]),
+            seller_id,
+        )
+
+    return sorted(seller_ids, key=rank)
+
+
+def find_prunable_seller_ids(
+    wanted_cards: Iterable[str],
+    offers: OfferMatrix,
+    shipping_cost: int | ShippingCosts,
+    best_result: WizardResult,
+) -> set[str]:
+    """
+    Returns the IDs of sellers, which are not part of the best_result
+    and cannot be part of any cheaper combination.
+    Nothing can be pruned, if the best_result misses cards that have offers,
+    because combinations buying more cards may be more expensive.
+    """
+    if any(
+        offers.card_index(card_id) is not None for card_id in best_result.missing_cards
+    ):
+        return set()
+
+    lower_bounds = seller_lower_bounds(wanted_cards, offers, shipping_cost)
+    return {
+        seller_id
+        for seller_id, lower_bound in zip(offers.seller_ids, lower_bounds)
+        if lower_bound >= best_result.total_price
+        and seller_id not in best_result.sellers
+    }
@@ -0,0 +1,222 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Mapping
+
+import numpy as np
+
+from cm_wizard.services.cardmarket.enums.location import Location
+
+DEFAULT_TARIFFS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "data", "shipping_tariffs.json"
+)
+
+
+@dataclass(frozen=True)
+class ShippingTier:
+    """
+    A shipping method, which can be used up to a number of items and a value.
+    """
+
+    name: str
+    max_item_count: int | None
+    max_value_euro_cents: int | None
+    is_tracked: bool
+
+
+class ShippingTiers:
+    """
+    The shipping tiers, cheapest first. A shipment uses the first tier it fits.
+    """
+
+    def __init__(self, tiers: list[ShippingTier]):
+        self.tiers = tiers
+        self._max_item_counts = np.array(
+            [tier.max_item_count or np.iinfo(np.int64).max for tier in tiers]
+        )
+        self._max_values = np.array(
+            [tier.max_value_euro_cents or np.iinfo(np.int64).max for tier in tiers]
+        )
+
+    def __len__(self) -> int:
+        return len(self.tiers)
+
+    def tier_indices(self, item_counts: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """
+        Returns the tier index of each shipment. Shipments exceeding all tiers
+        use the last one.
+        """
+        fits = (item_counts[:, None] <= self._max_item_counts) & (
+            values[:, None] <= self._max_values
+        )
+        return np.where(fits.any(axis=1), fits.argmax(axis=1), len(self.tiers) - 1)
+
+
+@dataclass(frozen=True)
+class ShippingTariff:
+    """
+    A seller's shipping price for each tier, in the order of the tiers.
+    """
+
+    tier_prices: tuple[int, ...]
+
+    @classmethod
+    def constant(cls, price_euro_cents: int) -> "ShippingTariff":
+        return cls((price_euro_cents,))
+
+
+class ShippingCostMatrix:
+    """
+    Dense shipping prices by seller index (e.g. of an OfferMatrix) and tier,
+    so solvers can look up the price of a shipment in constant time.
+    """
+
+    def __init__(self, tiers: ShippingTiers, tier_prices: np.ndarray):
+        self.tiers = tiers
+        self.tier_prices = tier_prices
+        # bounds the price of any shipment of each seller
+        self.min_costs: np.ndarray = tier_prices.min(axis=1)
+
+    def costs(
+        self, seller_indices: np.ndarray, item_counts: np.ndarray, values: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns the shipping price of each seller's shipment.
+        """
+        return self.tier_prices[
+            seller_indices, self.tiers.tier_indices(item_counts, values)
+        ]
+
+    def cost(self, seller_index: int, item_count: int, value_euro_cents: int) -> int:
+        return int(
+            self.costs(
+                np.array([seller_index]),
+                np.array([item_count]),
+                np.array([value_euro_cents]),
+            )[0]
+        )
+
+    def total_cost(self, sellers: Mapping[int, list[int]]) -> int:
+        """
+        Returns the shipping price of all shipments, given their items' prices
+        by seller index.
+        """
+        seller_indices = np.array(list(sellers.keys()), dtype=np.int64)
+        if len(seller_indices) == 0:
+            return 0
+        return int(
+            self.costs(
+                seller_indices,
+                np.array([len(prices) for prices in sellers.values()]),
+                np.array([sum(prices) for prices in sellers.values()]),
+            ).sum()
+        )
+
+
+class ShippingCosts:
+    """
+    The shipping tariff of each seller, with a default for all other sellers.
+    """
+
+    def __init__(
+        self,
+        tiers: ShippingTiers,
+        seller_tariffs: Mapping[str, ShippingTariff],
+        default_tariff: ShippingTariff,
+    ):
+        self.tiers = tiers
+        self.seller_tariffs = seller_tariffs
+        self.default_tariff = default_tariff
+
+    @classmethod
+    def constant(cls, price_euro_cents: int) -> "ShippingCosts":
+        """
+        Every shipment costs the same, regardless of the seller and its size.
+        """
+        tier = ShippingTier(
+            name="any", max_item_count=None, max_value_euro_cents=None, is_tracked=False
+        )
+        return cls(ShippingTiers([tier]), {}, ShippingTariff.constant(price_euro_cents))
+
+    def to_matrix(self, seller_ids: list[str]) -> ShippingCostMatrix:
+        tier_prices = np.array(
+            [
+                self.seller_tariffs.get(seller_id, self.default_tariff).tier_prices
+                for seller_id in seller_ids
+            ],
+            dtype=np.int64,
+        ).reshape((len(seller_ids), len(self.tiers)))
+        return ShippingCostMatrix(self.tiers, tier_prices)
+
+
+def shipping_cost_matrix(
+    shipping_cost: int | ShippingCosts, seller_ids: list[str]
+) -> ShippingCostMatrix:
+    """
+    Returns the shipping prices of the sellers, which may all be the same.
+    """
+    if isinstance(shipping_cost, ShippingCosts):
+        return shipping_cost.to_matrix(seller_ids)
+    return ShippingCosts.constant(shipping_cost).to_matrix(seller_ids)
+
+
+class ShippingTariffTable:
+    """
+    Shipping tariffs by the country of origin, for domestic and international
+    shipments, loaded from a JSON file. The prices are estimates of what sellers
+    charge for each tier. Countries without tariffs use the default.
+    """
+
+    def __init__(
+        self,
+        tiers: ShippingTiers,
+        default_tariffs: dict[str, ShippingTariff],
+        origin_tariffs: dict[str, dict[str, ShippingTariff]],
+    ):
+        self.tiers = tiers
+        self._default_tariffs = default_tariffs
+        self._origin_tariffs = origin_tariffs
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_TARIFFS_PATH) -> "ShippingTariffTable":
+        with open(path, "r") as f:
+            table = json.load(f)
+
+        def load_tariffs(tariffs: dict[str, list[int]]) -> dict[str, ShippingTariff]:
+            for name, prices in tariffs.items():
+                assert len(prices) == len(
+                    table["tiers"]
+                ), f'Tariff "{name}" in "{path}" does not match the tiers.'
+            return {
+                name: ShippingTariff(tuple(prices)) for name, prices in tariffs.items()
+            }
+
+        return cls(
+            tiers=ShippingTiers([ShippingTier(**tier) for tier in table["tiers"]]),
+            default_tariffs=load_tariffs(table["default"]),
+            origin_tariffs={
+                origin: load_tariffs(tariffs)
+                for origin, tariffs in table["origins"].items()
+            },
+        )
+
+    def tariff(self, origin: Location | None, destination: Location) -> ShippingTariff:
+        """
+        Shipments of unknown origin are priced as international.
+        """
+        tariffs = self._default_tariffs
+        if origin is not None:
+            tariffs = self._origin_tariffs.get(origin.value, tariffs)
+        return tariffs["domestic" if origin == destination else "international"]
+
+    def shipping_costs(
+        self, seller_locations: Mapping[str, Location | None], destination: Location
+    ) -> ShippingCosts:
+        return ShippingCosts(
+            self.tiers,
+            {
+                seller_id: self.tariff(location, destination)
+                for seller_id, location in seller_locations.items()
+            },
+            self.tariff(None, destination),
+        )
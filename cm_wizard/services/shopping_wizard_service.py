@@ -1,10 +1,18 @@
 import logging
-from dataclasses import dataclass, field
-from typing import Any, Iterator, TypeVar
+from collections import Counter
+from enum import Enum, auto
+from typing import Any, Iterable, Iterator, TypeVar
 
 import numpy as np
 
 from cm_wizard.services.currency import format_price
+from cm_wizard.services.metrics import metrics
+from cm_wizard.services.offer_matrix import OfferMatrix, SharedOfferMatrix
+from cm_wizard.services.shipping_costs import ShippingCosts, shipping_cost_matrix
+from cm_wizard.services.solvers.branch_and_bound_solver import BranchAndBoundSolver
+from cm_wizard.services.solvers.local_search_solver import LocalSearchSolver
+from cm_wizard.services.solvers.multi_start_solver import MultiStartSolver
+from cm_wizard.services.solvers.wizard_result import WizardResult
 
 _logger = logging.getLogger(__name__)
 _logger.setLevel(logging.DEBUG)
@@ -14,156 +22,347 @@ T = TypeVar("T")
 max_price = np.iinfo(np.int32).max // 2
 
 
-@dataclass
-class WizardResult:
-    total_price: int
-    sellers: dict[str, list[tuple[str, int]]]
-    missing_cards: list[str] = field(default_factory=list)
+class WizardSolver(Enum):
+    DYNAMIC_PROGRAMMING = auto()
+    BRANCH_AND_BOUND = auto()
+    MULTI_START = auto()
 
 
 def create_matrix(col_count: int, row_count: int, initial_value: T) -> list[list[T]]:
     return [[initial_value] * col_count] * row_count
 
 
-def unique(lst: list[T]) -> Iterator[T]:
-    """
-    Returns an iterator with unique elements.
-    Preserves the order of elements (in contrast to a set).
-    """
-    used = set()
-    for e in lst:
-        if e not in used:
-            used.add(e)
-            yield e
-
-
-purchase_type = tuple[str, str]
-purchase_history_type = list[purchase_type]
+# the copy counts bought of a card by seller index
+purchases_type = list[tuple[int, int]]
 
 
 class ShoppingWizardService:
-    # TODO: handle shipping costs
     def find_best_offers(
         self,
-        wanted_cards: set[str],
-        sellers: dict[str, dict[str, list[int]]],
-        shipping_cost: int = 0,
+        wanted_cards: Iterable[str],
+        sellers: dict[str, dict[str, list[int]]] | OfferMatrix | SharedOfferMatrix,
+        shipping_cost: int | ShippingCosts = 0,
+        solver: WizardSolver = WizardSolver.DYNAMIC_PROGRAMMING,
+        time_budget_seconds: float | None = None,
+        initial_result: WizardResult | None = None,
     ) -> WizardResult:
         """
         Returns (one of) the best combinations of cards to buy from sellers
         in order to buy all wanted_cards.
-        The wanted_cards may contain duplicates.
-        The seller offers for each card must be sorted ascendingly by price.
+        The wanted_cards may contain duplicates to want multiple copies of a card.
+        The seller offers for each card must be sorted ascendingly by price,
+        unless they are passed as an OfferMatrix, which is always sorted.
+        A SharedOfferMatrix lets the multi-start solver's workers attach to it,
+        instead of sharing the offers for this call only.
+        Shipping costs either the same for every seller or according to the
+        sellers' tariffs. Tariffs are approximated by their cheapest tier while
+        searching, but the total price of the result is exact.
+        The branch and bound solver is seeded with the dynamic programming result
+        and stops after time_budget_seconds with the best combination found so far.
+        It is warm-started from the sellers of the initial_result, if given
+        and cheaper.
+        The multi-start solver improves the dynamic programming result,
+        the initial_result and randomized combinations by local search in parallel
+        worker processes, which stop after time_budget_seconds. It suits very large
+        instances, for which branch and bound cannot prove optimality in time.
         """
+        wanted_cards = list(wanted_cards)
+        if isinstance(sellers, SharedOfferMatrix):
+            offers = sellers.offers
+        elif isinstance(sellers, OfferMatrix):
+            offers = sellers
+        else:
+            offers = OfferMatrix.from_sellers_offers(sellers)
+        with metrics.timer("solve", solver=solver.name):
+            result = self._find_best_offers_dynamic_programming(
+                wanted_cards, offers, shipping_cost
+            )
+            initial_results = [result] + (
+                [] if initial_result is None else [initial_result]
+            )
+            if solver == WizardSolver.BRANCH_AND_BOUND:
+                result = BranchAndBoundSolver(
+                    wanted_cards, offers, shipping_cost
+                ).solve(
+                    initial_results=initial_results,
+                    time_budget_seconds=time_budget_seconds,
+                )
+            elif solver == WizardSolver.MULTI_START:
+                result = MultiStartSolver(
+                    wanted_cards,
+                    sellers if isinstance(sellers, SharedOfferMatrix) else offers,
+                    shipping_cost,
+                ).solve(
+                    initial_results=initial_results,
+                    time_budget_seconds=time_budget_seconds,
+                )
+
+        _logger.info(f"best total price: {format_price(result.total_price)}")
+        return result
 
+    def find_best_offers_anytime(
+        self,
+        wanted_cards: Iterable[str],
+        sellers: dict[str, dict[str, list[int]]] | OfferMatrix,
+        shipping_cost: int | ShippingCosts = 0,
+        time_budget_seconds: float | None = None,
+        initial_result: WizardResult | None = None,
+    ) -> Iterator[WizardResult]:
+        """
+        Yields increasingly better combinations, so they can be shown early:
+        Buying every card at its cheapest offer first, then the dynamic programming
+        result, then every improvement of the branch and bound solver until it is
+        optimal or time_budget_seconds have passed. The last one is the best.
+        Combinations missing fewer cards are better, regardless of their price.
+        """
+        wanted_cards = list(wanted_cards)
+        offers = (
+            sellers
+            if isinstance(sellers, OfferMatrix)
+            else OfferMatrix.from_sellers_offers(sellers)
+        )
+        solver = BranchAndBoundSolver(wanted_cards, offers, shipping_cost)
+        best_result = solver.greedy_result()
+        yield best_result
+
+        def is_better(result: WizardResult) -> bool:
+            return (len(result.missing_cards), result.total_price) < (
+                len(best_result.missing_cards),
+                best_result.total_price,
+            )
+
+        dynamic_programming_result = self._find_best_offers_dynamic_programming(
+            wanted_cards, offers, shipping_cost
+        )
+        if is_better(dynamic_programming_result):
+            best_result = dynamic_programming_result
+            yield best_result
+
+        for result in solver.solve_iteratively(
+            initial_results=[best_result]
+            + ([] if initial_result is None else [initial_result]),
+            time_budget_seconds=time_budget_seconds,
+        ):
+            if is_better(result):
+                best_result = result
+                yield best_result
+        _logger.info(f"best total price: {format_price(best_result.total_price)}")
+
+    def improve_offers(
+        self,
+        wanted_cards: Iterable[str],
+        sellers: dict[str, dict[str, list[int]]] | OfferMatrix,
+        result: WizardResult,
+        shipping_cost: int | ShippingCosts = 0,
+        time_budget_seconds: float | None = None,
+    ) -> WizardResult:
+        """
+        Returns a combination buying the same cards as the result for at most
+        its price, found by moving cards between sellers.
+        The search stops after time_budget_seconds with the best combination so far.
+        """
+        offers = (
+            sellers
+            if isinstance(sellers, OfferMatrix)
+            else OfferMatrix.from_sellers_offers(sellers)
+        )
+        with metrics.timer("local_search"):
+            return LocalSearchSolver(wanted_cards, offers, shipping_cost).improve(
+                result, time_budget_seconds
+            )
+
+    def _find_best_offers_dynamic_programming(
+        self,
+        wanted_cards: Iterable[str],
+        offers: OfferMatrix,
+        shipping_cost: int | ShippingCosts,
+    ) -> WizardResult:
+        """
+        Each cell of the tables represents buying all wanted copies of a card (row),
+        at least one of them from a seller (column), based on the best previous cell.
+        The other copies are bought cheapest first, preferring sellers whose
+        shipping is already paid.
+        Copies from a seller are priced in closed form by the offer matrix,
+        so wanting more copies of a card does not add rows.
+        Instead of the full purchase history, each cell only stores a pointer to its
+        previous cell, a bitset of sellers whose shipping is already paid and
+        the copy counts bought per seller for its card.
+        The history of the best cell is reconstructed once at the end.
+        Each seller's shipping is approximated by its cheapest tier.
+        """
+        shipping_costs = shipping_cost_matrix(shipping_cost, offers.seller_ids)
+        card_demands = Counter(wanted_cards)
+        wanted_list = list(card_demands.keys())
         result_sellers: dict[str, list[tuple[str, int]]] = {
-            id: [] for id, _ in sellers.items()
+            id: [] for id in offers.seller_ids
         }
         missing_cards: list[str] = []
 
         # + 1 row to check the previous card without a conditional
-        price_table: np.ndarray[Any, np.dtype[np.int_]] = np.full(
-            (len(wanted_cards) + 1, len(sellers)),
-            max_price,
-        )
+        shape = (len(wanted_list) + 1, offers.seller_count)
+        price_table: np.ndarray[Any, np.dtype[np.int_]] = np.full(shape, max_price)
         price_table[0][0] = 0  # initial price
-        # numpy type hints suck right now. This is a matrix of purchase_history_type.
-        purchase_history_table: np.ndarray = np.empty(
-            (len(wanted_cards) + 1, len(sellers)),
-            dtype=object,
+        parent_card_table = np.zeros(shape, dtype=np.int32)
+        parent_seller_table = np.zeros(shape, dtype=np.int32)
+        # one bit per seller, packed into bytes
+        paid_sellers_table = np.zeros(
+            (*shape, (offers.seller_count + 7) // 8), dtype=np.uint8
         )
-        purchase_history_table.fill([])
-
-        def additional_seller_shipping_cost(
-            seller_id: str,
-            purchase_history: purchase_history_type,
-        ) -> int:
-            purchases_with_seller = filter(
-                lambda purchase: purchase[0] == seller_id, purchase_history
-            )
-            is_seller_in_history = any(purchases_with_seller)
-            return 0 if is_seller_in_history else shipping_cost
+        # numpy type hints suck right now. This is a matrix of purchases_type.
+        purchases_table: np.ndarray = np.empty(shape, dtype=object)
+
+        def is_seller_paid(card_index: int, seller_index: int) -> np.ndarray:
+            packed = paid_sellers_table[card_index, :, seller_index >> 3]
+            return (packed >> (seller_index & 7)) & 1
 
         def get_best_seller_index(
-            card_index: int, seller_id: str | None
+            card_index: int, seller_index: int | None
         ) -> np.signedinteger:
             card_prices = price_table[card_index]
-            if seller_id is None:
+            if seller_index is None:
                 return np.argmin(card_prices)
 
-            histories = purchase_history_table[card_index]
-            shipping_costs = np.array(
-                [
-                    additional_seller_shipping_cost(seller_id, history)
-                    for history in histories
-                ]
+            seller_shipping_costs = (1 - is_seller_paid(card_index, seller_index)) * (
+                shipping_costs.min_costs[seller_index]
             )
-            return np.argmin(card_prices + shipping_costs)
+            return np.argmin(card_prices + seller_shipping_costs)
 
         def get_base_indices(
-            prev_card_index: int, seller_id: str | None
-        ) -> tuple[int, np.signedinteger]:
+            prev_card_index: int, seller_index: int | None
+        ) -> tuple[int, int]:
             base_card_index = prev_card_index
             while True:
-                base_seller_index = get_best_seller_index(base_card_index, seller_id)
+                base_seller_index = int(
+                    get_best_seller_index(base_card_index, seller_index)
+                )
                 if price_table[base_card_index][base_seller_index] != max_price:
                     return base_card_index, base_seller_index
                 base_card_index -= 1
 
-        for prev_card_index, card_id in enumerate(wanted_cards):
+        for prev_card_index, card_id in enumerate(wanted_list):
             card_index = prev_card_index + 1
-            card_found = False
-            for seller_index, (seller_id, seller_offers) in enumerate(sellers.items()):
-                if card_id not in seller_offers:
-                    continue  # seller does not offer the card
+            demand = card_demands[card_id]
+            offers_card_index = offers.card_index(card_id)
+            if offers_card_index is None:
+                missing_cards += [card_id] * demand
+                continue  # no seller offers the card
+
+            pairs = offers.card_pairs(offers_card_index)
+            card_sellers = offers.pair_sellers[pairs.start : pairs.stop]
+            bought_count = min(
+                demand, int(offers.pair_copy_counts[pairs.start : pairs.stop].sum())
+            )
+            missing_cards += [card_id] * (demand - bought_count)
 
+            # the copies sellers could add, sorted by seller and price
+            runs = slice(
+                offers.pair_run_pointers[pairs.start],
+                offers.pair_run_pointers[pairs.stop],
+            )
+            run_take = np.clip(
+                bought_count - offers.run_copy_offsets[runs],
+                0,
+                offers.run_quantities[runs],
+            )
+            copy_sellers = np.repeat(
+                offers.pair_sellers[offers.run_pairs[runs]], run_take
+            )
+            copy_prices = np.repeat(offers.run_prices[runs], run_take)
+
+            for seller_index in map(int, card_sellers):
                 (base_card_index, base_seller_index) = get_base_indices(
-                    prev_card_index, seller_id
+                    prev_card_index, seller_index
                 )
-                base_card_price = price_table[base_card_index][base_seller_index]
-                base_purchase_history: purchase_history_type = purchase_history_table[
-                    base_card_index
-                ][base_seller_index]
+                base_paid_sellers = paid_sellers_table[base_card_index][
+                    base_seller_index
+                ]
+                purchases: purchases_type = [(seller_index, 1)]
+                if bought_count > 1:
+                    # the seller's first copy is bought, its other copies compete
+                    # with the others' and shipping of unpaid sellers is charged
+                    # per copy to rank them
+                    is_paid = np.unpackbits(base_paid_sellers, bitorder="little")[
+                        copy_sellers
+                    ]
+                    is_paid[copy_sellers == seller_index] = 1
+                    copy_keys = copy_prices + (1 - is_paid) * (
+                        shipping_costs.min_costs[copy_sellers]
+                    )
+                    copy_keys[np.searchsorted(copy_sellers, seller_index)] = max_price
+                    copy_order = np.argsort(copy_keys, kind="stable")[
+                        : bought_count - 1
+                    ]
+                    seller_counts = Counter({seller_index: 1})
+                    seller_counts.update(map(int, copy_sellers[copy_order]))
+                    purchases = list(seller_counts.items())
 
-                purchase = (seller_id, card_id)
-                purchase_count = base_purchase_history.count(purchase)
-                if len(seller_offers[card_id]) <= purchase_count:
-                    continue  # seller does not offer the card often enough
+                price = int(price_table[base_card_index][base_seller_index])
+                paid_sellers = paid_sellers_table[card_index][seller_index]
+                paid_sellers[:] = base_paid_sellers
+                for purchase_seller_index, count in purchases:
+                    copies_price = offers.copies_price(
+                        offers_card_index, purchase_seller_index, count
+                    )
+                    assert copies_price is not None
+                    price += copies_price
+                    is_purchase_seller_paid = (
+                        paid_sellers[purchase_seller_index >> 3]
+                        >> (purchase_seller_index & 7)
+                    ) & 1
+                    if not is_purchase_seller_paid:
+                        price += shipping_costs.min_costs[purchase_seller_index]
+                    paid_sellers[purchase_seller_index >> 3] |= 1 << (
+                        purchase_seller_index & 7
+                    )
+                price_table[card_index][seller_index] = price
+                parent_card_table[card_index][seller_index] = base_card_index
+                parent_seller_table[card_index][seller_index] = base_seller_index
+                purchases_table[card_index][seller_index] = purchases
 
-                seller_offer = seller_offers[card_id][purchase_count]
+        (card_index, seller_index) = get_base_indices(len(wanted_list), None)
 
-                additional_shipping_cost = additional_seller_shipping_cost(
-                    seller_id, base_purchase_history
-                )
-                price = base_card_price + seller_offer + additional_shipping_cost
-                price_table[card_index][seller_index] = price
-                purchase_history_table[card_index][
-                    seller_index
-                ] = base_purchase_history + [purchase]
-                card_found = True
-            if not card_found:
-                missing_cards.append(card_id)
-
-        (result_card_index, result_seller_index) = get_base_indices(-1, None)
-        total_price = price_table[result_card_index][result_seller_index]
-        purchase_history: purchase_history_type = purchase_history_table[
-            result_card_index
-        ][result_seller_index]
-
-        for seller_id, card_id in unique(purchase_history):
-            purchase = (seller_id, card_id)
-            count = purchase_history.count(purchase)
-            for i in range(count):
-                result_sellers[seller_id].append(
-                    (card_id, sellers[seller_id][card_id][i])
-                )
+        purchase_history: list[tuple[int, purchases_type]] = []
+        while card_index > 0:
+            purchase_history.append(
+                (card_index - 1, purchases_table[card_index][seller_index])
+            )
+            card_index, seller_index = (
+                parent_card_table[card_index][seller_index],
+                parent_seller_table[card_index][seller_index],
+            )
+        purchase_history.reverse()
+
+        for wanted_index, purchases in purchase_history:
+            card_id = wanted_list[wanted_index]
+            offers_card_index = offers.card_index(card_id)
+            assert offers_card_index is not None
+            for purchase_seller_index, count in purchases:
+                seller_id = offers.seller_ids[purchase_seller_index]
+                for i in range(count):
+                    copy_price = offers.copy_price(
+                        offers_card_index, purchase_seller_index, i
+                    )
+                    assert copy_price is not None
+                    result_sellers[seller_id].append((card_id, copy_price))
 
-        _logger.info(f"best total price: {format_price(total_price)}")
+        sellers = {
+            id: offers for id, offers in result_sellers.items() if len(offers) > 0
+        }
+        shipping_price = shipping_costs.total_cost(
+            {
+                seller_index: [price for _, price in result_sellers[seller_id]]
+                for seller_index, seller_id in enumerate(offers.seller_ids)
+                if seller_id in sellers
+            }
+        )
         return WizardResult(
-            total_price=total_price,
-            sellers={
-                id: offers for id, offers in result_sellers.items() if len(offers) > 0
-            },
+            total_price=sum(
+                price
+                for seller_offers in sellers.values()
+                for _, price in seller_offers
+            )
+            + shipping_price,
+            sellers=sellers,
             missing_cards=missing_cards,
         )
 
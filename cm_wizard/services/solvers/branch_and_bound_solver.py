@@ -0,0 +1,273 @@
+import heapq
+import logging
+import time
+from collections import Counter
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+from cm_wizard.services.offer_matrix import OfferMatrix
+from cm_wizard.services.shipping_costs import ShippingCosts, shipping_cost_matrix
+from cm_wizard.services.solvers.wizard_result import WizardResult
+
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.DEBUG)
+
+_CLOSED = 0
+_OPEN = 1
+_FREE = 2
+
+
+class BranchAndBoundSolver:
+    """
+    Models the shopping problem as an uncapacitated facility location problem.
+    Sellers are facilities with a fixed cost (shipping),
+    every wanted copy of a card is a customer that is served by one offered copy.
+
+    Sellers are branched on being open (shipping is paid) or closed.
+    Each node is bounded by the LP relaxation of the aggregated formulation,
+    in which a free seller's shipping is spread over all copies it could supply.
+    That relaxation decomposes by card, so it is solved greedily.
+    Bounds use each seller's cheapest shipping tier, while combinations are
+    evaluated with the tiers of their actual shipments.
+    """
+
+    def __init__(
+        self,
+        wanted_cards: Iterable[str],
+        offers: OfferMatrix,
+        shipping_cost: int | ShippingCosts = 0,
+    ):
+        self._wanted_cards = list(wanted_cards)
+        requested = Counter(self._wanted_cards)
+        self._card_ids = list(requested.keys())
+        self._card_indices = {
+            card_id: index for index, card_id in enumerate(self._card_ids)
+        }
+        self._seller_ids = offers.seller_ids
+        self._shipping_costs = shipping_cost_matrix(shipping_cost, offers.seller_ids)
+
+        card_count = len(self._card_ids)
+        seller_count = len(self._seller_ids)
+        # maps the card indices of the offers to the indices of wanted cards
+        card_mapping = np.full(offers.card_count, -1, dtype=np.int64)
+        max_copies_per_card = np.zeros(offers.card_count, dtype=np.int64)
+        for card_index, card_id in enumerate(self._card_ids):
+            offers_card_index = offers.card_index(card_id)
+            if offers_card_index is not None:
+                card_mapping[offers_card_index] = card_index
+                max_copies_per_card[offers_card_index] = requested[card_id]
+        copy_cards, copy_sellers, copy_prices = offers.expand_copies(
+            max_copies_per_card
+        )
+        copy_cards = card_mapping[copy_cards]
+
+        # sorted by card, then price, then seller
+        order = np.lexsort((copy_sellers, copy_prices, copy_cards))
+        self._copy_card = copy_cards[order]
+        self._copy_price = copy_prices[order].astype(np.int64)
+        self._copy_seller = copy_sellers[order].astype(np.int64)
+
+        available = np.bincount(self._copy_card, minlength=card_count)
+        requested_counts = np.array(
+            [requested[card_id] for card_id in self._card_ids], dtype=np.int64
+        )
+        self._demand = np.minimum(requested_counts, available)
+
+        seller_card_copies = np.bincount(
+            self._copy_seller * card_count + self._copy_card,
+            minlength=seller_count * card_count,
+        ).reshape((seller_count, card_count))
+        # the maximum number of wanted copies each seller could supply
+        self._seller_capacity = np.minimum(seller_card_copies, self._demand).sum(axis=1)
+
+    def greedy_result(self) -> WizardResult:
+        """
+        Returns the combination buying every copy at its cheapest offer,
+        regardless of shipping costs.
+        """
+        return self._to_result(np.ones(len(self._seller_ids), dtype=bool))
+
+    def solve(
+        self,
+        initial_results: Iterable[WizardResult] = (),
+        time_budget_seconds: float | None = None,
+    ) -> WizardResult:
+        """
+        Returns the best combination found within the time budget.
+        The best of the initial_results (e.g. from the dynamic program or a previous
+        run) seeds the upper bound.
+        """
+        result: WizardResult | None = None
+        for result in self.solve_iteratively(initial_results, time_budget_seconds):
+            pass
+        assert result is not None
+        return result
+
+    def solve_iteratively(
+        self,
+        initial_results: Iterable[WizardResult] = (),
+        time_budget_seconds: float | None = None,
+    ) -> Iterator[WizardResult]:
+        """
+        Same as solve, but yields the best of the initial_results and then every
+        better combination as soon as it is found. The last one is the best.
+        """
+        deadline = (
+            None
+            if time_budget_seconds is None
+            else time.monotonic() + time_budget_seconds
+        )
+        seller_count = len(self._seller_ids)
+
+        best_price = np.inf
+        best_open = np.zeros(seller_count, dtype=bool)
+        for initial_result in initial_results:
+            seed_open = np.array(
+                [seller_id in initial_result.sellers for seller_id in self._seller_ids],
+                dtype=bool,
+            )
+            seed_price = self._evaluate(seed_open)
+            if seed_price is not None and seed_price < best_price:
+                best_price, best_open = seed_price, seed_open
+        if best_price < np.inf:
+            yield self._to_result(best_open)
+
+        root = np.full(seller_count, _FREE, dtype=np.int8)
+        # entries are (parent bound, insertion counter, seller states)
+        queue: list[tuple[float, int, np.ndarray]] = [(0, 0, root)]
+        node_count = 0
+        is_optimal = True
+        while queue:
+            if deadline is not None and time.monotonic() > deadline:
+                is_optimal = False
+                break
+
+            parent_bound, _, states = heapq.heappop(queue)
+            if parent_bound >= best_price:
+                continue
+            node_count += 1
+
+            relaxation = self._bound(states)
+            if relaxation is None:
+                continue  # closing sellers made the wanted cards unavailable
+            bound, usage = relaxation
+            # all prices are integers, so the bound can be rounded up
+            if np.ceil(bound - 1e-9) >= best_price:
+                continue
+
+            candidate_open = (states == _OPEN) | ((states == _FREE) & (usage > 0))
+            candidate_price = self._evaluate(candidate_open)
+            if candidate_price is not None and candidate_price < best_price:
+                best_price, best_open = candidate_price, candidate_open
+                yield self._to_result(best_open)
+
+            fractional = np.nonzero((states == _FREE) & (usage > 0) & (usage < 1))[0]
+            if len(fractional) == 0:
+                continue  # the relaxation is integral, so the candidate is optimal
+            branch_index = fractional[np.argmax(usage[fractional])]
+            for state in [_OPEN, _CLOSED]:
+                child = states.copy()
+                child[branch_index] = state
+                heapq.heappush(queue, (bound, node_count * 2 + state, child))
+
+        _logger.info(
+            f"branch and bound explored {node_count} nodes"
+            f"{'' if is_optimal else ', time budget exceeded'}."
+        )
+        if best_price == np.inf:
+            yield self._to_result(best_open)
+
+    def _select(self, copy_indices: np.ndarray) -> np.ndarray | None:
+        """
+        Returns the indices of the cheapest copies for each card's demand,
+        or None if the given copies cannot satisfy the demand.
+        The copy_indices must be sorted by card and by cost within each card.
+        """
+        cards = self._copy_card[copy_indices]
+        starts = np.searchsorted(cards, np.arange(len(self._card_ids)))
+        ranks = np.arange(len(copy_indices)) - starts[cards]
+        chosen = copy_indices[ranks < self._demand[cards]]
+        counts = np.bincount(self._copy_card[chosen], minlength=len(self._card_ids))
+        if np.any(counts < self._demand):
+            return None
+        return chosen
+
+    def _evaluate(self, is_open: np.ndarray) -> int | None:
+        chosen = self._select(np.nonzero(is_open[self._copy_seller])[0])
+        if chosen is None:
+            return None
+        return int(self._copy_price[chosen].sum()) + self._shipping_price(chosen)
+
+    def _shipping_price(self, chosen: np.ndarray) -> int:
+        seller_count = len(self._seller_ids)
+        item_counts = np.bincount(self._copy_seller[chosen], minlength=seller_count)
+        values = np.bincount(
+            self._copy_seller[chosen],
+            weights=self._copy_price[chosen],
+            minlength=seller_count,
+        ).astype(np.int64)
+        used_sellers = np.nonzero(item_counts)[0]
+        return int(
+            self._shipping_costs.costs(
+                used_sellers, item_counts[used_sellers], values[used_sellers]
+            ).sum()
+        )
+
+    def _bound(
+        self, states: np.ndarray
+    ) -> tuple[float, np.ndarray[Any, np.dtype[np.float64]]] | None:
+        seller_shipping = np.where(
+            states == _FREE,
+            self._shipping_costs.min_costs / np.maximum(self._seller_capacity, 1),
+            0,
+        )
+        copy_costs = self._copy_price + seller_shipping[self._copy_seller]
+        available = np.nonzero(states[self._copy_seller] != _CLOSED)[0]
+        order = available[
+            np.lexsort((copy_costs[available], self._copy_card[available]))
+        ]
+        chosen = self._select(order)
+        if chosen is None:
+            return None
+
+        supplied = np.bincount(
+            self._copy_seller[chosen], minlength=len(self._seller_ids)
+        )
+        usage = supplied / np.maximum(self._seller_capacity, 1)
+        bound = (
+            copy_costs[chosen].sum()
+            + self._shipping_costs.min_costs[states == _OPEN].sum()
+        )
+        return bound, usage
+
+    def _to_result(self, is_open: np.ndarray) -> WizardResult:
+        chosen = self._select(np.nonzero(is_open[self._copy_seller])[0])
+        assert chosen is not None, "The best sellers must satisfy the demand."
+
+        offers_by_seller: dict[int, list[tuple[str, int]]] = {}
+        for copy_index in chosen:
+            seller_index = int(self._copy_seller[copy_index])
+            offers_by_seller.setdefault(seller_index, []).append(
+                (
+                    self._card_ids[self._copy_card[copy_index]],
+                    int(self._copy_price[copy_index]),
+                )
+            )
+
+        missing_cards: list[str] = []
+        seen = Counter[str]()
+        for card_id in self._wanted_cards:
+            seen[card_id] += 1
+            if seen[card_id] > self._demand[self._card_indices[card_id]]:
+                missing_cards.append(card_id)
+
+        total_price = int(self._copy_price[chosen].sum()) + self._shipping_price(chosen)
+        return WizardResult(
+            total_price=total_price,
+            sellers={
+                self._seller_ids[seller_index]: offers_by_seller[seller_index]
+                for seller_index in sorted(offers_by_seller.keys())
+            },
+            missing_cards=missing_cards,
+        )
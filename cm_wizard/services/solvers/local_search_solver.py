@@ -0,0 +1,521 @@
+import logging
+import random
+import time
+from collections import Counter
+from typing import Iterable
+
+import numpy as np
+
+from cm_wizard.services.offer_matrix import OfferMatrix
+from cm_wizard.services.shipping_costs import ShippingCosts, shipping_cost_matrix
+from cm_wizard.services.solvers.wizard_result import WizardResult
+
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.DEBUG)
+
+# use max int / 2, because otherwise sums of unavailable copies may overflow
+_UNAVAILABLE = np.iinfo(np.int32).max // 2
+
+
+class LocalSearchSolver:
+    """
+    Improves a combination by moves between sellers, until no move saves anything:
+    Eliminating a seller by moving its copies to the other sellers of the basket,
+    merging two sellers into one and swapping single copies to another seller.
+
+    The basket is kept as copy counts by (card, seller) pair of the offers, so
+    memory is proportional to the number of pairs. The price of the next or last
+    copy of a pair is looked up in the offers' price runs. The item counts and
+    values of each shipment are kept up to date, so a move is evaluated by the
+    shipping and copy prices of the sellers it touches, using the tiers of their
+    actual shipments.
+    """
+
+    def __init__(
+        self,
+        wanted_cards: Iterable[str],
+        offers: OfferMatrix,
+        shipping_cost: int | ShippingCosts = 0,
+    ):
+        self._offers = offers
+        self._wanted_cards = list(wanted_cards)
+        requested = Counter(self._wanted_cards)
+        self._requested_counts = np.array(list(requested.values()), dtype=np.int64)
+        self._card_ids = list(requested.keys())
+        self._card_indices = {
+            card_id: index for index, card_id in enumerate(self._card_ids)
+        }
+        self._seller_ids = offers.seller_ids
+        self._shipping_costs = shipping_cost_matrix(shipping_cost, offers.seller_ids)
+
+        # the slice of pairs of each wanted card, empty for cards without offers
+        self._card_pair_starts = np.zeros(len(self._card_ids), dtype=np.int64)
+        self._card_pair_ends = np.zeros(len(self._card_ids), dtype=np.int64)
+        # the wanted card of each card of the offers
+        self._card_mapping = np.full(offers.card_count, -1, dtype=np.int64)
+        for card_index, card_id in enumerate(self._card_ids):
+            offers_card_index = offers.card_index(card_id)
+            if offers_card_index is not None:
+                self._card_mapping[offers_card_index] = card_index
+                pairs = offers.card_pairs(offers_card_index)
+                self._card_pair_starts[card_index] = pairs.start
+                self._card_pair_ends[card_index] = pairs.stop
+        self._deadline: float | None = None
+
+    def randomized_greedy_result(
+        self, random_generator: random.Random, noise: float = 0.3
+    ) -> WizardResult:
+        """
+        Returns a combination, which buys the cards in random order,
+        each copy from the seller with the cheapest next copy including shipping,
+        unless it is paid already. The costs of each seller are randomly scaled
+        by up to the noise, so different random generators start from
+        different combinations.
+        """
+        seller_count = len(self._seller_ids)
+        seller_noise = np.array(
+            [1 + random_generator.uniform(-noise, noise) for _ in range(seller_count)]
+        )
+        card_order = list(range(len(self._card_ids)))
+        random_generator.shuffle(card_order)
+
+        counts = np.zeros(self._offers.pair_count, dtype=np.int64)
+        is_open = np.zeros(seller_count, dtype=bool)
+        for card_index in card_order:
+            pairs = self._card_pairs(card_index)
+            sellers = self._offers.pair_sellers[pairs]
+            for _ in range(self._requested_counts[card_index]):
+                next_prices = self._next_prices(pairs, counts[pairs])
+                costs = np.where(
+                    next_prices == _UNAVAILABLE,
+                    np.inf,
+                    (
+                        next_prices
+                        + ~is_open[sellers] * self._shipping_costs.min_costs[sellers]
+                    )
+                    * seller_noise[sellers],
+                )
+                if len(costs) == 0 or np.min(costs) == np.inf:
+                    break  # no seller offers more copies
+                position = int(np.argmin(costs))
+                counts[pairs[position]] += 1
+                is_open[sellers[position]] = True
+
+        missing_cards: list[str] = []
+        seen = Counter[str]()
+        for card_id in self._wanted_cards:
+            seen[card_id] += 1
+            card_index = self._card_indices[card_id]
+            if seen[card_id] > counts[self._card_pairs(card_index)].sum():
+                missing_cards.append(card_id)
+
+        self._load(counts)
+        return self._to_result(missing_cards)
+
+    def improve(
+        self, result: WizardResult, time_budget_seconds: float | None = None
+    ) -> WizardResult:
+        """
+        Returns a combination buying the same cards as the result for at most its
+        price. Stops at the first local optimum or after time_budget_seconds,
+        which is checked between moves.
+        Results buying copies that are not offered are returned unchanged.
+        """
+        self._deadline = (
+            None
+            if time_budget_seconds is None
+            else time.monotonic() + time_budget_seconds
+        )
+        counts = self._to_counts(result)
+        if counts is None:
+            return result
+        self._load(counts)
+        if self._total_price() > result.total_price:
+            return result
+
+        passes = [self._eliminate_sellers, self._merge_sellers, self._swap_copies]
+        move_count = 0
+        is_local_optimum = False
+        is_time_budget_exceeded = False
+        while not (is_local_optimum or is_time_budget_exceeded):
+            is_local_optimum = True
+            for make_moves in passes:
+                pass_move_count = make_moves()
+                move_count += pass_move_count
+                is_local_optimum &= pass_move_count == 0
+                is_time_budget_exceeded = self._is_time_budget_exceeded()
+                if is_time_budget_exceeded:
+                    break
+
+        _logger.info(
+            f"local search made {move_count} moves"
+            f"{', time budget exceeded' if is_time_budget_exceeded else ''}."
+        )
+        return self._to_result(result.missing_cards)
+
+    def is_offered(self, result: WizardResult) -> bool:
+        """
+        Returns whether the offers contain every copy the result buys.
+        """
+        return self._to_counts(result) is not None
+
+    def _is_time_budget_exceeded(self) -> bool:
+        return self._deadline is not None and time.monotonic() > self._deadline
+
+    def _card_pairs(self, card_index: int) -> np.ndarray:
+        """
+        Returns the pairs of a wanted card, sorted by seller.
+        """
+        return np.arange(
+            self._card_pair_starts[card_index], self._card_pair_ends[card_index]
+        )
+
+    def _cards_pairs(self, card_indices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the pairs of the wanted cards, concatenated, and their count by card.
+        """
+        starts = self._card_pair_starts[card_indices]
+        pair_counts = self._card_pair_ends[card_indices] - starts
+        offsets = np.cumsum(pair_counts) - pair_counts
+        return (
+            np.arange(pair_counts.sum()) + np.repeat(starts - offsets, pair_counts),
+            pair_counts,
+        )
+
+    def _copies_prices(self, pairs: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """
+        Returns the total price of the counts cheapest copies of each pair
+        or _UNAVAILABLE, if the pair does not offer that many copies.
+        """
+        copy_counts = self._offers.pair_copy_counts[pairs]
+        return np.where(
+            counts <= copy_counts,
+            self._offers.copies_prices(pairs, np.minimum(counts, copy_counts)),
+            _UNAVAILABLE,
+        )
+
+    def _next_prices(self, pairs: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """
+        Returns the price of the copy after the counts cheapest copies of each pair
+        or _UNAVAILABLE, if the pair does not offer another copy.
+        """
+        copy_counts = self._offers.pair_copy_counts[pairs]
+        return np.where(
+            counts < copy_counts,
+            self._offers.copies_prices(pairs, np.minimum(counts + 1, copy_counts))
+            - self._offers.copies_prices(pairs, np.minimum(counts, copy_counts)),
+            _UNAVAILABLE,
+        )
+
+    def _bought_pairs(self, seller_index: int | None = None) -> np.ndarray:
+        """
+        Returns the pairs of the basket, optionally only those of a seller.
+        """
+        pairs = np.flatnonzero(self._counts)
+        if seller_index is None:
+            return pairs
+        return pairs[self._offers.pair_sellers[pairs] == seller_index]
+
+    def _bought_pairs_by_seller(self) -> dict[int, np.ndarray]:
+        pairs = self._bought_pairs()
+        sellers = self._offers.pair_sellers[pairs]
+        order = np.argsort(sellers, kind="stable")
+        open_sellers, starts = np.unique(sellers[order], return_index=True)
+        return dict(zip(map(int, open_sellers), np.split(pairs[order], starts[1:])))
+
+    def _to_counts(self, result: WizardResult) -> np.ndarray | None:
+        counts = np.zeros(self._offers.pair_count, dtype=np.int64)
+        for seller_id, seller_offers in result.sellers.items():
+            seller_index = self._offers.seller_index(seller_id)
+            for card_id, _ in seller_offers:
+                card_index = self._card_indices.get(card_id)
+                if card_index is None or seller_index is None:
+                    return None
+                offers_card_index = self._offers.card_index(card_id)
+                pair_index = (
+                    None
+                    if offers_card_index is None
+                    else self._offers.pair_index(offers_card_index, seller_index)
+                )
+                if pair_index is None:
+                    return None
+                counts[pair_index] += 1
+        if np.any(counts > self._offers.pair_copy_counts):
+            return None
+        return counts
+
+    def _load(self, counts: np.ndarray):
+        self._counts = counts
+        pairs = self._bought_pairs()
+        sellers = self._offers.pair_sellers[pairs]
+        seller_count = len(self._seller_ids)
+        self._item_counts = np.zeros(seller_count, dtype=np.int64)
+        np.add.at(self._item_counts, sellers, counts[pairs])
+        self._values = np.zeros(seller_count, dtype=np.int64)
+        np.add.at(self._values, sellers, self._copies_prices(pairs, counts[pairs]))
+        self._shipping = self._shipping_prices(
+            np.arange(seller_count), self._item_counts, self._values
+        )
+
+    def _shipping_prices(
+        self, seller_indices: np.ndarray, item_counts: np.ndarray, values: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns the shipping price of each seller's shipment, 0 for empty ones.
+        """
+        return np.where(
+            item_counts > 0,
+            self._shipping_costs.costs(seller_indices, item_counts, values),
+            0,
+        )
+
+    def _total_price(self) -> int:
+        return int(self._values.sum() + self._shipping.sum())
+
+    def _apply(self, pair_index: int, count: int):
+        """
+        Buys count more (or fewer, if negative) copies of a pair.
+        """
+        seller_index = int(self._offers.pair_sellers[pair_index])
+        old_count = self._counts[pair_index]
+        new_count = old_count + count
+        self._counts[pair_index] = new_count
+        self._item_counts[seller_index] += count
+        old_price, new_price = self._copies_prices(
+            np.array([pair_index, pair_index]), np.array([old_count, new_count])
+        )
+        self._values[seller_index] += new_price - old_price
+        self._shipping[seller_index] = self._shipping_prices(
+            np.array([seller_index]),
+            self._item_counts[seller_index : seller_index + 1],
+            self._values[seller_index : seller_index + 1],
+        )[0]
+
+    def _eliminate_sellers(self) -> int:
+        """
+        Moves all copies of a seller to the other sellers of the basket, each to the
+        cheapest next copy, if that saves the seller's shipping.
+        Returns the number of eliminated sellers.
+        """
+        move_count = 0
+        seller_count = len(self._seller_ids)
+        for seller_index in map(int, np.flatnonzero(self._item_counts)):
+            if self._is_time_budget_exceeded():
+                break
+            if self._item_counts[seller_index] == 0:
+                continue  # already eliminated
+            is_other_open = self._item_counts > 0
+            is_other_open[seller_index] = False
+            if not np.any(is_other_open):
+                break
+            moves: list[tuple[int, int]] = []
+            added_items = np.zeros(seller_count, dtype=np.int64)
+            added_prices = np.zeros(seller_count, dtype=np.int64)
+            is_feasible = True
+            for pair_index in map(int, self._bought_pairs(seller_index)):
+                card_pairs = self._card_pairs(
+                    self._card_mapping[self._offers.pair_cards[pair_index]]
+                )
+                target_pairs = card_pairs[
+                    is_other_open[self._offers.pair_sellers[card_pairs]]
+                ]
+                target_counts = self._counts[target_pairs].copy()
+                for _ in range(self._counts[pair_index]):
+                    next_prices = self._next_prices(target_pairs, target_counts)
+                    if len(next_prices) == 0 or np.min(next_prices) == _UNAVAILABLE:
+                        is_feasible = False
+                        break
+                    best = int(np.argmin(next_prices))
+                    target_counts[best] += 1
+                    target_seller = self._offers.pair_sellers[target_pairs[best]]
+                    added_items[target_seller] += 1
+                    added_prices[target_seller] += next_prices[best]
+                    moves.append((pair_index, int(target_pairs[best])))
+                if not is_feasible:
+                    break
+            if not is_feasible:
+                continue
+
+            other_sellers = np.flatnonzero(is_other_open)
+            new_shipping = self._shipping_prices(
+                other_sellers,
+                self._item_counts[other_sellers] + added_items[other_sellers],
+                self._values[other_sellers] + added_prices[other_sellers],
+            )
+            delta = (
+                added_prices.sum()
+                + (new_shipping - self._shipping[other_sellers]).sum()
+                - self._values[seller_index]
+                - self._shipping[seller_index]
+            )
+            if delta < 0:
+                for moved_pair_index, target_pair_index in moves:
+                    self._apply(moved_pair_index, -1)
+                    self._apply(target_pair_index, 1)
+                move_count += 1
+        return move_count
+
+    def _merge_sellers(self) -> int:
+        """
+        Moves all copies of two sellers of the basket to a single other seller,
+        if that is cheaper than the shipping of both.
+        Returns the number of merges.
+        """
+        move_count = 0
+        open_sellers = np.flatnonzero(self._item_counts)
+        seller_count = len(self._seller_ids)
+        all_sellers = np.arange(seller_count)
+        seller_pairs = self._bought_pairs_by_seller()
+        for first_position, first_seller in enumerate(map(int, open_sellers)):
+            for second_seller in map(int, open_sellers[first_position + 1 :]):
+                if self._is_time_budget_exceeded():
+                    return move_count
+                if (
+                    self._item_counts[first_seller] == 0
+                    or self._item_counts[second_seller] == 0
+                ):
+                    continue  # already moved by a previous merge
+                moved_pairs = np.concatenate(
+                    (seller_pairs[first_seller], seller_pairs[second_seller])
+                )
+                moved_card_indices, inverse = np.unique(
+                    self._card_mapping[self._offers.pair_cards[moved_pairs]],
+                    return_inverse=True,
+                )
+                moved_counts = np.bincount(
+                    inverse,
+                    weights=self._counts[moved_pairs],
+                    minlength=len(moved_card_indices),
+                ).astype(np.int64)
+
+                # the added price of the copies at every seller offering them
+                pairs, pair_counts = self._cards_pairs(moved_card_indices)
+                old_counts = self._counts[pairs]
+                old_prices, new_prices = self._copies_prices(
+                    np.tile(pairs, 2),
+                    np.concatenate(
+                        (old_counts, old_counts + np.repeat(moved_counts, pair_counts))
+                    ),
+                ).reshape((2, -1))
+                is_pair_available = new_prices < _UNAVAILABLE
+                pair_sellers = self._offers.pair_sellers[pairs][is_pair_available]
+                added_prices_sum = np.zeros(seller_count, dtype=np.int64)
+                np.add.at(
+                    added_prices_sum,
+                    pair_sellers,
+                    (new_prices - old_prices)[is_pair_available],
+                )
+                # the seller must offer the copies of every moved card
+                is_available = np.bincount(pair_sellers, minlength=seller_count) == len(
+                    moved_card_indices
+                )
+                is_available[[first_seller, second_seller]] = False
+                if not np.any(is_available):
+                    continue
+                new_shipping = self._shipping_prices(
+                    all_sellers,
+                    self._item_counts + moved_counts.sum(),
+                    self._values + added_prices_sum,
+                )
+                deltas = (
+                    added_prices_sum
+                    + new_shipping
+                    - self._shipping
+                    - self._values[first_seller]
+                    - self._values[second_seller]
+                    - self._shipping[first_seller]
+                    - self._shipping[second_seller]
+                )
+                deltas[~is_available] = 0
+                target = int(np.argmin(deltas))
+                if deltas[target] < 0:
+                    for pair_index in map(int, moved_pairs):
+                        self._apply(pair_index, -int(self._counts[pair_index]))
+                    for card_index, count in zip(moved_card_indices, moved_counts):
+                        target_pair_index = self._offers.pair_index(
+                            int(
+                                self._offers.pair_cards[
+                                    self._card_pair_starts[card_index]
+                                ]
+                            ),
+                            target,
+                        )
+                        assert target_pair_index is not None
+                        self._apply(target_pair_index, int(count))
+                    seller_pairs = self._bought_pairs_by_seller()
+                    move_count += 1
+        return move_count
+
+    def _swap_copies(self) -> int:
+        """
+        Moves the most expensive copy of a card from one seller to the seller
+        with the cheapest next copy, including the shipping of both.
+        Returns the number of swaps.
+        """
+        move_count = 0
+        for pair_index in map(int, self._bought_pairs()):
+            if self._is_time_budget_exceeded():
+                break
+            count = self._counts[pair_index]
+            if count == 0:
+                continue  # already moved by a previous swap
+            seller_index = int(self._offers.pair_sellers[pair_index])
+            last_price = np.diff(
+                self._copies_prices(
+                    np.array([pair_index, pair_index]), np.array([count - 1, count])
+                )
+            )[0]
+            removal_delta = (
+                self._shipping_prices(
+                    np.array([seller_index]),
+                    self._item_counts[seller_index : seller_index + 1] - 1,
+                    self._values[seller_index : seller_index + 1] - last_price,
+                )[0]
+                - self._shipping[seller_index]
+                - last_price
+            )
+            card_pairs = self._card_pairs(
+                self._card_mapping[self._offers.pair_cards[pair_index]]
+            )
+            sellers = self._offers.pair_sellers[card_pairs]
+            next_prices = self._next_prices(card_pairs, self._counts[card_pairs])
+            addition_deltas = (
+                next_prices
+                + self._shipping_prices(
+                    sellers,
+                    self._item_counts[sellers] + 1,
+                    self._values[sellers] + next_prices,
+                )
+                - self._shipping[sellers]
+            )
+            addition_deltas[next_prices == _UNAVAILABLE] = _UNAVAILABLE
+            addition_deltas[card_pairs == pair_index] = _UNAVAILABLE
+            target = int(np.argmin(addition_deltas))
+            if removal_delta + addition_deltas[target] < 0:
+                self._apply(pair_index, -1)
+                self._apply(int(card_pairs[target]), 1)
+                move_count += 1
+        return move_count
+
+    def _to_result(self, missing_cards: list[str]) -> WizardResult:
+        pairs = self._bought_pairs()
+        pair_sellers = self._offers.pair_sellers[pairs]
+        pair_card_indices = self._card_mapping[self._offers.pair_cards[pairs]]
+        sellers: dict[str, list[tuple[str, int]]] = {}
+        for pair_index in pairs[np.lexsort((pair_card_indices, pair_sellers))]:
+            count = self._counts[pair_index]
+            seller_id = self._seller_ids[self._offers.pair_sellers[pair_index]]
+            card_id = self._card_ids[
+                self._card_mapping[self._offers.pair_cards[pair_index]]
+            ]
+            prefix_prices = self._offers.copies_prices(
+                np.full(count + 1, pair_index), np.arange(count + 1)
+            )
+            sellers.setdefault(seller_id, []).extend(
+                (card_id, int(price)) for price in np.diff(prefix_prices)
+            )
+        return WizardResult(
+            total_price=self._total_price(),
+            sellers=sellers,
+            missing_cards=missing_cards,
+        )
@@ -0,0 +1,199 @@
+import logging
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from typing import Iterable
+
+from cm_wizard.services.offer_matrix import OfferMatrix, SharedOfferMatrix
+from cm_wizard.services.shipping_costs import ShippingCosts
+from cm_wizard.services.solvers.local_search_solver import LocalSearchSolver
+from cm_wizard.services.solvers.wizard_result import WizardResult
+
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.DEBUG)
+
+# enough starts, so a slow one does not leave the other workers idle
+_STARTS_PER_WORKER = 4
+# the solver of a worker process, built once on the arrays of the shared offers
+_worker_solver: LocalSearchSolver | None = None
+# keeps the offers mapped for the lifetime of the worker
+_worker_shared_offers: SharedOfferMatrix | None = None
+# the time budget of a worker starts once it is initialized
+_worker_deadline: float | None = None
+
+
+def _init_worker(
+    shared_offers: SharedOfferMatrix,
+    wanted_cards: list[str],
+    shipping_cost: int | ShippingCosts,
+    time_budget_seconds: float | None,
+):
+    global _worker_solver, _worker_shared_offers, _worker_deadline
+    _worker_shared_offers = shared_offers
+    _worker_solver = LocalSearchSolver(
+        wanted_cards, shared_offers.offers, shipping_cost
+    )
+    _worker_deadline = _deadline(time_budget_seconds)
+
+
+def _deadline(time_budget_seconds: float | None) -> float | None:
+    return None if time_budget_seconds is None else time.time() + time_budget_seconds
+
+
+def _run_start(
+    solver: LocalSearchSolver,
+    start: int | WizardResult,
+    deadline: float | None,
+) -> WizardResult | None:
+    """
+    Improves the start, if it is a result, or a randomized greedy result
+    seeded by the start otherwise, until the deadline (of time.time()).
+    Returns None for randomized starts that did not begin before the deadline
+    and for results buying copies that are not offered.
+    """
+    time_budget_seconds = None if deadline is None else max(deadline - time.time(), 0)
+    if isinstance(start, WizardResult):
+        if not solver.is_offered(start):
+            return None
+        return solver.improve(start, time_budget_seconds)
+    if time_budget_seconds == 0:
+        return None
+    return solver.improve(
+        solver.randomized_greedy_result(random.Random(start)), time_budget_seconds
+    )
+
+
+def _run_worker_start(start: int | WizardResult) -> WizardResult | None:
+    assert _worker_solver is not None, "The worker was not initialized."
+    return _run_start(_worker_solver, start, _worker_deadline)
+
+
+class MultiStartSolver:
+    """
+    Improves many different combinations by local search in worker processes
+    and returns the best: the initial results (e.g. of another solver) and
+    randomized greedy combinations.
+    Initial results buying copies that are not offered (anymore) are ignored.
+
+    The offers are materialized into shared memory once (unless they are shared
+    already), where the workers attach to them without copying. The solver of
+    each worker only keeps the basket on top of the shared arrays.
+    Each worker enforces the time budget itself, so no start runs past it.
+    The budget starts once a worker is initialized, not while it is spawned.
+    Workers are spawned instead of forked, because forking a process with
+    running threads (e.g. of the UI) is unsafe.
+    With max_workers=0, the starts are improved serially in the calling process.
+    """
+
+    def __init__(
+        self,
+        wanted_cards: Iterable[str],
+        offers: OfferMatrix | SharedOfferMatrix,
+        shipping_cost: int | ShippingCosts = 0,
+        max_workers: int | None = None,
+    ):
+        """
+        By default, there is one worker per CPU.
+        """
+        self._wanted_cards = list(wanted_cards)
+        self._offers = offers
+        self._shipping_cost = shipping_cost
+        self.max_workers = max_workers
+
+    def solve(
+        self,
+        initial_results: Iterable[WizardResult] = (),
+        start_count: int | None = None,
+        time_budget_seconds: float | None = None,
+    ) -> WizardResult:
+        """
+        Returns the best combination after improving the initial_results and
+        start_count randomized greedy combinations (by default a few per worker).
+        All starts are improved within time_budget_seconds. Randomized starts that
+        did not begin within time_budget_seconds are skipped.
+        """
+        worker_count = (
+            self.max_workers if self.max_workers is not None else os.cpu_count() or 1
+        )
+        if start_count is None:
+            start_count = max(worker_count, 1) * _STARTS_PER_WORKER
+        starts: list[int | WizardResult] = [
+            *initial_results,
+            *range(start_count),
+        ]
+
+        if worker_count == 0:
+            solver = LocalSearchSolver(
+                self._wanted_cards,
+                (
+                    self._offers.offers
+                    if isinstance(self._offers, SharedOfferMatrix)
+                    else self._offers
+                ),
+                self._shipping_cost,
+            )
+            deadline = _deadline(time_budget_seconds)
+            results = [_run_start(solver, start, deadline) for start in starts]
+        else:
+            results = self._solve_in_workers(starts, worker_count, time_budget_seconds)
+
+        skipped_count = sum(
+            1
+            for start, result in zip(starts, results)
+            if isinstance(start, int) and result is None
+        )
+        if skipped_count > 0:
+            _logger.warn(
+                f"multi-start solver skipped {skipped_count} randomized starts "
+                f"after the time budget of {time_budget_seconds} s."
+            )
+
+        offered_results = [result for result in results if result is not None]
+        _logger.info(f"multi-start solver improved {len(offered_results)} starts.")
+        assert len(offered_results) > 0, "At least one start must be improved."
+        return min(
+            offered_results,
+            # buying more cards is better than buying them cheaper
+            key=lambda result: (len(result.missing_cards), result.total_price),
+        )
+
+    def _solve_in_workers(
+        self,
+        starts: list[int | WizardResult],
+        worker_count: int,
+        time_budget_seconds: float | None,
+    ) -> list[WizardResult | None]:
+        shared_offers = (
+            self._offers
+            if isinstance(self._offers, SharedOfferMatrix)
+            else SharedOfferMatrix.create(self._offers)
+        )
+        try:
+            # the workers are shut down before the shared offers are unlinked
+            with ProcessPoolExecutor(
+                max_workers=worker_count,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(
+                    shared_offers,
+                    self._wanted_cards,
+                    self._shipping_cost,
+                    time_budget_seconds,
+                ),
+            ) as executor:
+                started_at = time.monotonic()
+                futures: list[Future[WizardResult | None]] = [
+                    executor.submit(_run_worker_start, start) for start in starts
+                ]
+                # starts after the deadline return (almost) immediately
+                wait(futures)
+            _logger.debug(
+                f"multi-start workers ran for {time.monotonic() - started_at:.3f} s."
+            )
+            return [future.result() for future in futures]
+        finally:
+            if shared_offers is not self._offers:
+                shared_offers.close()
+                shared_offers.unlink()
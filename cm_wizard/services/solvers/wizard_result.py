@@ -0,0 +1,8 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class WizardResult:
+    total_price: int
+    sellers: dict[str, list[tuple[str, int]]]
+    missing_cards: list[str] = field(default_factory=list)
@@ -0,0 +1,199 @@
+import glob
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import TextIO
+
+from cm_wizard.services.cardmarket.card_query import CardQuery
+from cm_wizard.services.cardmarket.offer_records import CardOffer, SellerOffer
+from cm_wizard.services.solvers.wizard_result import WizardResult
+
+DEFAULT_RUN_DIRECTORY = ".cache/runs"
+
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.DEBUG)
+
+
+@dataclass
+class WizardCheckpointState:
+    """
+    The outputs of a wizard run's stages, as far as they were checkpointed.
+    """
+
+    wants_list_id: str
+    started_at: float
+    card_queries: dict[str, CardQuery] = field(default_factory=dict)
+    # includes cards without offers, in contrast to the orchestrator's cards_offers
+    cards_offers: dict[str, list[CardOffer]] = field(default_factory=dict)
+    seller_ids: set[str] | None = None
+    # the card IDs of the offers are not resolved
+    sellers_offers: dict[str, list[SellerOffer]] = field(default_factory=dict)
+    result: WizardResult | None = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.result is not None
+
+
+class WizardCheckpoint:
+    """
+    Appends the outputs of a wizard run to a JSON lines file as soon as each
+    request completes. Each record is a single line, which is written and flushed
+    without rewriting earlier records.
+    A line that was cut off, e.g. because the app crashed, is ignored on loading.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: TextIO = open(path, "a+", encoding="utf-8")
+        if self._file.tell() > 0:
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                # terminates a line that was cut off, so it stays separate
+                self._file.write("\n")
+
+    @property
+    def run_id(self) -> str:
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    def _append(self, record: dict):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def add_run(self, wants_list_id: str):
+        self._append(
+            {"type": "run", "wants_list_id": wants_list_id, "started_at": time.time()}
+        )
+
+    def add_card_offers(self, query: CardQuery, offers: list[CardOffer]):
+        self._append(
+            {
+                "type": "card_offers",
+                "query": query.to_row(),
+                "offers": [offer.to_row() for offer in offers],
+            }
+        )
+
+    def add_seller_ids(self, seller_ids: set[str]):
+        self._append({"type": "seller_ids", "seller_ids": sorted(seller_ids)})
+
+    def add_seller_offers(self, seller_id: str, offers: list[SellerOffer]):
+        self._append(
+            {
+                "type": "seller_offers",
+                "seller_id": seller_id,
+                "offers": [offer.to_row() for offer in offers],
+            }
+        )
+
+    def add_result(self, result: WizardResult):
+        self._append({"type": "result", "result": asdict(result)})
+
+    def close(self):
+        self._file.close()
+
+    @staticmethod
+    def load(path: str) -> WizardCheckpointState:
+        state: WizardCheckpointState | None = None
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    _logger.warn(f'Ignoring a corrupt checkpoint record in "{path}".')
+                    continue
+
+                match record["type"]:
+                    case "run":
+                        if state is None:
+                            state = WizardCheckpointState(
+                                wants_list_id=record["wants_list_id"],
+                                started_at=record["started_at"],
+                            )
+                    case "card_offers":
+                        assert state is not None
+                        query = CardQuery.from_row(record["query"])
+                        state.card_queries[query.id] = query
+                        state.cards_offers[query.id] = [
+                            CardOffer.from_row(row) for row in record["offers"]
+                        ]
+                    case "seller_ids":
+                        assert state is not None
+                        state.seller_ids = set(record["seller_ids"])
+                    case "seller_offers":
+                        assert state is not None
+                        state.sellers_offers[record["seller_id"]] = [
+                            SellerOffer.from_row(row) for row in record["offers"]
+                        ]
+                    case "result":
+                        assert state is not None
+                        result = record["result"]
+                        state.result = WizardResult(
+                            total_price=result["total_price"],
+                            sellers={
+                                seller_id: [tuple(offer) for offer in offers]
+                                for seller_id, offers in result["sellers"].items()
+                            },
+                            missing_cards=result["missing_cards"],
+                        )
+        assert state is not None, f'No run found in checkpoint "{path}".'
+        return state
+
+
+class WizardRunStore:
+    """
+    Keeps the checkpoints of wizard runs in a directory, one file per run.
+    Only the latest runs of each wants list are kept.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_RUN_DIRECTORY,
+        max_runs_per_wants_list: int = 5,
+    ):
+        self.directory = directory
+        self.max_runs_per_wants_list = max_runs_per_wants_list
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, run_id: str) -> str:
+        return os.path.join(self.directory, f"{run_id}.jsonl")
+
+    def run_ids(self, wants_list_id: str) -> list[str]:
+        """
+        Returns the IDs of the wants list's runs, oldest first.
+        """
+        paths = glob.glob(os.path.join(self.directory, f"{wants_list_id}-*.jsonl"))
+        run_ids = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+        return sorted(run_ids, key=lambda run_id: int(run_id.rsplit("-", 1)[1]))
+
+    def create(self, wants_list_id: str) -> WizardCheckpoint:
+        run_ids = self.run_ids(wants_list_id)
+        # leaves room for the new run
+        removed_count = len(run_ids) - self.max_runs_per_wants_list + 1
+        for run_id in run_ids[: max(0, removed_count)]:
+            os.remove(self._path(run_id))
+
+        run_id = f"{wants_list_id}-{time.time_ns()}"
+        checkpoint = WizardCheckpoint(self._path(run_id))
+        checkpoint.add_run(wants_list_id)
+        _logger.info(f'Checkpointing wizard run "{run_id}".')
+        return checkpoint
+
+    def load(self, run_id: str) -> WizardCheckpointState:
+        return WizardCheckpoint.load(self._path(run_id))
+
+    def find_unfinished_run_id(
+        self, wants_list_id: str, max_age_seconds: float
+    ) -> str | None:
+        """
+        Returns the wants list's latest run, if it is recent and not finished.
+        """
+        run_ids = self.run_ids(wants_list_id)
+        if len(run_ids) == 0:
+            return None
+        state = self.load(run_ids[-1])
+        if state.is_finished or time.time() - state.started_at > max_age_seconds:
+            return None
+        return run_ids[-1]
@@ -1,28 +1,79 @@
-import bisect
+import asyncio
 import logging
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, replace
 from enum import Enum, auto
 from functools import cache
-from typing import Callable
-
-from rapidfuzz import fuzz, process
+from typing import Awaitable, Callable, TypeVar
 
+from cm_wizard.services.cardmarket.async_cardmarket_service import (
+    AsyncCardmarketService,
+    async_cardmarket_service,
+)
+from cm_wizard.services.cardmarket.card_id_mapping_store import CardIdMappingStore
+from cm_wizard.services.cardmarket.card_id_resolver import CardIdResolver
 from cm_wizard.services.cardmarket.cardmarket_service import (
     CardmarketService,
     cardmarket_service,
 )
-from cm_wizard.services.cardmarket.pages.wants_list_page import WantsListPageItem
+from cm_wizard.services.cardmarket.enums.location import Location
+from cm_wizard.services.cardmarket.offer_records import (
+    CardOffer,
+    CardOfferSeller,
+    SellerOffer,
+)
+from cm_wizard.services.cardmarket.pages.wants_list_page import (
+    WantsListPage,
+    WantsListPageItem,
+)
 from cm_wizard.services.currency import format_price
+from cm_wizard.services.metrics import MetricsReport, metrics
+from cm_wizard.services.offer_matrix import (
+    OfferMatrix,
+    OfferMatrixBuilder,
+    SharedOfferMatrix,
+)
+from cm_wizard.services.seller_pruning import find_prunable_seller_ids, rank_seller_ids
+from cm_wizard.services.shipping_costs import ShippingCosts, ShippingTariffTable
 from cm_wizard.services.shopping_wizard_service import (
     ShoppingWizardService,
     WizardResult,
+    WizardSolver,
     shopping_wizard_service,
 )
+from cm_wizard.services.wizard_checkpoint import (
+    WizardCheckpoint,
+    WizardCheckpointState,
+    WizardRunStore,
+)
+from cm_wizard.services.wizard_snapshot import (
+    WantsListDiff,
+    WizardSnapshot,
+    to_card_query,
+)
 
 _logger = logging.getLogger(__name__)
 _logger.setLevel(logging.DEBUG)
 
-constant_shipping_cost = 200  # rough estimate
+T = TypeVar("T")
+
+# a rough estimate of every shipment's price, unless shipping tariffs are set
+constant_shipping_cost = 200
+# the country shipments are sent to, for shipping tariffs
+shipping_destination = Location.GERMANY
+solver_time_budget_seconds: float = 10
+# MULTI_START searches very large wants lists in parallel on machines with many CPUs
+wizard_solver = WizardSolver.BRANCH_AND_BOUND
+# the best combination is improved by local search afterwards for at most this long
+local_search_time_budget_seconds: float = 1
+# card pages list the cheapest offers first, parsing stops after this many
+max_offers_per_card: int | None = None
+# incremental runs reuse the offers of a previous run up to this age
+snapshot_max_age_seconds: float = 60 * 60
+# the most promising sellers are requested first, the others are skipped, if set
+max_seller_requests: int | None = None
+# interim results are solved at most this often while seller offers are requested
+interim_result_interval_seconds: float = 2
 
 
 class WizardOrchestratorStage(Enum):
@@ -58,16 +109,66 @@ class WizardOrchestratorResult:
     sellers: list[WizardOrchestratorResultSeller]
 
 
-@dataclass
-class CardOfferSeller:
-    id: str
+OnResultCallable = Callable[[WizardOrchestratorResult], None]
 
 
-@dataclass
-class CardOffer:
-    price_euro_cents: int
-    quantity: int
-    seller: CardOfferSeller
+class _InterimResults:
+    """
+    Solves the offers known so far while more are requested,
+    and reports each result that is better than all reported before.
+    """
+
+    def __init__(
+        self,
+        solve: Callable[[dict[str, list[SellerOffer]]], WizardResult],
+        on_result: Callable[[WizardResult], None],
+    ):
+        self._solve = solve
+        self._on_result = on_result
+        self._solved_at: float | None = None
+        self._is_solving = False
+        self._best_result: WizardResult | None = None
+
+    def _is_due(self, force: bool) -> bool:
+        now = time.monotonic()
+        if (
+            not force
+            and self._solved_at is not None
+            and now - self._solved_at < interim_result_interval_seconds
+        ):
+            return False
+        self._solved_at = now
+        return True
+
+    def update(self, sellers_offers: dict[str, list[SellerOffer]], force=False):
+        if self._is_due(force):
+            self.report(self._solve(sellers_offers))
+
+    async def update_async(
+        self, sellers_offers: dict[str, list[SellerOffer]], force=False
+    ):
+        """
+        Same as update, but solves in a worker thread, so the event loop keeps
+        sending requests meanwhile. Updates during a solve are skipped.
+        """
+        if self._is_solving or not self._is_due(force):
+            return
+        self._is_solving = True
+        try:
+            # other requests add to the sellers_offers while solving
+            result = await asyncio.to_thread(self._solve, dict(sellers_offers))
+        finally:
+            self._is_solving = False
+        self.report(result)
+
+    def report(self, result: WizardResult):
+        # buying more cards is better than buying them cheaper
+        if self._best_result is None or (
+            len(result.missing_cards),
+            result.total_price,
+        ) < (len(self._best_result.missing_cards), self._best_result.total_price):
+            self._best_result = result
+            self._on_result(result)
 
 
 class WizardOrchestratorService:
@@ -75,132 +176,623 @@ class WizardOrchestratorService:
         self,
         cardmarket_service: CardmarketService,
         shopping_wizard_service: ShoppingWizardService,
+        async_cardmarket_service: AsyncCardmarketService,
     ):
         self.cardmarket_service = cardmarket_service
         self.shopping_wizard_service = shopping_wizard_service
+        self.async_cardmarket_service = async_cardmarket_service
+        # records card ID resolutions between runs, if set
+        self.card_id_mapping_store: CardIdMappingStore | None = None
+        # checkpoints runs, so they can be resumed, if set
+        self.run_store: WizardRunStore | None = None
+        # the last run of each wants list
+        self._snapshots: dict[str, WizardSnapshot] = {}
+        # the measurements of the last finished run
+        self.report: MetricsReport | None = None
+        # exports the report after each run, in the Prometheus text format for
+        # paths ending with ".prom", otherwise as JSON, if set
+        self.metrics_export_path: str | None = None
+        # prices shipping by the sellers' locations, if set
+        self.shipping_tariffs: ShippingTariffTable | None = None
 
+    async def _gather_with_progress(
+        self,
+        awaitables: list[Awaitable[T]],
+        stage: WizardOrchestratorStage,
+        on_progress: OnProgressCallable,
+    ) -> list[T]:
+        """
+        Runs the awaitables concurrently and reports progress whenever one is done.
+        Returns the results in order. If one fails (e.g. because the wizard was
+        stopped), the others are cancelled.
+        """
+        current_progress: float = 0
+        on_progress(current_progress, stage)
+
+        tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                await next_done
+                current_progress += 1 / len(tasks)
+                on_progress(current_progress, stage)
+            return [task.result() for task in tasks]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _add_card_offers(
+        self,
+        cards_offers: dict[str, list[CardOffer]],
+        item: WantsListPageItem,
+        offers: list[CardOffer],
+    ):
+        if len(offers) == 0:
+            _logger.warn(f"No offers found for card {item.name}.")
+            return
+
+        _logger.debug(
+            f'Lowest price for "{item.name}" is {format_price(offers[0].price_euro_cents)} cents by {offers[0].seller.id}.'
+        )
+        cards_offers[item.id] = offers
+
+    @metrics.timed("stage", stage=WizardOrchestratorStage.GET_CARDS_SELLERS.name)
     def _find_cards_offers(
         self,
         wants_items: list[WantsListPageItem],
         on_progress: OnProgressCallable,
+        checkpoint: WizardCheckpoint | None,
     ) -> dict[str, list[CardOffer]]:
         current_progress: float = 0
         on_progress(current_progress, WizardOrchestratorStage.GET_CARDS_SELLERS)
 
         cards_offers: dict[str, list[CardOffer]] = {}
         for item in wants_items:
-            card = self.cardmarket_service.get_card(item)
+            offers = self.cardmarket_service.get_card_offers(item, max_offers_per_card)
+            if checkpoint is not None:
+                checkpoint.add_card_offers(item, offers)
             current_progress += 1 / len(wants_items)
             on_progress(current_progress, WizardOrchestratorStage.GET_CARDS_SELLERS)
+            self._add_card_offers(cards_offers, item, offers)
+        return cards_offers
 
-            if len(card.offers) == 0:
-                _logger.warn(f"No offers found for card {card.name}.")
-                continue
+    async def _get_card_offers_async(
+        self, item: WantsListPageItem, checkpoint: WizardCheckpoint | None
+    ) -> list[CardOffer]:
+        offers = await self.async_cardmarket_service.get_card_offers(
+            item, max_offers_per_card
+        )
+        if checkpoint is not None:
+            checkpoint.add_card_offers(item, offers)
+        return offers
 
-            _logger.debug(
-                f'Lowest price for "{card.name}" is {format_price(card.offers[0].price_euro_cents)} cents by {card.offers[0].seller.id}.'
-            )
-            cards_offers[item.id] = card.offers
+    @metrics.timed("stage", stage=WizardOrchestratorStage.GET_CARDS_SELLERS.name)
+    async def _find_cards_offers_async(
+        self,
+        wants_items: list[WantsListPageItem],
+        on_progress: OnProgressCallable,
+        checkpoint: WizardCheckpoint | None,
+    ) -> dict[str, list[CardOffer]]:
+        cards_offers_lists = await self._gather_with_progress(
+            [self._get_card_offers_async(item, checkpoint) for item in wants_items],
+            WizardOrchestratorStage.GET_CARDS_SELLERS,
+            on_progress,
+        )
+
+        cards_offers: dict[str, list[CardOffer]] = {}
+        for item, offers in zip(wants_items, cards_offers_lists):
+            self._add_card_offers(cards_offers, item, offers)
         return cards_offers
 
     def _convert_to_sellers_offers(
         self, cards_offers: dict[str, list[CardOffer]]
-    ) -> dict[str, dict[str, list[int]]]:
-        sellers_offers: dict[str, dict[str, list[int]]] = {}
+    ) -> OfferMatrix:
+        builder = OfferMatrixBuilder()
         for card_id, offers in cards_offers.items():
             for offer in offers:
-                if offer.seller.id not in sellers_offers:
-                    sellers_offers[offer.seller.id] = {}
-                seller_offer = sellers_offers[offer.seller.id]
-                if card_id not in seller_offer:
-                    seller_offer[card_id] = []
-                seller_offer[card_id] += [offer.price_euro_cents] * offer.quantity
-        return sellers_offers
+                builder.add_offer(
+                    card_id, offer.seller.id, offer.price_euro_cents, offer.quantity
+                )
+        return builder.build()
 
     def _take_seller_ids_with_multiple_offers(
         self,
-        sellers_offers: dict[str, dict[str, list[int]]],
+        sellers_offers: OfferMatrix,
     ) -> list[str]:
+        card_counts = sellers_offers.seller_card_counts()
         return [
-            seller_id for seller_id, offers in sellers_offers.items() if len(offers) > 1
+            seller_id
+            for seller_id, card_count in zip(sellers_offers.seller_ids, card_counts)
+            if card_count > 1
         ]
 
+    @metrics.timed("stage", stage=WizardOrchestratorStage.RANK_SELLERS.name)
     def _find_promising_sellers(
         self,
-        wants_ids: set[str],
+        wanted_cards: list[str],
         cards_offers: dict[str, list[CardOffer]],
+        shipping_costs: ShippingCosts,
         on_progress: OnProgressCallable,
-    ) -> set[str]:
+    ) -> list[str]:
+        """
+        Returns the IDs of sellers worth requesting, the most promising first.
+        """
         on_progress(0, WizardOrchestratorStage.RANK_SELLERS)
 
         incomplete_sellers_offers = self._convert_to_sellers_offers(
             cards_offers=cards_offers
         )
         preliminary_result = shopping_wizard_service.find_best_offers(
-            wants_ids,
+            wanted_cards,
             incomplete_sellers_offers,
-            constant_shipping_cost,
+            shipping_costs,
         )
         seller_ids = set(preliminary_result.sellers.keys())
         promising_seller_ids = self._take_seller_ids_with_multiple_offers(
             sellers_offers=incomplete_sellers_offers
         )
         seller_ids.update(promising_seller_ids)
+        pruned_seller_ids = find_prunable_seller_ids(
+            wanted_cards,
+            incomplete_sellers_offers,
+            shipping_costs,
+            preliminary_result,
+        )
+        seller_ids -= pruned_seller_ids
+        metrics.increment("pruned_sellers", len(pruned_seller_ids))
+        _logger.info(
+            f"Pruned {len(pruned_seller_ids)} sellers, "
+            f"which cannot beat {format_price(preliminary_result.total_price)}."
+        )
         _logger.info(f"Considering offers from {len(seller_ids)} sellers.")
-        return seller_ids
+        return rank_seller_ids(
+            wanted_cards, incomplete_sellers_offers, shipping_costs, seller_ids
+        )
 
+    @metrics.timed("stage", stage=WizardOrchestratorStage.GET_SELLERS_OFFERS.name)
     def _find_sellers_offers(
         self,
         wants_list_id: str,
-        wants_ids: set[str],
-        seller_ids: set[str],
+        wants_items: list[WantsListPageItem],
+        seller_ids: list[str],
         on_progress: OnProgressCallable,
-    ) -> dict[str, dict[str, list[int]]]:
+        checkpoint: WizardCheckpoint | None,
+        known_sellers_offers: dict[str, list[SellerOffer]],
+        interim_results: _InterimResults | None,
+    ) -> dict[str, list[SellerOffer]]:
+        """
+        Requests the sellers in order and updates the interim results,
+        based on the known_sellers_offers and those requested so far.
+        """
         current_progress: float = 0
         on_progress(current_progress, WizardOrchestratorStage.GET_SELLERS_OFFERS)
 
-        sellers_offers: dict[str, dict[str, list[int]]] = {
-            seller_id: {} for seller_id in seller_ids
-        }
-        for seller_id, seller_offers in sellers_offers.items():
-            # TODO: use pagination for more results
-            seller_offers_page = self.cardmarket_service.get_seller_wanted_offers(
+        card_id_resolver = CardIdResolver(
+            {item.id for item in wants_items}, self.card_id_mapping_store
+        )
+        sellers_offers: dict[str, list[SellerOffer]] = {}
+        for seller_id in seller_ids:
+            seller_offers = self.cardmarket_service.get_seller_offers(
                 seller_id=seller_id,
                 wants_list_id=wants_list_id,
+                wanted_queries=wants_items,
             )
-            _logger.debug(
-                f"Found {len(seller_offers_page.offers)} wanted offers from seller {seller_id}."
+            if checkpoint is not None:
+                checkpoint.add_seller_offers(seller_id, seller_offers)
+            sellers_offers[seller_id] = self._resolve_seller_offers(
+                card_id_resolver, seller_id, seller_offers
             )
-            for offer in seller_offers_page.offers:
-                card_id_match = process.extractOne(
-                    offer.id, wants_ids, scorer=fuzz.WRatio
+            current_progress += 1 / len(seller_ids)
+            on_progress(current_progress, WizardOrchestratorStage.GET_SELLERS_OFFERS)
+            if interim_results is not None:
+                interim_results.update(known_sellers_offers | sellers_offers)
+        card_id_resolver.save()
+        return sellers_offers
+
+    @metrics.timed("stage", stage=WizardOrchestratorStage.GET_SELLERS_OFFERS.name)
+    async def _find_sellers_offers_async(
+        self,
+        wants_list_id: str,
+        wants_items: list[WantsListPageItem],
+        seller_ids: list[str],
+        on_progress: OnProgressCallable,
+        checkpoint: WizardCheckpoint | None,
+        known_sellers_offers: dict[str, list[SellerOffer]],
+        interim_results: _InterimResults | None,
+    ) -> dict[str, list[SellerOffer]]:
+        """
+        Same as _find_sellers_offers, but the requests are sent concurrently.
+        They are started in order, so the most promising sellers are requested
+        first, when the request limits are reached.
+        """
+        card_id_resolver = CardIdResolver(
+            {item.id for item in wants_items}, self.card_id_mapping_store
+        )
+        sellers_offers_lists = await self._gather_with_progress(
+            [
+                self._get_seller_offers_async(
+                    seller_id,
+                    wants_list_id,
+                    wants_items,
+                    checkpoint,
+                    card_id_resolver,
+                    known_sellers_offers,
+                    interim_results,
+                )
+                for seller_id in seller_ids
+            ],
+            WizardOrchestratorStage.GET_SELLERS_OFFERS,
+            on_progress,
+        )
+
+        # resolves the IDs of all sellers' offers in a single batch
+        card_id_resolver.resolve_all(
+            [
+                offer.card_id
+                for seller_offers in sellers_offers_lists
+                for offer in seller_offers
+            ]
+        )
+        sellers_offers = {
+            seller_id: self._resolve_seller_offers(
+                card_id_resolver, seller_id, seller_offers
+            )
+            for seller_id, seller_offers in zip(seller_ids, sellers_offers_lists)
+        }
+        card_id_resolver.save()
+        return sellers_offers
+
+    async def _get_seller_offers_async(
+        self,
+        seller_id: str,
+        wants_list_id: str,
+        wants_items: list[WantsListPageItem],
+        checkpoint: WizardCheckpoint | None,
+        card_id_resolver: CardIdResolver,
+        known_sellers_offers: dict[str, list[SellerOffer]],
+        interim_results: _InterimResults | None,
+    ) -> list[SellerOffer]:
+        """
+        Adds the seller's offers to the known_sellers_offers for interim results.
+        """
+        seller_offers = await self.async_cardmarket_service.get_seller_offers(
+            seller_id=seller_id,
+            wants_list_id=wants_list_id,
+            wanted_queries=wants_items,
+        )
+        if checkpoint is not None:
+            checkpoint.add_seller_offers(seller_id, seller_offers)
+        if interim_results is not None:
+            known_sellers_offers[seller_id] = self._resolve_seller_offers(
+                card_id_resolver, seller_id, seller_offers
+            )
+            await interim_results.update_async(known_sellers_offers)
+        return seller_offers
+
+    def _resolve_seller_offers(
+        self,
+        card_id_resolver: CardIdResolver,
+        seller_id: str,
+        seller_offers: list[SellerOffer],
+    ) -> list[SellerOffer]:
+        """
+        Returns the offers with the IDs of the wanted cards they were resolved to.
+        """
+        _logger.debug(
+            f"Found {len(seller_offers)} wanted offers from seller {seller_id}."
+        )
+        card_ids = card_id_resolver.resolve_all(
+            [offer.card_id for offer in seller_offers]
+        )
+        return [
+            replace(offer, card_id=card_id)
+            for card_id, offer in zip(card_ids, seller_offers)
+        ]
+
+    def _convert_known_offers_to_matrix(
+        self,
+        sellers_offers: dict[str, list[SellerOffer]],
+        cards_offers: dict[str, list[CardOffer]],
+        card_page_seller_ids: set[str] | None = None,
+    ) -> OfferMatrix:
+        """
+        Combines the offers of the requested sellers with the card page offers
+        of other sellers (of the card_page_seller_ids or all, if not given).
+        """
+        builder = OfferMatrixBuilder()
+        for seller_id, seller_offers in sellers_offers.items():
+            builder.add_seller(seller_id)
+            for offer in seller_offers:
+                builder.add_offer(
+                    offer.card_id, seller_id, offer.price_euro_cents, offer.quantity
+                )
+        for card_id, offers in cards_offers.items():
+            for card_offer in offers:
+                seller_id = card_offer.seller.id
+                if seller_id in sellers_offers or (
+                    card_page_seller_ids is not None
+                    and seller_id not in card_page_seller_ids
+                ):
+                    continue
+                builder.add_offer(
+                    card_id, seller_id, card_offer.price_euro_cents, card_offer.quantity
                 )
-                if card_id_match[1] < 100:
-                    _logger.debug(
-                        f"Closest card match for {offer.id} is {card_id_match}."
+        return builder.build()
+
+    def _wanted_cards(self, wants_items: list[WantsListPageItem]) -> list[str]:
+        """
+        Returns the ID of each wanted card once per wanted copy.
+        """
+        return [item.id for item in wants_items for _ in range(item.amount)]
+
+    def _shipping_costs(
+        self, cards_offers: dict[str, list[CardOffer]]
+    ) -> ShippingCosts:
+        """
+        Prices shipping by the sellers' locations on the card pages.
+        """
+        if self.shipping_tariffs is None:
+            return ShippingCosts.constant(constant_shipping_cost)
+        seller_locations = {
+            offer.seller.id: offer.seller.location
+            for offers in cards_offers.values()
+            for offer in offers
+        }
+        return self.shipping_tariffs.shipping_costs(
+            seller_locations, shipping_destination
+        )
+
+    def _create_interim_results(
+        self,
+        wants_items: list[WantsListPageItem],
+        cards_offers: dict[str, list[CardOffer]],
+        shipping_costs: ShippingCosts,
+        on_result: OnResultCallable | None,
+    ) -> _InterimResults | None:
+        if on_result is None:
+            return None
+        wanted_cards = self._wanted_cards(wants_items)
+        return _InterimResults(
+            solve=lambda sellers_offers: shopping_wizard_service.find_best_offers(
+                wanted_cards,
+                self._convert_known_offers_to_matrix(sellers_offers, cards_offers),
+                shipping_costs,
+            ),
+            on_result=lambda wizard_result: on_result(
+                self._map_result(wizard_result, wants_items)
+            ),
+        )
+
+    def _request_budgeted_seller_ids(
+        self, seller_ids: list[str], sellers_offers: dict[str, list[SellerOffer]]
+    ) -> list[str]:
+        """
+        Returns the most promising sellers without known offers,
+        as many as max_seller_requests allows.
+        """
+        unknown_seller_ids = [
+            seller_id for seller_id in seller_ids if seller_id not in sellers_offers
+        ]
+        requested_seller_ids = unknown_seller_ids[:max_seller_requests]
+        skipped_count = len(unknown_seller_ids) - len(requested_seller_ids)
+        if skipped_count > 0:
+            _logger.info(
+                f"Skipping {skipped_count} sellers to stay within the request budget."
+            )
+            metrics.increment("skipped_sellers", skipped_count)
+        return requested_seller_ids
+
+    def _previous_snapshot(self, wants_list_id: str) -> WizardSnapshot | None:
+        snapshot = self._snapshots.get(wants_list_id)
+        if snapshot is None or snapshot.is_expired(snapshot_max_age_seconds):
+            return None
+        return snapshot
+
+    def _snapshot_from_checkpoint(
+        self,
+        state: WizardCheckpointState,
+        wants_items: list[WantsListPageItem],
+    ) -> WizardSnapshot:
+        card_id_resolver = CardIdResolver(
+            {item.id for item in wants_items}, self.card_id_mapping_store
+        )
+        sellers_offers = {
+            seller_id: self._resolve_seller_offers(
+                card_id_resolver, seller_id, seller_offers
+            )
+            for seller_id, seller_offers in state.sellers_offers.items()
+        }
+        card_id_resolver.save()
+        return WizardSnapshot(
+            card_queries=state.card_queries,
+            cards_offers={
+                card_id: offers
+                for card_id, offers in state.cards_offers.items()
+                if len(offers) > 0
+            },
+            sellers_offers=sellers_offers,
+            result=state.result,
+            created_at=state.started_at,
+        )
+
+    def _diff_snapshot(
+        self,
+        snapshot: WizardSnapshot | None,
+        wants_items: list[WantsListPageItem],
+    ) -> WantsListDiff:
+        """
+        Without a snapshot, all cards count as added.
+        """
+        if snapshot is None:
+            return WantsListDiff(
+                changed_card_ids={item.id for item in wants_items},
+                removed_card_ids=set(),
+            )
+
+        diff = snapshot.diff(wants_items)
+        _logger.info(
+            f"{len(diff.changed_card_ids)} cards were added or changed and {len(diff.removed_card_ids)} removed since the previous run."
+        )
+        return diff
+
+    def _reuse_cards_offers(
+        self,
+        snapshot: WizardSnapshot | None,
+        diff: WantsListDiff,
+        wants_items: list[WantsListPageItem],
+        checkpoint: WizardCheckpoint | None,
+    ) -> dict[str, list[CardOffer]]:
+        if snapshot is None:
+            return {}
+
+        cards_offers = snapshot.reusable_cards_offers(diff)
+        if checkpoint is not None:
+            for item in wants_items:
+                if item.id not in diff.changed_card_ids:
+                    checkpoint.add_card_offers(
+                        snapshot.card_queries[item.id], cards_offers.get(item.id, [])
                     )
-                card_id = card_id_match[0]
+        return cards_offers
 
-                if card_id not in seller_offers:
-                    seller_offers[card_id] = []
-                for _ in range(offer.quantity):
-                    bisect.insort(seller_offers[card_id], offer.price_euro_cents)
-            current_progress += 1 / len(sellers_offers)
-            on_progress(current_progress, WizardOrchestratorStage.GET_SELLERS_OFFERS)
+    def _reuse_sellers_offers(
+        self,
+        snapshot: WizardSnapshot | None,
+        diff: WantsListDiff,
+        seller_ids: set[str],
+        cards_offers: dict[str, list[CardOffer]],
+        checkpoint: WizardCheckpoint | None,
+    ) -> dict[str, list[SellerOffer]]:
+        if snapshot is None:
+            return {}
+
+        sellers_offers = snapshot.reusable_sellers_offers(
+            diff, seller_ids, cards_offers
+        )
+        _logger.info(f"Reusing the offers of {len(sellers_offers)} sellers.")
+        if checkpoint is not None:
+            for seller_id, seller_offers in sellers_offers.items():
+                checkpoint.add_seller_offers(seller_id, seller_offers)
         return sellers_offers
 
+    def _create_checkpoint(self, wants_list_id: str) -> WizardCheckpoint | None:
+        if self.run_store is None:
+            return None
+        return self.run_store.create(wants_list_id)
+
+    def find_unfinished_run_id(self, wants_list_id: str) -> str | None:
+        """
+        Returns the ID of a recent run of the wants list that failed or was stopped.
+        """
+        if self.run_store is None:
+            return None
+        return self.run_store.find_unfinished_run_id(
+            wants_list_id, snapshot_max_age_seconds
+        )
+
+    def _save_snapshot(
+        self,
+        wants_list_id: str,
+        wants_items: list[WantsListPageItem],
+        cards_offers: dict[str, list[CardOffer]],
+        sellers_offers: dict[str, list[SellerOffer]],
+        wizard_result: WizardResult,
+    ):
+        self._snapshots[wants_list_id] = WizardSnapshot(
+            card_queries={item.id: to_card_query(item) for item in wants_items},
+            cards_offers=cards_offers,
+            sellers_offers=sellers_offers,
+            result=wizard_result,
+        )
+
+    def _log_offer_cache_stats(self):
+        offer_cache = self.cardmarket_service.offer_cache
+        if offer_cache is None:
+            return
+        stats = offer_cache.stats
+        _logger.info(
+            f"Offer cache hit rate is {stats.hit_rate:.0%} ({stats.hits} hits, {stats.misses} misses)."
+        )
+
+    @metrics.timed("stage", stage=WizardOrchestratorStage.FIND_BEST_COMBINATION.name)
     def _find_best_combination(
         self,
-        wants_ids: set[str],
-        sellers_offers: dict[str, dict[str, list[int]]],
+        wanted_cards: list[str],
+        offers: OfferMatrix,
+        shipping_costs: ShippingCosts,
         on_progress: OnProgressCallable,
+        snapshot: WizardSnapshot | None = None,
+        interim_results: _InterimResults | None = None,
     ) -> WizardResult:
+        """
+        Searches with the wizard_solver. Branch and bound reports each better
+        combination to the interim results while searching, the other solvers
+        only report the combination they return.
+        """
         on_progress(0, WizardOrchestratorStage.FIND_BEST_COMBINATION)
-        return shopping_wizard_service.find_best_offers(
-            wants_ids,
-            sellers_offers,
-            constant_shipping_cost,
+        initial_result = None if snapshot is None else snapshot.result
+        if (
+            wizard_solver == WizardSolver.BRANCH_AND_BOUND
+            and interim_results is not None
+        ):
+            wizard_result: WizardResult | None = None
+            for wizard_result in shopping_wizard_service.find_best_offers_anytime(
+                wanted_cards,
+                offers,
+                shipping_costs,
+                time_budget_seconds=solver_time_budget_seconds,
+                initial_result=initial_result,
+            ):
+                interim_results.report(wizard_result)
+            assert wizard_result is not None
+            return wizard_result
+
+        if wizard_solver == WizardSolver.MULTI_START:
+            # the workers attach to the offers instead of receiving copies
+            with SharedOfferMatrix.create(offers) as shared_offers:
+                wizard_result = shopping_wizard_service.find_best_offers(
+                    wanted_cards,
+                    shared_offers,
+                    shipping_costs,
+                    solver=wizard_solver,
+                    time_budget_seconds=solver_time_budget_seconds,
+                    initial_result=initial_result,
+                )
+        else:
+            wizard_result = shopping_wizard_service.find_best_offers(
+                wanted_cards,
+                offers,
+                shipping_costs,
+                solver=wizard_solver,
+                time_budget_seconds=solver_time_budget_seconds,
+                initial_result=initial_result,
+            )
+        if interim_results is not None:
+            interim_results.report(wizard_result)
+        return wizard_result
+
+    def _improve_combination(
+        self,
+        wanted_cards: list[str],
+        offers: OfferMatrix,
+        shipping_costs: ShippingCosts,
+        wizard_result: WizardResult,
+        interim_results: _InterimResults | None = None,
+    ) -> WizardResult:
+        """
+        Moves cards between sellers, where that saves shipping or price.
+        """
+        improved_result = shopping_wizard_service.improve_offers(
+            wanted_cards,
+            offers,
+            wizard_result,
+            shipping_costs,
+            time_budget_seconds=local_search_time_budget_seconds,
         )
+        saved_euro_cents = wizard_result.total_price - improved_result.total_price
+        metrics.increment("local_search_saved_euro_cents", saved_euro_cents)
+        _logger.info(f"Local search saved {format_price(saved_euro_cents)}.")
+        if interim_results is not None:
+            interim_results.report(improved_result)
+        return improved_result
 
     def _map_result(
         self,
@@ -231,51 +823,259 @@ class WizardOrchestratorService:
             ],
         )
 
+    @metrics.timed("stage", stage=WizardOrchestratorStage.GET_WANTS_LIST.name)
+    async def _get_wants_list(
+        self, wants_list_id: str, is_concurrent: bool
+    ) -> WantsListPage:
+        if is_concurrent:
+            return await self.async_cardmarket_service.get_wants_list(wants_list_id)
+        return self.cardmarket_service.get_wants_list(wants_list_id)
+
+    def _finish_report(self):
+        self.report = metrics.report()
+        _logger.info(f"Wizard run measurements:\n{self.report.summary()}")
+        if self.metrics_export_path is None:
+            return
+        with open(self.metrics_export_path, "w") as f:
+            f.write(
+                self.report.to_prometheus()
+                if self.metrics_export_path.endswith(".prom")
+                else self.report.to_json()
+            )
+
     def run(
-        self, wants_list_id: str, on_progress: OnProgressCallable
+        self,
+        wants_list_id: str,
+        on_progress: OnProgressCallable,
+        incremental: bool = True,
+        on_result: OnResultCallable | None = None,
     ) -> WizardOrchestratorResult:
-        wants_list_page = self.cardmarket_service.get_wants_list(wants_list_id)
-        _logger.info(f"Running shopping wizard for {len(wants_list_page.items)} cards.")
+        """
+        In incremental mode, a recent previous run of the same wants list is reused:
+        Only the offers of added or changed cards and of sellers offering them are
+        requested again, and the best combination is warm-started from the
+        previous one.
+        Sellers are requested in order of their expected savings. While they are
+        requested and while the best combination is searched, on_result is called
+        with each better interim result, if given.
+        Afterwards, the measurements of the run are available as the report.
+        Must not be called from a running event loop, use run_async there.
+        """
+        return asyncio.run(
+            self._run_wants_list(
+                wants_list_id, on_progress, incremental, on_result, is_concurrent=False
+            )
+        )
 
-        if len(wants_list_page.items) == 0:
+    def resume(
+        self,
+        run_id: str,
+        on_progress: OnProgressCallable,
+        on_result: OnResultCallable | None = None,
+    ) -> WizardOrchestratorResult:
+        """
+        Continues a run from its checkpoint, e.g. after it failed.
+        Apart from the wants list, only requests that did not complete before
+        are sent again. The resumed run is checkpointed as a new run.
+        """
+        return asyncio.run(
+            self._resume_run(run_id, on_progress, on_result, is_concurrent=False)
+        )
+
+    async def run_async(
+        self,
+        wants_list_id: str,
+        on_progress: OnProgressCallable,
+        incremental: bool = True,
+        on_result: OnResultCallable | None = None,
+    ) -> WizardOrchestratorResult:
+        """
+        Same as run, but requests of each stage are sent concurrently,
+        as far as the shared rate limiter allows.
+        """
+        return await self._run_wants_list(
+            wants_list_id, on_progress, incremental, on_result, is_concurrent=True
+        )
+
+    async def resume_async(
+        self,
+        run_id: str,
+        on_progress: OnProgressCallable,
+        on_result: OnResultCallable | None = None,
+    ) -> WizardOrchestratorResult:
+        """
+        Same as resume, but requests of each stage are sent concurrently.
+        """
+        return await self._resume_run(
+            run_id, on_progress, on_result, is_concurrent=True
+        )
+
+    async def _run_wants_list(
+        self,
+        wants_list_id: str,
+        on_progress: OnProgressCallable,
+        incremental: bool,
+        on_result: OnResultCallable | None,
+        is_concurrent: bool,
+    ) -> WizardOrchestratorResult:
+        metrics.reset()
+        wants_list_page = await self._get_wants_list(wants_list_id, is_concurrent)
+        return await self._run(
+            wants_list_id,
+            wants_list_page.items,
+            on_progress,
+            self._previous_snapshot(wants_list_id) if incremental else None,
+            on_result,
+            is_concurrent,
+        )
+
+    async def _resume_run(
+        self,
+        run_id: str,
+        on_progress: OnProgressCallable,
+        on_result: OnResultCallable | None,
+        is_concurrent: bool,
+    ) -> WizardOrchestratorResult:
+        assert self.run_store is not None, "Runs can only be resumed from a run store."
+        state = self.run_store.load(run_id)
+        metrics.reset()
+        wants_list_page = await self._get_wants_list(state.wants_list_id, is_concurrent)
+        return await self._run(
+            state.wants_list_id,
+            wants_list_page.items,
+            on_progress,
+            self._snapshot_from_checkpoint(state, wants_list_page.items),
+            on_result,
+            is_concurrent,
+        )
+
+    async def _run(
+        self,
+        wants_list_id: str,
+        wants_items: list[WantsListPageItem],
+        on_progress: OnProgressCallable,
+        snapshot: WizardSnapshot | None,
+        on_result: OnResultCallable | None,
+        is_concurrent: bool,
+    ) -> WizardOrchestratorResult:
+        """
+        Runs the stages of run and run_async.
+        Only the requests are sent either concurrently or one after another.
+        """
+        _logger.info(f"Running shopping wizard for {len(wants_items)} cards.")
+
+        if len(wants_items) == 0:
             return WizardOrchestratorResult(
                 total_price_euro_cents=0,
                 missing_cards=[],
                 sellers=[],
             )
-        wants_ids: set[str] = {item.id for item in wants_list_page.items}
+        wanted_cards = self._wanted_cards(wants_items)
+        diff = self._diff_snapshot(snapshot, wants_items)
 
-        cards_offers = self._find_cards_offers(
-            wants_items=wants_list_page.items,
-            on_progress=on_progress,
-        )
+        checkpoint = self._create_checkpoint(wants_list_id)
+        try:
+            cards_offers = self._reuse_cards_offers(
+                snapshot, diff, wants_items, checkpoint
+            )
+            changed_wants_items = [
+                item for item in wants_items if item.id in diff.changed_card_ids
+            ]
+            if is_concurrent:
+                cards_offers.update(
+                    await self._find_cards_offers_async(
+                        changed_wants_items, on_progress, checkpoint
+                    )
+                )
+            else:
+                cards_offers.update(
+                    self._find_cards_offers(
+                        changed_wants_items, on_progress, checkpoint
+                    )
+                )
 
-        seller_ids = self._find_promising_sellers(
-            wants_ids=wants_ids,
-            cards_offers=cards_offers,
-            on_progress=on_progress,
-        )
+            shipping_costs = self._shipping_costs(cards_offers)
+            ranked_seller_ids = self._find_promising_sellers(
+                wanted_cards=wanted_cards,
+                cards_offers=cards_offers,
+                shipping_costs=shipping_costs,
+                on_progress=on_progress,
+            )
+            seller_ids = set(ranked_seller_ids)
+            if checkpoint is not None:
+                checkpoint.add_seller_ids(seller_ids)
 
-        sellers_offers = self._find_sellers_offers(
-            wants_list_id=wants_list_id,
-            wants_ids=wants_ids,
-            seller_ids=seller_ids,
-            on_progress=on_progress,
-        )
+            sellers_offers = self._reuse_sellers_offers(
+                snapshot, diff, seller_ids, cards_offers, checkpoint
+            )
+            interim_results = self._create_interim_results(
+                wants_items, cards_offers, shipping_costs, on_result
+            )
+            if interim_results is not None:
+                await interim_results.update_async(sellers_offers, force=True)
+            requested_seller_ids = self._request_budgeted_seller_ids(
+                ranked_seller_ids, sellers_offers
+            )
+            find_sellers_offers_args = (
+                wants_list_id,
+                wants_items,
+                requested_seller_ids,
+                on_progress,
+                checkpoint,
+                dict(sellers_offers),
+                interim_results,
+            )
+            if is_concurrent:
+                sellers_offers.update(
+                    await self._find_sellers_offers_async(*find_sellers_offers_args)
+                )
+            else:
+                sellers_offers.update(
+                    self._find_sellers_offers(*find_sellers_offers_args)
+                )
 
-        wizard_result = self._find_best_combination(
-            wants_ids=wants_ids,
+            self._log_offer_cache_stats()
+            # skipped sellers are still considered with their card page offers
+            offers = self._convert_known_offers_to_matrix(
+                sellers_offers, cards_offers, seller_ids - sellers_offers.keys()
+            )
+            wizard_result = self._find_best_combination(
+                wanted_cards=wanted_cards,
+                offers=offers,
+                shipping_costs=shipping_costs,
+                on_progress=on_progress,
+                snapshot=snapshot,
+                interim_results=interim_results,
+            )
+            wizard_result = self._improve_combination(
+                wanted_cards=wanted_cards,
+                offers=offers,
+                shipping_costs=shipping_costs,
+                wizard_result=wizard_result,
+                interim_results=interim_results,
+            )
+            if checkpoint is not None:
+                checkpoint.add_result(wizard_result)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
+        self._save_snapshot(
+            wants_list_id=wants_list_id,
+            wants_items=wants_items,
+            cards_offers=cards_offers,
             sellers_offers=sellers_offers,
-            on_progress=on_progress,
+            wizard_result=wizard_result,
         )
-
+        self._finish_report()
         return self._map_result(
             wizard_result=wizard_result,
-            wants_items=wants_list_page.items,
+            wants_items=wants_items,
         )
 
 
 wizard_orchestrator_service = WizardOrchestratorService(
     cardmarket_service,
     shopping_wizard_service,
+    async_cardmarket_service,
 )
@@ -0,0 +1,96 @@
+import time
+from dataclasses import dataclass, field
+from typing import Sequence
+
+from cm_wizard.services.cardmarket.card_query import CardQuery
+from cm_wizard.services.cardmarket.offer_records import CardOffer, SellerOffer
+from cm_wizard.services.solvers.wizard_result import WizardResult
+
+
+def to_card_query(query: CardQuery) -> CardQuery:
+    """
+    Copies the query fields, e.g. of a WantsListPageItem, which is bound to its page.
+    """
+    return CardQuery(
+        id=query.id,
+        expansions=query.expansions,
+        languages=query.languages,
+        min_condition=query.min_condition,
+        is_reverse_holo=query.is_reverse_holo,
+        is_signed=query.is_signed,
+        is_first_edition=query.is_first_edition,
+        is_altered=query.is_altered,
+    )
+
+
+@dataclass
+class WantsListDiff:
+    # cards that were added or whose query changed
+    changed_card_ids: set[str]
+    removed_card_ids: set[str]
+
+
+@dataclass
+class WizardSnapshot:
+    """
+    What a wizard run found for a wants list, so the next run of the same list
+    only needs to request what changed in between.
+    """
+
+    card_queries: dict[str, CardQuery]
+    cards_offers: dict[str, list[CardOffer]]
+    # the card IDs of the offers are resolved to the IDs of wanted cards
+    sellers_offers: dict[str, list[SellerOffer]]
+    # None, if the run did not finish
+    result: WizardResult | None
+    created_at: float = field(default_factory=time.time)
+
+    def is_expired(self, max_age_seconds: float) -> bool:
+        return time.time() - self.created_at > max_age_seconds
+
+    def diff(self, queries: Sequence[CardQuery]) -> WantsListDiff:
+        card_queries = {query.id: to_card_query(query) for query in queries}
+        return WantsListDiff(
+            changed_card_ids={
+                card_id
+                for card_id, query in card_queries.items()
+                if self.card_queries.get(card_id) != query
+            },
+            removed_card_ids=self.card_queries.keys() - card_queries.keys(),
+        )
+
+    def reusable_cards_offers(self, diff: WantsListDiff) -> dict[str, list[CardOffer]]:
+        return {
+            card_id: offers
+            for card_id, offers in self.cards_offers.items()
+            if card_id not in diff.changed_card_ids
+            and card_id not in diff.removed_card_ids
+        }
+
+    def reusable_sellers_offers(
+        self,
+        diff: WantsListDiff,
+        seller_ids: set[str],
+        cards_offers: dict[str, list[CardOffer]],
+    ) -> dict[str, list[SellerOffer]]:
+        """
+        Returns the offers of the given sellers that are still valid.
+        Sellers that were not queried before and those offering changed cards
+        (according to the cards_offers) must be queried again.
+        """
+        changed_card_seller_ids = {
+            offer.seller.id
+            for card_id in diff.changed_card_ids
+            for offer in cards_offers.get(card_id, [])
+        }
+        return {
+            seller_id: [
+                offer
+                for offer in self.sellers_offers[seller_id]
+                if offer.card_id not in diff.changed_card_ids
+                and offer.card_id not in diff.removed_card_ids
+            ]
+            for seller_id in seller_ids
+            if seller_id in self.sellers_offers
+            and seller_id not in changed_card_seller_ids
+        }
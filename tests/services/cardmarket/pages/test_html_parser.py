@@ -0,0 +1,113 @@
+from functools import cached_property
+
+import pytest
+from bs4 import BeautifulSoup, FeatureNotFound
+
+from cm_wizard.services.cardmarket.enums.cardmarket_language import CardmarketLanguage
+from cm_wizard.services.cardmarket.pages import html_parser
+from cm_wizard.services.cardmarket.pages.card_page import CardPage
+from cm_wizard.services.cardmarket.pages.html_element import (
+    HtmlElement,
+    HtmlPageElement,
+)
+from cm_wizard.services.cardmarket.pages.html_parser import HtmlParser, parse_html
+from cm_wizard.services.cardmarket.pages.seller_offers_page import SellerOffersPage
+from cm_wizard.services.cardmarket.pages.wants_list_page import WantsListPage
+from cm_wizard.services.cardmarket.pages.wants_lists_page import WantsListsPage
+from cm_wizard.services.locale import Locale
+
+locale = Locale(CardmarketLanguage.ENGLISH)
+
+
+def file_text_contents(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def exposed_fields(value):
+    """
+    Recursively collects all public properties of page elements.
+    """
+    if isinstance(value, list):
+        return [exposed_fields(item) for item in value]
+    if not isinstance(value, HtmlElement):
+        return value
+    return {
+        name: exposed_fields(getattr(value, name))
+        for name, attribute in vars(type(value)).items()
+        if isinstance(attribute, cached_property) and not name.startswith("_")
+    }
+
+
+@pytest.mark.parametrize(
+    "page_class, path",
+    [
+        (WantsListsPage, "responses/en_Yugioh_Wants.html"),
+        (WantsListPage, "responses/en_Yugioh_Wants_15628908.html"),
+        (CardPage, "responses/en_Yugioh_Cards_A-Feather-of-the-Phoenix.html"),
+        (
+            SellerOffersPage,
+            "responses/en_Yugioh_Users_wkleebe1_Offers_Singles_idWantslist_15628908.html",
+        ),
+    ],
+)
+def test_html_parsers_parity(page_class: type[HtmlPageElement], path: str):
+    pytest.importorskip("lxml")
+    page_text = file_text_contents(path)
+
+    lxml_page = page_class(page_text, locale, [HtmlParser.LXML])
+    html_parser_page = page_class(page_text, locale, [HtmlParser.HTML_PARSER])
+
+    assert exposed_fields(lxml_page) == exposed_fields(html_parser_page)
+
+
+def test_parse_html_falls_back_to_next_parser(monkeypatch):
+    def beautiful_soup(page_text: str, features: str):
+        if features == HtmlParser.LXML.value:
+            raise FeatureNotFound()
+        return BeautifulSoup(page_text, features)
+
+    monkeypatch.setattr(html_parser, "BeautifulSoup", beautiful_soup)
+    monkeypatch.setattr(html_parser, "_unavailable_html_parsers", set())
+
+    soup = parse_html("<html><body><h1>Title</h1></body></html>")
+
+    assert soup.find("h1").text == "Title"
+    assert html_parser._unavailable_html_parsers == {HtmlParser.LXML}
+
+
+def test_parse_html_falls_back_to_parser_finding_root(monkeypatch):
+    def beautiful_soup(page_text: str, features: str):
+        if features == HtmlParser.LXML.value:
+            # e.g. a differently repaired tree
+            return BeautifulSoup("<html><body></body></html>", "html.parser")
+        return BeautifulSoup(page_text, features)
+
+    monkeypatch.setattr(html_parser, "BeautifulSoup", beautiful_soup)
+    monkeypatch.setattr(html_parser, "_unavailable_html_parsers", set())
+
+    soup = parse_html(
+        '<html><body><div id="table"><h1>Title</h1></div></body></html>',
+        root_selector="#table",
+    )
+
+    assert soup.find("h1").text == "Title"
+
+
+def test_parse_html_returns_first_page_without_root():
+    soup = parse_html(
+        "<html><body><h1>Title</h1></body></html>",
+        [HtmlParser.HTML_PARSER],
+        root_selector="#table",
+    )
+
+    assert soup.find("h1").text == "Title"
+
+
+def test_parse_html_without_installed_parser(monkeypatch):
+    monkeypatch.setattr(
+        html_parser, "_unavailable_html_parsers", {HtmlParser.HTML_PARSER}
+    )
+
+    with pytest.raises(RuntimeError):
+        parse_html("<html></html>", [HtmlParser.HTML_PARSER])
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+from cm_wizard.services.browser import Browser
+from cm_wizard.services.cardmarket.async_cardmarket_service import (
+    AsyncCardmarketService,
+)
+from cm_wizard.services.cardmarket.cardmarket_service import cardmarket_service as cs
+from cm_wizard.services.cardmarket.enums.cardmarket_game import CardmarketGame
+from cm_wizard.services.cardmarket.enums.cardmarket_language import CardmarketLanguage
+from cm_wizard.services.cardmarket.page_parser_pool import PageParserPool
+from cm_wizard.services.metrics import metrics
+
+
+@pytest.fixture
+def async_cardmarket_service() -> AsyncCardmarketService:
+    cs._open_new_session(
+        browser=Browser.CHROME,
+        user_agent="Mozilla/5.0...",
+        language=CardmarketLanguage.ENGLISH,
+        game=CardmarketGame.YU_GI_OH,
+    )
+    cs._rate_limited = False
+    return AsyncCardmarketService(cs)
+
+
+def file_text_contents(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def test_get_wants_list(
+    requests_mock, async_cardmarket_service: AsyncCardmarketService
+):
+    requests_mock.get(
+        "https://www.cardmarket.com/en/YuGiOh/Wants/15628908",
+        text=file_text_contents("responses/en_Yugioh_Wants_15628908.html"),
+    )
+
+    result = asyncio.run(async_cardmarket_service.get_wants_list("15628908"))
+
+    assert result.title == "Adrian Gecko"
+    assert len(result.items) == 25
+
+
+def test_get_wants_list_retries_too_many_requests(
+    requests_mock, monkeypatch, async_cardmarket_service: AsyncCardmarketService
+):
+    requests_mock.get(
+        "https://www.cardmarket.com/en/YuGiOh/Wants/15628908",
+        [
+            {"status_code": 429},
+            {"text": file_text_contents("responses/en_Yugioh_Wants_15628908.html")},
+        ],
+    )
+    monkeypatch.setattr(cs, "_rate_limited", True)
+    # does not pause for the 429
+    monkeypatch.setattr(cs.rate_limiter, "on_too_many_requests", lambda: None)
+    metrics.reset()
+
+    result = asyncio.run(async_cardmarket_service.get_wants_list("15628908"))
+
+    assert result.title == "Adrian Gecko"
+    assert metrics.report().counter("retries", endpoint="wants_list") == 1
+
+
+def test_get_card_concurrently(
+    requests_mock, async_cardmarket_service: AsyncCardmarketService
+):
+    requests_mock.get(
+        "https://www.cardmarket.com/en/YuGiOh/Wants/15628908",
+        text=file_text_contents("responses/en_Yugioh_Wants_15628908.html"),
+    )
+    requests_mock.get(
+        "https://www.cardmarket.com/en/YuGiOh/Cards/A-Feather-of-the-Phoenix",
+        text=file_text_contents(
+            "responses/en_Yugioh_Cards_A-Feather-of-the-Phoenix.html"
+        ),
+    )
+    query = cs.get_wants_list("15628908").items[0]
+
+    async def get_cards():
+        return await asyncio.gather(
+            *[async_cardmarket_service.get_card(query) for _ in range(3)]
+        )
+
+    results = asyncio.run(get_cards())
+
+    assert [result.name for result in results] == ["A Feather of the Phoenix"] * 3
+    assert requests_mock.call_count == 4
+
+
+def test_get_seller_offers_from_all_pages(
+    requests_mock, async_cardmarket_service: AsyncCardmarketService
+):
+    url = "https://www.cardmarket.com/en/YuGiOh/Users/wkleebe1/Offers/Singles"
+    page_text = file_text_contents(
+        "responses/en_Yugioh_Users_wkleebe1_Offers_Singles_idWantslist_15628908.html"
+    )
+    requests_mock.get(
+        f"{url}?idWantslist=15628908",
+        text=page_text.replace("Page 1 of 1", "Page 1 of 3"),
+    )
+    for page in [2, 3]:
+        requests_mock.get(
+            f"{url}?idWantslist=15628908&site={page}",
+            text=page_text.replace("Page 1 of 1", f"Page {page} of 3"),
+        )
+
+    offers = asyncio.run(
+        async_cardmarket_service.get_seller_offers("wkleebe1", "15628908")
+    )
+
+    assert len(offers) == 3
+    assert sorted(
+        request.qs.get("site", ["1"])[0] for request in requests_mock.request_history
+    ) == [
+        "1",
+        "2",
+        "3",
+    ]
+
+
+def test_get_card_offers_in_page_parser_pool(
+    requests_mock, async_cardmarket_service: AsyncCardmarketService
+):
+    requests_mock.get(
+        "https://www.cardmarket.com/en/YuGiOh/Wants/15628908",
+        text=file_text_contents("responses/en_Yugioh_Wants_15628908.html"),
+    )
+    requests_mock.get(
+        "https://www.cardmarket.com/en/YuGiOh/Cards/A-Feather-of-the-Phoenix",
+        text=file_text_contents(
+            "responses/en_Yugioh_Cards_A-Feather-of-the-Phoenix.html"
+        ),
+    )
+    query = cs.get_wants_list("15628908").items[0]
+    expected_offers = asyncio.run(async_cardmarket_service.get_card_offers(query, 3))
+    async_cardmarket_service.page_parser_pool = PageParserPool(max_workers=1)
+
+    try:
+        offers = asyncio.run(async_cardmarket_service.get_card_offers(query, 3))
+    finally:
+        async_cardmarket_service.page_parser_pool.shutdown()
+
+    assert offers == expected_offers
+    assert len(offers) == 3
@@ -0,0 +1,34 @@
+from cm_wizard.services.cardmarket.card_id_mapping_store import (
+    CardIdMapping,
+    CardIdMappingStore,
+)
+
+
+def test_get_all_returns_known_mappings():
+    store = CardIdMappingStore(":memory:")
+    store.put_all(
+        [
+            CardIdMapping(
+                "Dragon-s-Fighting-Spirit", "Dragons-Fighting-Spirit", "slug"
+            ),
+            CardIdMapping("Time-Wizrd", "Time-Wizard", "fuzzy"),
+        ]
+    )
+
+    assert store.get_all(["Time-Wizrd", "Unknown", "Time-Wizrd"]) == {
+        "Time-Wizrd": "Time-Wizard"
+    }
+
+
+def test_export_and_import(tmp_path):
+    path = str(tmp_path / "card_ids.json")
+    store = CardIdMappingStore(str(tmp_path / "card_ids.sqlite3"))
+    store.put_all([CardIdMapping("Time-Wizrd", "Time-Wizard", "fuzzy")])
+
+    assert store.export_json(path) == 1
+
+    other_store = CardIdMappingStore(":memory:")
+    other_store.put_all([CardIdMapping("Time-Wizrd", "Wrong-Card", "fuzzy")])
+
+    assert other_store.import_json(path) == 1
+    assert other_store.mappings() == store.mappings()
@@ -0,0 +1,89 @@
+from cm_wizard.services.cardmarket.card_id_mapping_store import (
+    CardIdMapping,
+    CardIdMappingStore,
+)
+from cm_wizard.services.cardmarket.card_id_resolver import (
+    CardIdResolver,
+    slug_key,
+    version_stripped_key,
+)
+
+wants_ids = [
+    "Dragons-Fighting-Spirit",
+    "Time-Wizard",
+    "A-Feather-of-the-Phoenix",
+    "Blue-Eyes-White-Dragon",
+]
+
+
+def test_keys():
+    assert slug_key("Dragon-s-Fighting-Spirit") == slug_key("Dragons-Fighting-Spirit")
+    assert version_stripped_key("Time-Wizard-V1-Ultra-Rare") == "timewizard"
+    assert version_stripped_key("Dragon-s-Fighting-Spirit-V-2") == (
+        "dragonsfightingspirit"
+    )
+
+
+def test_resolve_without_fuzzy_matching():
+    resolver = CardIdResolver(wants_ids)
+
+    assert resolver.resolve_all(
+        ["Time-Wizard", "Dragon-s-Fighting-Spirit", "Time-Wizard-V1-Ultra-Rare"]
+    ) == ["Time-Wizard", "Dragons-Fighting-Spirit", "Time-Wizard"]
+    assert resolver.fuzzy_resolution_count == 0
+
+
+def test_resolve_fuzzily_once():
+    resolver = CardIdResolver(wants_ids)
+
+    assert resolver.resolve_all(["Blue-Eyes-White-Dragn", "Blue-Eyes-White-Dragn"]) == [
+        "Blue-Eyes-White-Dragon",
+        "Blue-Eyes-White-Dragon",
+    ]
+    assert resolver.resolve("Blue-Eyes-White-Dragn") == "Blue-Eyes-White-Dragon"
+    assert resolver.fuzzy_resolution_count == 1
+
+
+def test_resolutions_are_recorded_in_mapping_store():
+    mapping_store = CardIdMappingStore(":memory:")
+    resolver = CardIdResolver(wants_ids, mapping_store)
+    resolver.resolve_all(["A-Feather-of-Phoenix", "Time-Wizard-V1-Ultra-Rare"])
+    resolver.save()
+
+    assert mapping_store.mappings() == [
+        CardIdMapping("A-Feather-of-Phoenix", "A-Feather-of-the-Phoenix", "fuzzy"),
+        CardIdMapping("Time-Wizard-V1-Ultra-Rare", "Time-Wizard", "version"),
+    ]
+
+    resolver = CardIdResolver(wants_ids, mapping_store)
+
+    assert resolver.resolve("A-Feather-of-Phoenix") == "A-Feather-of-the-Phoenix"
+    assert resolver.fuzzy_resolution_count == 0
+
+
+def test_mappings_to_unwanted_cards_are_ignored():
+    mapping_store = CardIdMappingStore(":memory:")
+    mapping_store.put_all([CardIdMapping("Time-Wizrd", "Other-Card", "fuzzy")])
+    resolver = CardIdResolver(wants_ids, mapping_store)
+
+    assert resolver.resolve("Time-Wizrd") == "Time-Wizard"
+
+
+def test_weak_fuzzy_matches_are_not_recorded():
+    mapping_store = CardIdMappingStore(":memory:")
+    resolver = CardIdResolver(wants_ids, mapping_store)
+
+    assert resolver.resolve("Time-Wizard-of-Tomorrow") == "Time-Wizard"
+    resolver.save()
+
+    assert mapping_store.mappings() == []
+
+
+def test_keys_are_resolved_before_mappings():
+    mapping_store = CardIdMappingStore(":memory:")
+    mapping_store.put_all(
+        [CardIdMapping("Time-Wizard-V1-Ultra-Rare", "Blue-Eyes-White-Dragon", "fuzzy")]
+    )
+    resolver = CardIdResolver(wants_ids, mapping_store)
+
+    assert resolver.resolve("Time-Wizard-V1-Ultra-Rare") == "Time-Wizard"
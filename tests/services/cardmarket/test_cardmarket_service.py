@@ -1,3 +1,5 @@
+from dataclasses import replace
+
 import pytest
 
 from cm_wizard.services.browser import Browser
@@ -9,6 +11,10 @@ from cm_wizard.services.cardmarket.enums.card_language import CardLanguage
 from cm_wizard.services.cardmarket.enums.cardmarket_game import CardmarketGame
 from cm_wizard.services.cardmarket.enums.cardmarket_language import CardmarketLanguage
 from cm_wizard.services.cardmarket.enums.location import Location
+from cm_wizard.services.cardmarket.offer_cache import OfferCache
+from cm_wizard.services.cardmarket.offer_records import CardOfferSeller
+from cm_wizard.services.cardmarket.page_cache import PageCache
+from cm_wizard.services.metrics import metrics
 
 
 @pytest.fixture
@@ -77,6 +83,54 @@ def test_get_wants_list(requests_mock, cardmarket_service: CardmarketService):
     assert item.has_mail_alert == False
 
 
+def test_get_wants_list_bypasses_page_cache(
+    requests_mock, cardmarket_service: CardmarketService
+):
+    mock = requests_mock.get(
+        "https://www.cardmarket.com/en/YuGiOh/Wants/15628908",
+        text=file_text_contents("responses/en_Yugioh_Wants_15628908.html"),
+    )
+    cardmarket_service.page_cache = PageCache(":memory:")
+
+    try:
+        first_result = cardmarket_service.get_wants_list("15628908")
+        second_result = cardmarket_service.get_wants_list("15628908")
+    finally:
+        cardmarket_service.page_cache = None
+
+    # the user may have edited the wants list in between
+    assert mock.call_count == 2
+    assert second_result.items == first_result.items
+
+
+def test_request_metrics(
+    requests_mock, monkeypatch, cardmarket_service: CardmarketService
+):
+    page_text = file_text_contents("responses/en_Yugioh_Wants_15628908.html")
+    requests_mock.get(
+        "https://www.cardmarket.com/en/YuGiOh/Wants/15628908",
+        [{"status_code": 429}, {"text": page_text}],
+    )
+    monkeypatch.setattr(cardmarket_service, "_rate_limited", True)
+    # does not pause for the 429
+    monkeypatch.setattr(
+        cardmarket_service._rate_limiter, "on_too_many_requests", lambda: None
+    )
+    metrics.reset()
+
+    cardmarket_service.get_wants_list("15628908")
+
+    report = metrics.report()
+    assert report.counter("requests", endpoint="wants_list") == 2
+    assert report.counter("too_many_requests", endpoint="wants_list") == 1
+    assert report.counter("retries", endpoint="wants_list") == 1
+    assert report.counter("response_bytes", endpoint="wants_list") == len(
+        page_text.encode()
+    )
+    assert report.timer("limiter_wait", endpoint="wants_list").count == 2
+    assert report.timer("request", endpoint="wants_list").count == 2
+
+
 def test_get_card(requests_mock, cardmarket_service: CardmarketService):
     requests_mock.get(
         "https://www.cardmarket.com/en/YuGiOh/Cards/A-Feather-of-the-Phoenix?language=1,3&minCondition=1&isFirstEd=Y&isAltered=N",
@@ -134,6 +188,80 @@ def test_get_card(requests_mock, cardmarket_service: CardmarketService):
     assert product.image_url == None
 
 
+def test_get_card_offers_from_offer_cache(
+    requests_mock, cardmarket_service: CardmarketService
+):
+    mock = requests_mock.get(
+        "https://www.cardmarket.com/en/YuGiOh/Cards/A-Feather-of-the-Phoenix",
+        text=file_text_contents(
+            "responses/en_Yugioh_Cards_A-Feather-of-the-Phoenix.html"
+        ),
+    )
+    query = CardQuery(
+        id="A-Feather-of-the-Phoenix",
+        expansions=None,
+        languages=None,
+        min_condition=CardCondition.POOR,
+        is_reverse_holo=None,
+        is_signed=None,
+        is_first_edition=None,
+        is_altered=None,
+    )
+    cardmarket_service.offer_cache = OfferCache(":memory:")
+
+    try:
+        first_result = cardmarket_service.get_card_offers(query)
+        second_result = cardmarket_service.get_card_offers(query)
+        stats = cardmarket_service.offer_cache.stats
+    finally:
+        cardmarket_service.offer_cache = None
+
+    assert mock.call_count == 1
+    assert stats.hits == 1 and stats.misses == 1
+    assert second_result == first_result
+    assert len(first_result) == 10
+    offer = first_result[0]
+    assert offer.price_euro_cents == 2
+    assert offer.quantity == 1
+    assert offer.seller == CardOfferSeller(
+        id="wkleebe1", rating="very-good", location=Location.GERMANY
+    )
+    assert offer.condition == CardCondition.MINT
+    assert offer.language == CardLanguage.GERMAN
+
+
+def test_get_seller_offers_from_offer_cache_for_same_wants_list(
+    requests_mock, cardmarket_service: CardmarketService
+):
+    mock = requests_mock.get(
+        "https://www.cardmarket.com/en/YuGiOh/Users/wkleebe1/Offers/Singles",
+        text=file_text_contents(
+            "responses/en_Yugioh_Users_wkleebe1_Offers_Singles_idWantslist_15628908.html"
+        ),
+    )
+    query = CardQuery(
+        id="A-Feather-of-the-Phoenix",
+        expansions=None,
+        languages=None,
+        min_condition=CardCondition.POOR,
+        is_reverse_holo=None,
+        is_signed=None,
+        is_first_edition=None,
+        is_altered=None,
+    )
+    changed_query = replace(query, min_condition=CardCondition.MINT)
+    cardmarket_service.offer_cache = OfferCache(":memory:")
+
+    try:
+        for wanted_queries in [[query], [query], [changed_query], None]:
+            cardmarket_service.get_seller_offers("wkleebe1", "15628908", wanted_queries)
+    finally:
+        cardmarket_service.offer_cache = None
+
+    # the changed wants list and unknown wants lists are requested again
+    assert mock.call_count == 3
+
+
 def test_get_seller_wanted_offers(requests_mock, cardmarket_service: CardmarketService):
     requests_mock.get(
         "https://www.cardmarket.com/en/YuGiOh/Users/wkleebe1/Offers/Singles?idWantsList=15628908",
@@ -0,0 +1,127 @@
+import pytest
+
+from cm_wizard.services.cardmarket import offer_cache as offer_cache_module
+from cm_wizard.services.cardmarket.enums.card_condition import CardCondition
+from cm_wizard.services.cardmarket.enums.card_language import CardLanguage
+from cm_wizard.services.cardmarket.enums.cardmarket_game import CardmarketGame
+from cm_wizard.services.cardmarket.enums.cardmarket_language import CardmarketLanguage
+from cm_wizard.services.cardmarket.enums.location import Location
+from cm_wizard.services.cardmarket.enums.page_type import PageType
+from cm_wizard.services.cardmarket.offer_cache import OfferCache
+from cm_wizard.services.cardmarket.offer_records import (
+    CardOffer,
+    CardOfferSeller,
+    SellerOffer,
+)
+
+EN = CardmarketLanguage.ENGLISH
+YGO = CardmarketGame.YU_GI_OH
+
+card_offers = [
+    CardOffer(
+        price_euro_cents=2,
+        quantity=1,
+        seller=CardOfferSeller(
+            id="seller 1", rating="very-good", location=Location.GERMANY
+        ),
+        condition=CardCondition.MINT,
+        language=CardLanguage.GERMAN,
+    ),
+    CardOffer(price_euro_cents=3, quantity=4, seller=CardOfferSeller(id="seller 2")),
+]
+seller_offers = [
+    SellerOffer(
+        card_id="Time-Wizard",
+        price_euro_cents=10,
+        quantity=2,
+        condition=CardCondition.NEAR_MINT,
+        language=CardLanguage.ENGLISH,
+    )
+]
+
+
+@pytest.fixture
+def now(monkeypatch) -> list[float]:
+    now = [1000.0]
+    monkeypatch.setattr(offer_cache_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_card_offers_roundtrip(tmp_path):
+    path = str(tmp_path / "offers.sqlite3")
+    cache = OfferCache(path)
+    cache.put_card_offers(EN, YGO, "Time-Wizard", {"language": "1"}, card_offers)
+    cache.close()
+
+    cache = OfferCache(path)
+    assert (
+        cache.get_card_offers(EN, YGO, "Time-Wizard", {"language": "1"}) == card_offers
+    )
+    assert cache.get_card_offers(EN, YGO, "Other-Card", {}) is None
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+    assert cache.stats.hit_rate == 0.5
+
+
+def test_changed_filters_invalidate_card_offers():
+    cache = OfferCache(":memory:")
+    cache.put_card_offers(EN, YGO, "Time-Wizard", {"language": "1"}, card_offers)
+
+    assert cache.get_card_offers(EN, YGO, "Time-Wizard", {"language": "3"}) is None
+    assert cache.get_card_offers(EN, YGO, "Time-Wizard", {"language": "1"}) is None
+
+
+def test_seller_offers_expire(now: list[float]):
+    cache = OfferCache(":memory:", ttl_seconds={PageType.SELLER_OFFERS: 10})
+    cache.put_seller_offers(EN, YGO, "seller 1", "123", "wants", seller_offers)
+
+    assert cache.get_seller_offers(EN, YGO, "seller 1", "123", "wants") == (
+        seller_offers
+    )
+    assert cache.get_seller_offers(EN, YGO, "seller 1", "456", "wants") is None
+    now[0] += 11
+    assert cache.get_seller_offers(EN, YGO, "seller 1", "123", "wants") is None
+
+
+def test_changed_wants_list_invalidates_seller_offers():
+    cache = OfferCache(":memory:")
+    cache.put_seller_offers(EN, YGO, "seller 1", "123", "old wants", seller_offers)
+
+    assert cache.get_seller_offers(EN, YGO, "seller 1", "123", "new wants") is None
+    assert cache.get_seller_offers(EN, YGO, "seller 1", "123", "old wants") is None
+
+
+def test_oldest_offers_are_evicted(now: list[float]):
+    cache = OfferCache(":memory:", max_entries=2)
+    for seller_id in ["seller 1", "seller 2", "seller 3"]:
+        now[0] += 1
+        cache.put_seller_offers(EN, YGO, seller_id, "123", "wants", seller_offers)
+
+    assert cache.get_seller_offers(EN, YGO, "seller 1", "123", "wants") is None
+    assert cache.get_seller_offers(EN, YGO, "seller 2", "123", "wants") is not None
+    assert cache.get_seller_offers(EN, YGO, "seller 3", "123", "wants") is not None
+
+
+def test_expired_offers_are_evicted_on_open(tmp_path, now: list[float]):
+    path = str(tmp_path / "offers.sqlite3")
+    cache = OfferCache(path, ttl_seconds={PageType.CARD: 10})
+    cache.put_card_offers(EN, YGO, "Time-Wizard", {}, card_offers)
+    cache.put_seller_offers(EN, YGO, "seller 1", "123", "wants", seller_offers)
+    cache.close()
+    now[0] += 11
+
+    cache = OfferCache(path, ttl_seconds={PageType.CARD: 10})
+
+    assert cache.evict(PageType.CARD) == 0
+    assert cache.evict(PageType.SELLER_OFFERS) == 1
+
+
+def test_evict():
+    cache = OfferCache(":memory:")
+    cache.put_card_offers(EN, YGO, "Time-Wizard", {}, card_offers)
+    cache.put_seller_offers(EN, YGO, "seller 1", "123", "wants", seller_offers)
+
+    assert cache.evict(PageType.SELLER_OFFERS) == 1
+    assert cache.get_card_offers(EN, YGO, "Time-Wizard", {}) == card_offers
+    assert cache.evict() == 1
+    assert cache.get_card_offers(EN, YGO, "Time-Wizard", {}) is None
@@ -0,0 +1,80 @@
+import pytest
+
+from cm_wizard.services.cardmarket import offer_stream
+from cm_wizard.services.cardmarket.enums.cardmarket_language import CardmarketLanguage
+from cm_wizard.services.cardmarket.offer_records import CardOffer, SellerOffer
+from cm_wizard.services.cardmarket.offer_stream import (
+    parse_card_offers,
+    parse_seller_offers,
+    stream_card_offers,
+)
+from cm_wizard.services.cardmarket.pages.card_page import CardPage
+from cm_wizard.services.cardmarket.pages.seller_offers_page import SellerOffersPage
+from cm_wizard.services.locale import Locale
+
+locale = Locale(CardmarketLanguage.ENGLISH)
+card_page_path = "responses/en_Yugioh_Cards_A-Feather-of-the-Phoenix.html"
+seller_offers_page_path = (
+    "responses/en_Yugioh_Users_wkleebe1_Offers_Singles_idWantslist_15628908.html"
+)
+
+
+def file_text_contents(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def test_parse_card_offers_matches_card_page():
+    page_text = file_text_contents(card_page_path)
+
+    offers = parse_card_offers(page_text, locale)
+
+    assert offers == [
+        CardOffer.from_page_offer(offer) for offer in CardPage(page_text, locale).offers
+    ]
+
+
+def test_parse_card_offers_stops_after_max_offers():
+    page_text = file_text_contents(card_page_path)
+
+    offers = parse_card_offers(page_text, locale, max_offers=3)
+
+    assert offers == parse_card_offers(page_text, locale)[:3]
+
+
+def test_stream_card_offers_yields_before_the_page_is_parsed(monkeypatch):
+    monkeypatch.setattr(offer_stream, "STREAM_CHUNK_SIZE", 1024)
+    page_text = file_text_contents(card_page_path)
+    fed_lengths: list[int] = []
+    feed = offer_stream._CardOffersParser.feed
+
+    def recording_feed(parser, data: str):
+        fed_lengths.append(len(data))
+        feed(parser, data)
+
+    monkeypatch.setattr(offer_stream._CardOffersParser, "feed", recording_feed)
+
+    next(stream_card_offers(page_text, locale))
+
+    assert sum(fed_lengths) < len(page_text)
+
+
+def test_parse_seller_offers_matches_seller_offers_page():
+    page_text = file_text_contents(seller_offers_page_path)
+
+    offers = parse_seller_offers(page_text, locale)
+
+    assert offers == [
+        SellerOffer.from_page_offer(offer)
+        for offer in SellerOffersPage(page_text, locale).offers
+    ]
+    assert offers[0].card_id == "A-Feather-of-the-Phoenix"
+
+
+def test_article_rows_parser_requires_row_handling():
+    class IncompleteParser(offer_stream._ArticleRowsParser[CardOffer]):
+        def _handle_row_starttag(self, tag, classes, attributes):
+            pass
+
+    with pytest.raises(TypeError):
+        IncompleteParser(locale)  # type: ignore[abstract]
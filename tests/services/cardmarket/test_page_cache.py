@@ -0,0 +1,127 @@
+import pytest
+
+from cm_wizard.services.cardmarket import page_cache as page_cache_module
+from cm_wizard.services.cardmarket.enums.cardmarket_game import CardmarketGame
+from cm_wizard.services.cardmarket.enums.cardmarket_language import CardmarketLanguage
+from cm_wizard.services.cardmarket.enums.page_type import PageType
+from cm_wizard.services.cardmarket.page_cache import PageCache
+
+EN = CardmarketLanguage.ENGLISH
+YGO = CardmarketGame.YU_GI_OH
+
+
+@pytest.fixture
+def now(monkeypatch) -> list[float]:
+    now = [1000.0]
+    monkeypatch.setattr(page_cache_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_page_type_find_by_endpoint():
+    assert PageType.find_by_endpoint("Wants") == PageType.WANTS_LISTS
+    assert PageType.find_by_endpoint("Wants/15628908") == PageType.WANTS_LIST
+    assert PageType.find_by_endpoint("Cards/Time-Wizard") == PageType.CARD
+    assert (
+        PageType.find_by_endpoint("Users/Seller/Offers/Singles")
+        == PageType.SELLER_OFFERS
+    )
+    assert PageType.find_by_endpoint("Login") is None
+
+
+def test_get_returns_put_page(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite3"))
+
+    cache.put(EN, YGO, "Cards/Time-Wizard", {"language": "1"}, "<html>ä</html>")
+
+    assert cache.get(EN, YGO, "Cards/Time-Wizard", {"language": "1"}) == (
+        "<html>ä</html>"
+    )
+    assert cache.get(EN, YGO, "Cards/Time-Wizard", {"language": "2"}) is None
+    assert cache.get(EN, YGO, "Cards/Time-Wizard") is None
+    assert cache.get(EN, CardmarketGame.MAGIC, "Cards/Time-Wizard", None) is None
+
+
+def test_pages_persist(tmp_path):
+    path = str(tmp_path / "pages.sqlite3")
+    cache = PageCache(path)
+    cache.put(EN, YGO, "Cards/Time-Wizard", None, "card")
+    cache.close()
+
+    assert PageCache(path).get(EN, YGO, "Cards/Time-Wizard") == "card"
+
+
+def test_wants_list_pages_are_not_cached():
+    cache = PageCache(":memory:")
+
+    cache.put(EN, YGO, "Wants", None, "wants lists")
+    cache.put(EN, YGO, "Wants/1", None, "wants")
+
+    assert cache.get(EN, YGO, "Wants") is None
+    assert cache.get(EN, YGO, "Wants/1") is None
+    assert cache.size_bytes() == 0
+
+
+def test_pages_expire_per_page_type(now: list[float]):
+    cache = PageCache(":memory:", ttl_seconds={PageType.WANTS_LIST: 10})
+    cache.put(EN, YGO, "Wants/1", None, "wants")
+    cache.put(EN, YGO, "Cards/Time-Wizard", None, "card")
+
+    now[0] += 11
+
+    assert cache.get(EN, YGO, "Wants/1") is None
+    assert cache.get(EN, YGO, "Cards/Time-Wizard") == "card"
+
+
+def test_least_recently_used_pages_are_evicted(now: list[float]):
+    cache = PageCache(":memory:")
+    cache.put(EN, YGO, "Cards/A", None, "a" * 1000)
+    page_size = cache.size_bytes()
+    cache.max_size_bytes = 2 * page_size
+
+    now[0] += 1
+    cache.put(EN, YGO, "Cards/B", None, "b" * 1000)
+    now[0] += 1
+    cache.get(EN, YGO, "Cards/A")
+    now[0] += 1
+    cache.put(EN, YGO, "Cards/C", None, "c" * 1000)
+
+    assert cache.get(EN, YGO, "Cards/A") is not None
+    assert cache.get(EN, YGO, "Cards/B") is None
+    assert cache.get(EN, YGO, "Cards/C") is not None
+
+
+def test_evict(now: list[float]):
+    cache = PageCache(":memory:")
+    cache.put(EN, YGO, "Users/Seller/Offers/Singles", None, "offers")
+    cache.put(EN, YGO, "Cards/A", None, "a")
+    cache.put(EN, YGO, "Cards/B", None, "b")
+
+    assert cache.evict(PageType.CARD) == 2
+    assert cache.get(EN, YGO, "Users/Seller/Offers/Singles") == "offers"
+    assert cache.evict() == 1
+    assert cache.size_bytes() == 0
+
+
+def test_replaced_pages_are_not_counted_twice(now: list[float]):
+    cache = PageCache(":memory:")
+    cache.put(EN, YGO, "Cards/A", None, "a" * 1000)
+    cache.max_size_bytes = cache.size_bytes()
+
+    now[0] += 1
+    cache.put(EN, YGO, "Cards/A", None, "a" * 1000)
+
+    assert cache.get(EN, YGO, "Cards/A") is not None
+
+
+def test_expired_pages_are_evicted_on_open(tmp_path, now: list[float]):
+    path = str(tmp_path / "pages.sqlite3")
+    cache = PageCache(path, ttl_seconds={PageType.CARD: 10})
+    cache.put(EN, YGO, "Cards/A", None, "a")
+    cache.put(EN, YGO, "Users/Seller/Offers/Singles", None, "offers")
+    cache.close()
+
+    now[0] += 11
+    cache = PageCache(path, ttl_seconds={PageType.CARD: 10})
+
+    assert cache.evict(PageType.CARD) == 0
+    assert cache.get(EN, YGO, "Users/Seller/Offers/Singles") == "offers"
@@ -0,0 +1,48 @@
+import asyncio
+from functools import partial
+
+import pytest
+
+from cm_wizard.services.cardmarket.enums.cardmarket_language import CardmarketLanguage
+from cm_wizard.services.cardmarket.offer_stream import (
+    parse_card_offers,
+    parse_paged_seller_offers,
+)
+from cm_wizard.services.cardmarket.page_parser_pool import PageParserPool
+from cm_wizard.services.locale import Locale
+
+CARD_PATH = "responses/en_Yugioh_Cards_A-Feather-of-the-Phoenix.html"
+SELLER_OFFERS_PATH = (
+    "responses/en_Yugioh_Users_wkleebe1_Offers_Singles_idWantslist_15628908.html"
+)
+
+
+def file_text_contents(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("max_workers", [0, 2])
+def test_parse(max_workers: int):
+    locale = Locale(CardmarketLanguage.ENGLISH)
+    card_page_text = file_text_contents(CARD_PATH)
+    seller_offers_page_text = file_text_contents(SELLER_OFFERS_PATH)
+    page_parser_pool = PageParserPool(max_workers)
+
+    async def parse_pages():
+        return await asyncio.gather(
+            page_parser_pool.parse(
+                partial(parse_card_offers, max_offers=5), card_page_text, locale
+            ),
+            page_parser_pool.parse(
+                parse_paged_seller_offers, seller_offers_page_text, locale
+            ),
+        )
+
+    try:
+        card_offers, seller_offers = asyncio.run(parse_pages())
+    finally:
+        page_parser_pool.shutdown()
+
+    assert card_offers == parse_card_offers(card_page_text, locale, 5)
+    assert seller_offers == parse_paged_seller_offers(seller_offers_page_text, locale)
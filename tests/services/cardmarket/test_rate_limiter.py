@@ -0,0 +1,65 @@
+import pytest
+
+from cm_wizard.services.cardmarket import rate_limiter
+from cm_wizard.services.cardmarket.rate_limiter import SlidingWindowRateLimiter
+
+
+@pytest.fixture
+def now(monkeypatch) -> list[float]:
+    now = [0.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_reserve_allows_bursts_up_to_budget(now: list[float]):
+    limiter = SlidingWindowRateLimiter(budget=3, window_seconds=10)
+
+    assert [limiter._reserve(1) for _ in range(3)] == [0, 0, 0]
+    # waits until the oldest requests leave the window
+    assert [limiter._reserve(1) for _ in range(4)] == [10, 10, 10, 20]
+
+
+def test_reserve_frees_budget_after_window(now: list[float]):
+    limiter = SlidingWindowRateLimiter(budget=3, window_seconds=10)
+    limiter._reserve(1)
+    now[0] = 5
+    limiter._reserve(2)
+
+    now[0] = 10
+    assert limiter._reserve(1) == 0
+    assert limiter._reserve(1) == 5
+
+
+def test_reserve_weights_costs(now: list[float]):
+    limiter = SlidingWindowRateLimiter(budget=30, window_seconds=10)
+
+    assert limiter._reserve(3) == 0
+    assert [limiter._reserve(1) for _ in range(27)] == [0] * 27
+    assert limiter._reserve(3) == 10
+
+
+def test_wait_seconds(now: list[float]):
+    limiter = SlidingWindowRateLimiter(budget=3, window_seconds=10)
+
+    assert limiter.wait_seconds(3) == 0
+    assert limiter.wait_seconds(4) == 10
+    for _ in range(3):
+        limiter._reserve(1)
+    now[0] = 5
+    assert limiter.wait_seconds(1) == 5
+    assert limiter.wait_seconds(4) == 15
+
+
+def test_on_too_many_requests_blocks_and_lowers_budget(now: list[float]):
+    limiter = SlidingWindowRateLimiter(budget=10, window_seconds=10)
+    for _ in range(4):
+        limiter._reserve(1)
+
+    limiter.on_too_many_requests()
+
+    assert limiter.budget == 4
+    assert limiter._reserve(1) == 10
+    now[0] = 15
+    assert limiter.budget == 5
+    now[0] = 1000
+    assert limiter.budget == 10
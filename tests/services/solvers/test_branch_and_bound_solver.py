@@ -0,0 +1,162 @@
+from cm_wizard.services.offer_matrix import OfferMatrix
+from cm_wizard.services.solvers.branch_and_bound_solver import BranchAndBoundSolver
+from cm_wizard.services.solvers.wizard_result import WizardResult
+
+
+def test_solve_simple_case():
+    wanted_cards = ["c1", "c2", "c3"]
+    sellers = {
+        "s1": {
+            "c1": [1],
+            "c2": [2],
+            "c3": [3],
+        },
+        "s2": {
+            "c1": [2],
+            "c2": [1],
+            "c3": [1],
+        },
+        "s3": {
+            "c2": [2],
+            "c3": [1],
+        },
+    }
+
+    result = BranchAndBoundSolver(
+        wanted_cards, OfferMatrix.from_sellers_offers(sellers)
+    ).solve()
+
+    assert result == WizardResult(
+        total_price=3,
+        sellers={
+            "s1": [("c1", 1)],
+            "s2": [("c2", 1), ("c3", 1)],
+        },
+    )
+
+
+def test_solve_with_shipping_costs_across_sellers():
+    wanted_cards = ["c1", "c2", "c3"]
+    sellers = {
+        "s1": {
+            "c1": [8],
+            "c2": [8],
+        },
+        "s2": {
+            "c1": [7],
+            "c3": [8],
+        },
+    }
+    # the dynamic program buys c1 from s1, which costs 1 more
+    initial_result = WizardResult(
+        total_price=44,
+        sellers={
+            "s1": [("c1", 8), ("c2", 8)],
+            "s2": [("c3", 8)],
+        },
+    )
+
+    result = BranchAndBoundSolver(
+        wanted_cards, OfferMatrix.from_sellers_offers(sellers), shipping_cost=10
+    ).solve(
+        initial_results=[initial_result],
+    )
+
+    assert result == WizardResult(
+        total_price=43,
+        sellers={
+            "s1": [("c2", 8)],
+            "s2": [("c1", 7), ("c3", 8)],
+        },
+    )
+
+
+def test_solve_with_duplicate_wants_and_missing_offers():
+    wanted_cards = ["c1", "c2", "c1", "c1", "c3"]
+    sellers = {
+        "s1": {
+            "c1": [1, 5],
+            "c2": [3],
+        },
+        "s2": {
+            "c2": [2],
+        },
+    }
+
+    result = BranchAndBoundSolver(
+        wanted_cards, OfferMatrix.from_sellers_offers(sellers), shipping_cost=2
+    ).solve()
+
+    assert result == WizardResult(
+        total_price=11,
+        sellers={
+            "s1": [("c1", 1), ("c1", 5), ("c2", 3)],
+        },
+        missing_cards=["c1", "c3"],
+    )
+
+
+def test_solve_returns_initial_result_without_time_budget():
+    wanted_cards = ["c1", "c2"]
+    sellers = {
+        "s1": {
+            "c1": [1],
+            "c2": [5],
+        },
+        "s2": {
+            "c2": [1],
+        },
+    }
+    initial_result = WizardResult(
+        total_price=16,
+        sellers={
+            "s1": [("c1", 1), ("c2", 5)],
+        },
+    )
+
+    result = BranchAndBoundSolver(
+        wanted_cards, OfferMatrix.from_sellers_offers(sellers), shipping_cost=10
+    ).solve(
+        initial_results=[initial_result],
+        time_budget_seconds=0,
+    )
+
+    assert result == initial_result
+
+
+def test_solve_iteratively():
+    wanted_cards = ["c1", "c2", "c3"]
+    sellers = {
+        "s1": {
+            "c1": [1],
+            "c2": [1],
+        },
+        "s2": {
+            "c1": [5],
+            "c2": [5],
+            "c3": [1],
+        },
+    }
+    initial_result = WizardResult(
+        total_price=23,
+        sellers={
+            "s1": [("c1", 1), ("c2", 1)],
+            "s2": [("c3", 1)],
+        },
+    )
+
+    results = list(
+        BranchAndBoundSolver(
+            wanted_cards, OfferMatrix.from_sellers_offers(sellers), shipping_cost=10
+        ).solve_iteratively(initial_results=[initial_result])
+    )
+
+    assert results == [
+        initial_result,
+        WizardResult(
+            total_price=21,
+            sellers={
+                "s2": [("c1", 5), ("c2", 5), ("c3", 1)],
+            },
+        ),
+    ]
@@ -0,0 +1,140 @@
+import random
+import tracemalloc
+
+from cm_wizard.services.offer_matrix import OfferMatrix
+from cm_wizard.services.solvers.local_search_solver import LocalSearchSolver
+from cm_wizard.services.solvers.wizard_result import WizardResult
+
+
+def test_improve_eliminates_seller():
+    wanted_cards = ["c1", "c2"]
+    sellers = {
+        "s1": {"c1": [1], "c2": [5]},
+        "s2": {"c2": [1]},
+    }
+    result = WizardResult(
+        total_price=1 + 1 + 2 * 10,
+        sellers={"s1": [("c1", 1)], "s2": [("c2", 1)]},
+    )
+
+    improved_result = LocalSearchSolver(
+        wanted_cards, OfferMatrix.from_sellers_offers(sellers), shipping_cost=10
+    ).improve(result)
+
+    assert improved_result == WizardResult(
+        total_price=1 + 5 + 10,
+        sellers={"s1": [("c1", 1), ("c2", 5)]},
+    )
+
+
+def test_improve_merges_sellers():
+    wanted_cards = ["c1", "c2"]
+    sellers = {
+        "s1": {"c1": [1]},
+        "s2": {"c2": [1]},
+        "s3": {"c1": [2], "c2": [2]},
+    }
+    result = WizardResult(
+        total_price=1 + 1 + 2 * 10,
+        sellers={"s1": [("c1", 1)], "s2": [("c2", 1)]},
+    )
+
+    improved_result = LocalSearchSolver(
+        wanted_cards, OfferMatrix.from_sellers_offers(sellers), shipping_cost=10
+    ).improve(result)
+
+    # neither s1 nor s2 offers the card of the other
+    assert improved_result == WizardResult(
+        total_price=2 + 2 + 10,
+        sellers={"s3": [("c1", 2), ("c2", 2)]},
+    )
+
+
+def test_improve_swaps_copies():
+    wanted_cards = ["c1", "c1", "c2"]
+    sellers = {
+        "s1": {"c1": [1, 9]},
+        "s2": {"c1": [2], "c2": [1]},
+    }
+    result = WizardResult(
+        total_price=1 + 9 + 1 + 2 * 10,
+        sellers={"s1": [("c1", 1), ("c1", 9)], "s2": [("c2", 1)]},
+    )
+
+    improved_result = LocalSearchSolver(
+        wanted_cards, OfferMatrix.from_sellers_offers(sellers), shipping_cost=10
+    ).improve(result)
+
+    assert improved_result == WizardResult(
+        total_price=1 + 2 + 1 + 2 * 10,
+        sellers={"s1": [("c1", 1)], "s2": [("c1", 2), ("c2", 1)]},
+    )
+
+
+def test_improve_keeps_missing_cards():
+    wanted_cards = ["c1", "c2", "c3"]
+    sellers = {
+        "s1": {"c1": [1], "c2": [5]},
+        "s2": {"c2": [1]},
+    }
+    result = WizardResult(
+        total_price=1 + 1 + 2 * 10,
+        sellers={"s1": [("c1", 1)], "s2": [("c2", 1)]},
+        missing_cards=["c3"],
+    )
+
+    improved_result = LocalSearchSolver(
+        wanted_cards, OfferMatrix.from_sellers_offers(sellers), shipping_cost=10
+    ).improve(result)
+
+    assert improved_result.total_price == 1 + 5 + 10
+    assert improved_result.missing_cards == ["c3"]
+
+
+def test_improve_returns_results_of_other_offers_unchanged():
+    result = WizardResult(total_price=1, sellers={"s2": [("c1", 1)]})
+
+    improved_result = LocalSearchSolver(
+        ["c1"], OfferMatrix.from_sellers_offers({"s1": {"c1": [1]}}), shipping_cost=10
+    ).improve(result)
+
+    assert improved_result is result
+
+
+def test_randomized_greedy_result():
+    wanted_cards = ["c1", "c2", "c2", "c3"]
+    sellers = {
+        "s1": {"c1": [1], "c2": [5]},
+        "s2": {"c2": [1]},
+    }
+    solver = LocalSearchSolver(
+        wanted_cards, OfferMatrix.from_sellers_offers(sellers), shipping_cost=10
+    )
+
+    result = solver.randomized_greedy_result(random.Random(0))
+
+    # every seller is needed for the two copies of c2
+    assert result == WizardResult(
+        total_price=1 + 5 + 1 + 2 * 10,
+        sellers={"s1": [("c1", 1), ("c2", 5)], "s2": [("c2", 1)]},
+        missing_cards=["c3"],
+    )
+    assert solver.randomized_greedy_result(random.Random(0)) == result
+
+
+def test_memory_is_proportional_to_offered_pairs():
+    # every seller offers a single card, but one card is wanted 20 times
+    sellers = {f"s{index}": {f"c{index}": [1]} for index in range(1000)}
+    sellers["s0"]["c0"] = [1] * 20
+    wanted_cards = [f"c{index}" for index in range(1000)] + ["c0"] * 19
+    offers = OfferMatrix.from_sellers_offers(sellers)
+
+    tracemalloc.start()
+    solver = LocalSearchSolver(wanted_cards, offers, shipping_cost=10)
+    result = solver.randomized_greedy_result(random.Random(0))
+    _, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert result.total_price == 1019 + 1000 * 10
+    # prices by card, seller and copy would take 1000 * 1000 * 21 * 8 bytes
+    assert peak_size < 1000 * offers.pair_count
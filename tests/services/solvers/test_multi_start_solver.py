@@ -0,0 +1,131 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from cm_wizard.services.offer_matrix import OfferMatrix, SharedOfferMatrix
+from cm_wizard.services.solvers import multi_start_solver
+from cm_wizard.services.solvers.multi_start_solver import MultiStartSolver
+from cm_wizard.services.solvers.wizard_result import WizardResult
+
+
+@pytest.mark.parametrize("max_workers", [0, 2])
+def test_solve(max_workers: int):
+    wanted_cards = ["c1", "c2", "c3"]
+    sellers = {
+        "s1": {"c1": [1]},
+        "s2": {"c2": [1]},
+        "s3": {"c1": [2], "c2": [2], "c3": [5]},
+        "s4": {"c3": [1]},
+    }
+
+    result = MultiStartSolver(
+        wanted_cards,
+        OfferMatrix.from_sellers_offers(sellers),
+        shipping_cost=10,
+        max_workers=max_workers,
+    ).solve(start_count=4)
+
+    assert result == WizardResult(
+        total_price=2 + 2 + 5 + 10,
+        sellers={"s3": [("c1", 2), ("c2", 2), ("c3", 5)]},
+    )
+
+
+@pytest.mark.parametrize("max_workers", [0, 2])
+def test_solve_stops_at_time_budget(max_workers: int):
+    wanted_cards = ["c1", "c2"]
+    sellers = {
+        "s1": {"c1": [1], "c2": [5]},
+        "s2": {"c2": [1]},
+    }
+    initial_result = WizardResult(
+        total_price=1 + 1 + 2 * 10,
+        sellers={"s1": [("c1", 1)], "s2": [("c2", 1)]},
+    )
+
+    result = MultiStartSolver(
+        wanted_cards,
+        OfferMatrix.from_sellers_offers(sellers),
+        shipping_cost=10,
+        max_workers=max_workers,
+    ).solve(initial_results=[initial_result], start_count=100, time_budget_seconds=0)
+
+    # neither the randomized starts nor any move begin after the deadline
+    assert result == initial_result
+
+
+def test_solve_logs_skipped_starts(caplog):
+    sellers = {"s1": {"c1": [1]}}
+
+    MultiStartSolver(
+        ["c1"], OfferMatrix.from_sellers_offers(sellers), max_workers=0
+    ).solve(
+        initial_results=[WizardResult(total_price=1, sellers={"s1": [("c1", 1)]})],
+        start_count=3,
+        time_budget_seconds=0,
+    )
+
+    assert "skipped 3 randomized starts" in caplog.text
+
+
+def test_solve_shuts_down_workers_before_unlinking_offers(monkeypatch):
+    events: list[str] = []
+    shutdown = ProcessPoolExecutor.shutdown
+    unlink = SharedOfferMatrix.unlink
+
+    def record_shutdown(executor, *args, **kwargs):
+        events.append("shutdown")
+        shutdown(executor, *args, **kwargs)
+
+    def record_unlink(shared_offers):
+        events.append("unlink")
+        unlink(shared_offers)
+
+    def interrupt(futures):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(ProcessPoolExecutor, "shutdown", record_shutdown)
+    monkeypatch.setattr(SharedOfferMatrix, "unlink", record_unlink)
+    monkeypatch.setattr(multi_start_solver, "wait", interrupt)
+    solver = MultiStartSolver(
+        ["c1"], OfferMatrix.from_sellers_offers({"s1": {"c1": [1]}}), max_workers=1
+    )
+
+    with pytest.raises(KeyboardInterrupt):
+        solver.solve(start_count=1)
+
+    assert events == ["shutdown", "unlink"]
+
+
+def test_solve_ignores_results_of_other_offers():
+    wanted_cards = ["c1"]
+    sellers = {"s1": {"c1": [5]}}
+    other_result = WizardResult(total_price=1, sellers={"s2": [("c1", 1)]})
+
+    result = MultiStartSolver(
+        wanted_cards,
+        OfferMatrix.from_sellers_offers(sellers),
+        shipping_cost=10,
+        max_workers=0,
+    ).solve(initial_results=[other_result], start_count=1)
+
+    assert result == WizardResult(total_price=15, sellers={"s1": [("c1", 5)]})
+
+
+def test_solve_with_shared_offers():
+    wanted_cards = ["c1", "c2"]
+    sellers = {
+        "s1": {"c1": [1], "c2": [5]},
+        "s2": {"c2": [1]},
+    }
+
+    with SharedOfferMatrix.create(
+        OfferMatrix.from_sellers_offers(sellers)
+    ) as shared_offers:
+        result = MultiStartSolver(
+            wanted_cards, shared_offers, shipping_cost=10, max_workers=2
+        ).solve(start_count=2)
+
+    assert result == WizardResult(
+        total_price=1 + 5 + 10, sellers={"s1": [("c1", 1), ("c2", 5)]}
+    )
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+from cm_wizard.services.metrics import Metrics, ProgressEstimator, metrics
+
+
+def test_report():
+    metrics = Metrics()
+    metrics.increment("requests", endpoint="card")
+    metrics.increment("requests", endpoint="card")
+    metrics.increment("requests", endpoint="seller_offers")
+    metrics.observe("request", 0.5, endpoint="card")
+    metrics.observe("request", 1.5, endpoint="card")
+
+    report = metrics.report()
+
+    assert report.counter("requests") == 3
+    assert report.counter("requests", endpoint="card") == 2
+    assert report.counter("retries") == 0
+    timer = report.timer("request", endpoint="card")
+    assert timer.count == 2
+    assert timer.total_seconds == 2
+    assert timer.max_seconds == 1.5
+    assert timer.mean_seconds == 1
+
+
+def test_timed():
+    metrics = Metrics()
+
+    @metrics.timed("solve")
+    def solve() -> int:
+        return 1
+
+    @metrics.timed("request", endpoint="card")
+    async def request() -> int:
+        await asyncio.sleep(0.01)
+        return 2
+
+    assert solve() == 1
+    assert asyncio.run(request()) == 2
+    report = metrics.report()
+    assert report.timer("solve").count == 1
+    assert report.timer("request", endpoint="card").total_seconds >= 0.01
+
+
+def test_reset():
+    metrics = Metrics()
+    metrics.increment("requests")
+    with metrics.timer("solve"):
+        pass
+
+    metrics.reset()
+
+    assert metrics.report().counters == []
+    assert metrics.report().timers == []
+
+
+def test_to_json():
+    metrics = Metrics()
+    metrics.increment("requests", endpoint="card")
+
+    result = json.loads(metrics.report().to_json())
+
+    assert result == {
+        "counters": [{"name": "requests", "labels": {"endpoint": "card"}, "value": 1}],
+        "timers": [],
+    }
+
+
+def test_to_prometheus():
+    metrics = Metrics()
+    metrics.increment("requests", endpoint="card")
+    metrics.increment("server_error_retries")
+    metrics.observe("request", 0.25, endpoint='say "hi"')
+
+    result = metrics.report().to_prometheus()
+
+    assert result == (
+        "# TYPE cm_wizard_requests_total counter\n"
+        'cm_wizard_requests_total{endpoint="card"} 1\n'
+        "# TYPE cm_wizard_server_error_retries_total counter\n"
+        "cm_wizard_server_error_retries_total 1\n"
+        "# TYPE cm_wizard_request_seconds summary\n"
+        'cm_wizard_request_seconds_sum{endpoint="say \\"hi\\""} 0.25\n'
+        'cm_wizard_request_seconds_count{endpoint="say \\"hi\\""} 1\n'
+    )
+
+
+def test_estimate_remaining_seconds(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr("time.monotonic", lambda: now)
+    estimator = ProgressEstimator()
+
+    assert estimator.estimate_remaining_seconds(0, "stage 1") is None
+    now = 110
+    assert estimator.estimate_remaining_seconds(0.25, "stage 1") == 30
+    now = 120
+    assert estimator.estimate_remaining_seconds(0, "stage 2") is None
+    now = 125
+    assert estimator.estimate_remaining_seconds(0.5, "stage 2") == 5
+
+
+def test_estimate_remaining_seconds_from_requests(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr("time.monotonic", lambda: now)
+    metrics.reset()
+    estimator = ProgressEstimator(
+        rate_limit_wait_seconds=lambda request_count: 10 * request_count,
+        concurrent_requests=2,
+    )
+
+    assert estimator.estimate_remaining_seconds(0, "stage") is None
+    metrics.observe("request", 1, endpoint="card")
+    metrics.observe("request", 3, endpoint="card")
+    now = 200
+    # 6 requests remain, 2 at a time
+    assert estimator.estimate_remaining_seconds(0.25, "stage") == 6 * 2 / 2 + 60
@@ -0,0 +1,149 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from cm_wizard.services.offer_matrix import (
+    OfferMatrix,
+    OfferMatrixBuilder,
+    SharedOfferMatrix,
+)
+
+
+def test_build():
+    builder = OfferMatrixBuilder()
+    builder.add_offer("c1", "s1", 5)
+    builder.add_offer("c1", "s1", 2, quantity=2)
+    builder.add_offer("c2", "s2", 3, quantity=50)
+    builder.add_offer("c1", "s2", 1)
+    builder.add_offer("c1", "s1", 2)
+    builder.add_seller("s3")
+
+    result = builder.build()
+
+    assert result.card_ids == ["c1", "c2"]
+    assert result.seller_ids == ["s1", "s2", "s3"]
+    assert result.card_pair_pointers.tolist() == [0, 2, 3]
+    assert result.pair_sellers.tolist() == [0, 1, 1]
+    assert result.pair_run_pointers.tolist() == [0, 2, 3, 4]
+    assert result.run_prices.tolist() == [2, 5, 1, 3]
+    assert result.run_quantities.tolist() == [3, 1, 1, 50]
+
+
+def test_copy_price():
+    matrix = OfferMatrix.from_sellers_offers(
+        {
+            "s1": {"c1": [1, 2, 2, 5]},
+            "s2": {"c1": [3]},
+        }
+    )
+
+    assert [matrix.copy_price(0, 0, copy) for copy in range(5)] == [1, 2, 2, 5, None]
+    assert matrix.copy_price(0, 1, 0) == 3
+    assert matrix.copy_count(0, 0) == 4
+    assert matrix.copy_count(0, 1) == 1
+
+
+def test_copies_price():
+    builder = OfferMatrixBuilder()
+    builder.add_offer("c1", "s1", 1)
+    builder.add_offer("c1", "s1", 2, quantity=3)
+    builder.add_offer("c1", "s1", 5, quantity=2)
+    builder.add_offer("c2", "s1", 4)
+    matrix = builder.build()
+
+    assert [matrix.copies_price(0, 0, count) for count in range(8)] == [
+        0,
+        1,
+        3,
+        5,
+        7,
+        12,
+        17,
+        None,
+    ]
+    assert matrix.copies_price(1, 0, 1) == 4
+    assert matrix.copies_prices(np.array([0, 0, 1]), np.array([0, 5, 1])).tolist() == [
+        0,
+        12,
+        4,
+    ]
+
+
+def test_pair_index():
+    matrix = OfferMatrix.from_sellers_offers(
+        {
+            "s1": {"c1": [1], "c2": [2]},
+            "s2": {"c2": [3]},
+            "s3": {"c1": [4]},
+        }
+    )
+
+    assert [matrix.pair_index(0, seller) for seller in range(3)] == [0, None, 1]
+    assert [matrix.pair_index(1, seller) for seller in range(3)] == [2, 3, None]
+
+
+def test_seller_card_counts():
+    matrix = OfferMatrix.from_sellers_offers(
+        {
+            "s1": {"c1": [1], "c2": [2, 2]},
+            "s2": {"c2": [3]},
+            "s3": {},
+        }
+    )
+
+    assert matrix.seller_card_counts().tolist() == [2, 1, 0]
+
+
+def test_expand_copies():
+    matrix = OfferMatrix.from_sellers_offers(
+        {
+            "s1": {"c1": [1, 2, 2, 5], "c2": [4, 4]},
+            "s2": {"c1": [3]},
+        }
+    )
+
+    cards, sellers, prices = matrix.expand_copies(np.array([2, 1]))
+
+    assert cards.tolist() == [0, 0, 0, 1]
+    assert sellers.tolist() == [0, 0, 1, 0]
+    assert prices.tolist() == [1, 2, 3, 4]
+
+
+def test_to_sellers_offers():
+    sellers_offers = {
+        "s1": {"c1": [1, 2, 2], "c2": [3]},
+        "s2": {},
+    }
+
+    result = OfferMatrix.from_sellers_offers(sellers_offers).to_sellers_offers()
+
+    assert result == sellers_offers
+
+
+def test_shared_offer_matrix():
+    sellers_offers = {
+        "s1": {"c1": [1, 2, 2], "c2": [3]},
+        "s2": {"c1": [4]},
+        "s3": {},
+    }
+
+    with SharedOfferMatrix.create(
+        OfferMatrix.from_sellers_offers(sellers_offers)
+    ) as shared_offers:
+        attached_offers = SharedOfferMatrix.attach(shared_offers.name)
+        unpickled_offers = pickle.loads(pickle.dumps(shared_offers))
+
+        for offers in [shared_offers, attached_offers, unpickled_offers]:
+            assert offers.offers.to_sellers_offers() == sellers_offers
+            assert not offers.offers.run_prices.flags.writeable
+            # the derived arrays are shared, not computed again
+            assert not offers.offers.run_price_offsets.flags.writeable
+            assert offers.offers.copies_price(0, 0, 3) == 5
+        attached_offers.close()
+        attached_offers.close()
+        unpickled_offers.close()
+        shared_offers.close()
+
+    with pytest.raises(FileNotFoundError):
+        SharedOfferMatrix.attach(shared_offers.name)
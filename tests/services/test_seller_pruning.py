@@ -0,0 +1,130 @@
+import random
+
+from cm_wizard.services.offer_matrix import OfferMatrix
+from cm_wizard.services.seller_pruning import (
+    find_prunable_seller_ids,
+    rank_seller_ids,
+    seller_lower_bounds,
+)
+from cm_wizard.services.solvers.branch_and_bound_solver import BranchAndBoundSolver
+from cm_wizard.services.solvers.wizard_result import WizardResult
+
+
+def test_seller_lower_bounds():
+    wanted_cards = ["c1", "c2"]
+    offers = OfferMatrix.from_sellers_offers(
+        {
+            "s1": {"c1": [1], "c2": [1]},
+            "s2": {"c1": [3]},
+            "s3": {"c2": [2]},
+        }
+    )
+
+    lower_bounds = seller_lower_bounds(wanted_cards, offers, shipping_cost=10)
+
+    # the cheapest prices are 1 + 1, other offers cost at least 3 for c1 and 2 for c2
+    assert lower_bounds.tolist() == [2 + 10, 2 + 10 + 2 + 1, 2 + 10 + 2 + 1]
+
+
+def test_rank_seller_ids():
+    wanted_cards = ["c1", "c2", "c3"]
+    offers = OfferMatrix.from_sellers_offers(
+        {
+            "s0": {"c3": [1]},
+            "s1": {"c1": [2], "c3": [1]},
+            "s2": {"c1": [1], "c2": [3]},
+            "s3": {"c2": [1], "c3": [1]},
+            "s4": {"c1": [1], "c3": [1]},
+        }
+    )
+
+    seller_ids = rank_seller_ids(
+        wanted_cards, offers, 10, ["s0", "s1", "s2", "s3", "s4", "s5"]
+    )
+
+    # s3 has the lowest bound, s2 and s4 tie, s1 and s0 tie, but s1 offers more cards
+    # and s5 offers nothing that is known
+    assert seller_ids == ["s3", "s2", "s4", "s1", "s0", "s5"]
+
+
+def test_find_prunable_seller_ids():
+    wanted_cards = ["c1", "c2"]
+    offers = OfferMatrix.from_sellers_offers(
+        {
+            "s1": {"c1": [1], "c2": [1]},
+            "s2": {"c1": [3], "c2": [3]},
+            "s3": {"c2": [2]},
+        }
+    )
+    best_result = WizardResult(total_price=12, sellers={"s1": [("c1", 1), ("c2", 1)]})
+
+    pruned_seller_ids = find_prunable_seller_ids(wanted_cards, offers, 10, best_result)
+
+    # s3 might offer c1 for 3 as well, which still costs more than 12
+    assert pruned_seller_ids == {"s2", "s3"}
+
+
+def test_find_prunable_seller_ids_with_missing_cards():
+    wanted_cards = ["c1", "c1"]
+    offers = OfferMatrix.from_sellers_offers(
+        {
+            "s1": {"c1": [1]},
+            "s2": {"c1": [5]},
+        }
+    )
+    best_result = WizardResult(
+        total_price=11, sellers={"s1": [("c1", 1)]}, missing_cards=["c1"]
+    )
+
+    assert find_prunable_seller_ids(wanted_cards, offers, 10, best_result) == set()
+
+
+def test_find_prunable_seller_ids_keeps_optimum():
+    random_generator = random.Random(0)
+    for _ in range(20):
+        card_ids = [f"c{i}" for i in range(4)]
+        wanted_cards = card_ids + random_generator.sample(card_ids, 2)
+        sellers_offers = {
+            f"s{i}": {
+                card_id: sorted(
+                    random_generator.randint(1, 20)
+                    for _ in range(random_generator.randint(1, 2))
+                )
+                for card_id in random_generator.sample(card_ids, 3)
+            }
+            for i in range(6)
+        }
+        # card pages only list the 3 cheapest copies of each card
+        card_pages_offers: dict[str, dict[str, list[int]]] = {
+            seller_id: {} for seller_id in sellers_offers
+        }
+        for card_id in card_ids:
+            copies = sorted(
+                (price, seller_id)
+                for seller_id, seller_offers in sellers_offers.items()
+                for price in seller_offers.get(card_id, [])
+            )
+            for price, seller_id in copies[:3]:
+                card_pages_offers[seller_id].setdefault(card_id, []).append(price)
+        card_pages_matrix = OfferMatrix.from_sellers_offers(card_pages_offers)
+        best_result = BranchAndBoundSolver(
+            wanted_cards, card_pages_matrix, shipping_cost=10
+        ).solve()
+        optimum = BranchAndBoundSolver(
+            wanted_cards, OfferMatrix.from_sellers_offers(sellers_offers), 10
+        ).solve()
+
+        pruned_seller_ids = find_prunable_seller_ids(
+            wanted_cards, card_pages_matrix, 10, best_result
+        )
+        remaining_sellers_offers = {
+            seller_id: seller_offers
+            for seller_id, seller_offers in sellers_offers.items()
+            if seller_id not in pruned_seller_ids
+        }
+        result = BranchAndBoundSolver(
+            wanted_cards, OfferMatrix.from_sellers_offers(remaining_sellers_offers), 10
+        ).solve()
+
+        assert result.total_price == optimum.total_price
+        assert result.missing_cards == optimum.missing_cards
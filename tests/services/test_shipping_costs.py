@@ -0,0 +1,105 @@
+import numpy as np
+
+from cm_wizard.services.cardmarket.enums.location import Location
+from cm_wizard.services.shipping_costs import (
+    ShippingCosts,
+    ShippingTariff,
+    ShippingTariffTable,
+    ShippingTier,
+    ShippingTiers,
+)
+from cm_wizard.services.shopping_wizard_service import (
+    WizardResult,
+    WizardSolver,
+    shopping_wizard_service,
+)
+
+tiers = ShippingTiers(
+    [
+        ShippingTier(
+            name="letter", max_item_count=2, max_value_euro_cents=10, is_tracked=False
+        ),
+        ShippingTier(
+            name="parcel",
+            max_item_count=None,
+            max_value_euro_cents=None,
+            is_tracked=True,
+        ),
+    ]
+)
+
+
+def test_tier_indices():
+    tier_indices = tiers.tier_indices(np.array([1, 2, 3, 1]), np.array([5, 10, 5, 11]))
+
+    assert tier_indices.tolist() == [0, 0, 1, 1]
+
+
+def test_to_matrix():
+    shipping_costs = ShippingCosts(
+        tiers, {"s1": ShippingTariff((1, 5))}, ShippingTariff((2, 8))
+    )
+
+    matrix = shipping_costs.to_matrix(["s1", "s2"])
+
+    assert matrix.tier_prices.tolist() == [[1, 5], [2, 8]]
+    assert matrix.min_costs.tolist() == [1, 2]
+    assert matrix.cost(0, 3, 3) == 5
+    assert matrix.total_cost({0: [1, 2], 1: [20]}) == 1 + 8
+
+
+def test_tariff_table():
+    table = ShippingTariffTable.load()
+    germany = Location.GERMANY
+
+    domestic = table.tariff(germany, germany)
+    international = table.tariff(Location.FRANCE, germany)
+    unknown = table.tariff(None, germany)
+
+    assert len(domestic.tier_prices) == len(table.tiers)
+    assert domestic.tier_prices[0] < international.tier_prices[0]
+    assert unknown == table.tariff(Location.ICELAND, germany)
+
+
+def test_find_best_offers_with_shipping_tiers():
+    wanted_cards = ["c1", "c2", "c3"]
+    sellers = {
+        "s1": {
+            "c1": [1],
+            "c2": [1],
+            "c3": [1],
+        },
+        "s2": {
+            "c3": [2],
+        },
+    }
+    # buying a third card from s1 requires a parcel, which is not considered while
+    # searching, but is part of the total price
+    shipping_costs = ShippingCosts(
+        tiers, {"s1": ShippingTariff((3, 10))}, ShippingTariff((3, 3))
+    )
+
+    for solver in [WizardSolver.DYNAMIC_PROGRAMMING, WizardSolver.BRANCH_AND_BOUND]:
+        result = shopping_wizard_service.find_best_offers(
+            wanted_cards, sellers, shipping_costs, solver=solver
+        )
+
+        assert result == WizardResult(
+            total_price=1 + 1 + 1 + 10,
+            sellers={
+                "s1": [("c1", 1), ("c2", 1), ("c3", 1)],
+            },
+        )
+
+    # local search moves the third card to s2 to stay within the cheaper tier
+    result = shopping_wizard_service.find_best_offers(
+        wanted_cards, sellers, shipping_costs, solver=WizardSolver.MULTI_START
+    )
+
+    assert result == WizardResult(
+        total_price=1 + 1 + 3 + 2 + 3,
+        sellers={
+            "s1": [("c1", 1), ("c2", 1)],
+            "s2": [("c3", 2)],
+        },
+    )
@@ -1,5 +1,6 @@
 from cm_wizard.services.shopping_wizard_service import (
     WizardResult,
+    WizardSolver,
     shopping_wizard_service,
 )
 
@@ -65,6 +66,35 @@ def test_find_best_offers_with_duplicate_wants():
     )
 
 
+def test_find_best_offers_with_quantities():
+    wanted_cards = ["c1", "c2", "c2", "c2"]
+    sellers = {
+        "s1": {
+            "c1": [1],
+            "c2": [2, 2],
+        },
+        "s2": {
+            "c2": [1],
+        },
+        "s3": {
+            "c2": [1, 1],
+        },
+    }
+
+    result = shopping_wizard_service.find_best_offers(
+        wanted_cards, sellers, shipping_cost=10
+    )
+
+    # the third copy is bought from s1, whose shipping is paid for c1 anyway
+    assert result == WizardResult(
+        total_price=25,
+        sellers={
+            "s1": [("c1", 1), ("c2", 2)],
+            "s3": [("c2", 1), ("c2", 1)],
+        },
+    )
+
+
 def test_find_best_offers_with_missing_offers():
     wanted_cards = ["c1", "c2", "c3", "c4"]
     sellers = {
@@ -111,3 +141,94 @@ def test_find_best_offers_with_constant_shipping_costs():
             "s2": [("c1", 2), ("c2", 1), ("c3", 1)],
         },
     )
+
+
+def test_find_best_offers_with_branch_and_bound():
+    wanted_cards = ["c1", "c2", "c3"]
+    sellers = {
+        "s1": {
+            "c1": [8],
+            "c2": [8],
+        },
+        "s2": {
+            "c1": [7],
+            "c3": [8],
+        },
+    }
+
+    result = shopping_wizard_service.find_best_offers(
+        wanted_cards,
+        sellers,
+        shipping_cost=10,
+        solver=WizardSolver.BRANCH_AND_BOUND,
+    )
+
+    assert result == WizardResult(
+        total_price=43,
+        sellers={
+            "s1": [("c2", 8)],
+            "s2": [("c1", 7), ("c3", 8)],
+        },
+    )
+
+
+def test_find_best_offers_with_multi_start():
+    wanted_cards = ["c1", "c2", "c3"]
+    sellers = {
+        "s1": {
+            "c1": [8],
+            "c2": [8],
+        },
+        "s2": {
+            "c1": [7],
+            "c3": [8],
+        },
+    }
+
+    result = shopping_wizard_service.find_best_offers(
+        wanted_cards,
+        sellers,
+        shipping_cost=10,
+        solver=WizardSolver.MULTI_START,
+    )
+
+    assert result == WizardResult(
+        total_price=43,
+        sellers={
+            "s1": [("c2", 8)],
+            "s2": [("c1", 7), ("c3", 8)],
+        },
+    )
+
+
+def test_find_best_offers_anytime():
+    wanted_cards = ["c1", "c2", "c3"]
+    sellers = {
+        "s1": {
+            "c1": [1],
+            "c2": [2],
+            "c3": [3],
+        },
+        "s2": {
+            "c1": [2],
+            "c2": [1],
+            "c3": [1],
+        },
+    }
+
+    results = list(
+        shopping_wizard_service.find_best_offers_anytime(
+            wanted_cards,
+            sellers,
+            shipping_cost=2,
+        )
+    )
+
+    # the cheapest offers first, then the dynamic programming result
+    assert [result.total_price for result in results] == [7, 6]
+    assert results[-1] == WizardResult(
+        total_price=6,
+        sellers={
+            "s2": [("c1", 2), ("c2", 1), ("c3", 1)],
+        },
+    )
@@ -0,0 +1,105 @@
+import os
+
+from cm_wizard.services.cardmarket.card_query import CardQuery
+from cm_wizard.services.cardmarket.enums.card_condition import CardCondition
+from cm_wizard.services.cardmarket.enums.card_language import CardLanguage
+from cm_wizard.services.cardmarket.offer_records import (
+    CardOffer,
+    CardOfferSeller,
+    SellerOffer,
+)
+from cm_wizard.services.solvers.wizard_result import WizardResult
+from cm_wizard.services.wizard_checkpoint import WizardCheckpoint, WizardRunStore
+
+query = CardQuery(
+    id="Dark-Magician",
+    expansions=["LOB"],
+    languages=[CardLanguage.ENGLISH, CardLanguage.GERMAN],
+    min_condition=CardCondition.EXCELLENT,
+    is_reverse_holo=None,
+    is_signed=False,
+    is_first_edition=True,
+    is_altered=None,
+)
+card_offers = [
+    CardOffer(price_euro_cents=10, quantity=2, seller=CardOfferSeller(id="s1"))
+]
+seller_offers = [
+    SellerOffer(
+        card_id="Dark-Magician-V-1",
+        price_euro_cents=10,
+        quantity=2,
+        condition=CardCondition.NEAR_MINT,
+        language=CardLanguage.ENGLISH,
+    )
+]
+
+
+def test_load(tmp_path):
+    checkpoint = WizardRunStore(str(tmp_path)).create("1")
+    checkpoint.add_card_offers(query, card_offers)
+    checkpoint.add_seller_ids({"s1"})
+    checkpoint.add_seller_offers("s1", seller_offers)
+    result = WizardResult(
+        total_price=210, sellers={"s1": [("Dark-Magician", 10)]}, missing_cards=[]
+    )
+    checkpoint.add_result(result)
+    checkpoint.close()
+
+    state = WizardCheckpoint.load(checkpoint.path)
+
+    assert state.wants_list_id == "1"
+    assert state.card_queries == {"Dark-Magician": query}
+    assert state.cards_offers == {"Dark-Magician": card_offers}
+    assert state.seller_ids == {"s1"}
+    assert state.sellers_offers == {"s1": seller_offers}
+    assert state.result == result
+    assert state.is_finished
+
+
+def test_load_ignores_cut_off_record(tmp_path):
+    checkpoint = WizardRunStore(str(tmp_path)).create("1")
+    checkpoint.add_seller_offers("s1", seller_offers)
+    checkpoint.close()
+    with open(checkpoint.path, "a") as f:
+        f.write('{"type":"seller_offers","seller_id":"s2","off')
+
+    checkpoint = WizardCheckpoint(checkpoint.path)
+    checkpoint.add_seller_offers("s3", seller_offers)
+    checkpoint.close()
+    state = WizardCheckpoint.load(checkpoint.path)
+
+    assert state.sellers_offers.keys() == {"s1", "s3"}
+    assert not state.is_finished
+
+
+def test_create_removes_old_runs(tmp_path):
+    run_store = WizardRunStore(str(tmp_path), max_runs_per_wants_list=2)
+    run_ids = []
+    for _ in range(3):
+        checkpoint = run_store.create("1")
+        checkpoint.close()
+        run_ids.append(checkpoint.run_id)
+    run_store.create("2").close()
+
+    assert run_store.run_ids("1") == run_ids[1:]
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_find_unfinished_run_id(tmp_path):
+    run_store = WizardRunStore(str(tmp_path))
+    finished_checkpoint = run_store.create("1")
+    finished_checkpoint.add_result(WizardResult(total_price=0, sellers={}))
+    finished_checkpoint.close()
+
+    assert run_store.find_unfinished_run_id("1", max_age_seconds=60) is None
+
+    unfinished_checkpoint = run_store.create("1")
+    unfinished_checkpoint.close()
+
+    assert (
+        run_store.find_unfinished_run_id("1", max_age_seconds=60)
+        == unfinished_checkpoint.run_id
+    )
+    assert run_store.find_unfinished_run_id("1", max_age_seconds=-1) is None
+    assert run_store.find_unfinished_run_id("2", max_age_seconds=60) is None
@@ -1,6 +1,33 @@
+import asyncio
+import os
+import tempfile
+import time
+from dataclasses import dataclass, replace
+from typing import Sequence
+
+import pytest
+
+import cm_wizard.services.wizard_orchestrator_service as wizard_orchestrator_service_module
+from cm_wizard.services.cardmarket.async_cardmarket_service import (
+    AsyncCardmarketService,
+)
+from cm_wizard.services.cardmarket.card_query import CardQuery
+from cm_wizard.services.cardmarket.cardmarket_service import CardmarketService
+from cm_wizard.services.cardmarket.enums.card_condition import CardCondition
+from cm_wizard.services.cardmarket.enums.card_language import CardLanguage
+from cm_wizard.services.shopping_wizard_service import (
+    WizardSolver,
+    shopping_wizard_service,
+)
+from cm_wizard.services.wizard_checkpoint import WizardRunStore
 from cm_wizard.services.wizard_orchestrator_service import (
     CardOffer,
     CardOfferSeller,
+    SellerOffer,
+    WizardOrchestratorResult,
+    WizardOrchestratorService,
+    WizardOrchestratorStage,
+    _InterimResults,
     wizard_orchestrator_service,
 )
 
@@ -35,7 +62,7 @@ def test__convert_to_sellers_offers():
 
     result = wizard_orchestrator_service._convert_to_sellers_offers(cards_offers)
 
-    assert result == {
+    assert result.to_sellers_offers() == {
         "seller 1": {
             "card 1": [1, 2],
             "card 2": [3, 3],
@@ -44,3 +71,340 @@ def test__convert_to_sellers_offers():
             "card 1": [2, 2, 2],
         },
     }
+
+
+def test__gather_with_progress():
+    progress: list[float] = []
+
+    async def delayed(value: int, delay: float) -> int:
+        await asyncio.sleep(delay)
+        return value
+
+    result = asyncio.run(
+        wizard_orchestrator_service._gather_with_progress(
+            [delayed(1, 0.02), delayed(2, 0), delayed(3, 0.01)],
+            WizardOrchestratorStage.GET_CARDS_SELLERS,
+            lambda value, _: progress.append(value),
+        )
+    )
+
+    assert result == [1, 2, 3]
+    assert progress == pytest.approx([0, 1 / 3, 2 / 3, 1])
+
+
+@dataclass(frozen=True)
+class WantsItem(CardQuery):
+    amount: int = 1
+    name: str = ""
+    image_url: str | None = None
+
+
+@dataclass
+class WantsList:
+    items: list[WantsItem]
+
+
+class FakeCardmarketService(CardmarketService):
+    """
+    Offers every wanted card by seller 1 for 1 cent and by seller 2 for 2 cents.
+    """
+
+    def __init__(self, wants_items: list[WantsItem]):
+        self.wants_items = wants_items
+        self.requested_card_ids: list[str] = []
+        self.requested_seller_ids: list[str] = []
+        self.failing_seller_id: str | None = None
+
+    def get_wants_list(self, id: str) -> WantsList:  # type: ignore[override]
+        return WantsList(self.wants_items)
+
+    def get_card_offers(
+        self, query: CardQuery, max_offers: int | None = None
+    ) -> list[CardOffer]:
+        self.requested_card_ids.append(query.id)
+        return [
+            CardOffer(price_euro_cents=1, quantity=1, seller=CardOfferSeller("s1")),
+            CardOffer(price_euro_cents=2, quantity=1, seller=CardOfferSeller("s2")),
+        ]
+
+    def get_seller_offers(
+        self,
+        seller_id: str,
+        wants_list_id: str,
+        wanted_queries: Sequence[CardQuery] | None = None,
+    ) -> list[SellerOffer]:
+        if seller_id == self.failing_seller_id:
+            raise ConnectionError()
+        self.requested_seller_ids.append(seller_id)
+        return [
+            SellerOffer(
+                card_id=item.id,
+                price_euro_cents=int(seller_id[1:]),
+                quantity=1,
+                condition=CardCondition.NEAR_MINT,
+                language=CardLanguage.ENGLISH,
+            )
+            for item in self.wants_items
+        ]
+
+
+def wants_item(
+    id: str, min_condition=CardCondition.NEAR_MINT, amount: int = 1
+) -> WantsItem:
+    return WantsItem(
+        id=id,
+        amount=amount,
+        expansions=None,
+        languages=None,
+        min_condition=min_condition,
+        is_reverse_holo=None,
+        is_signed=None,
+        is_first_edition=None,
+        is_altered=None,
+    )
+
+
+def test_run_incremental():
+    cardmarket_service = FakeCardmarketService(
+        [wants_item("c1"), wants_item("c2"), wants_item("c3")]
+    )
+    service = WizardOrchestratorService(
+        cardmarket_service,
+        shopping_wizard_service,
+        AsyncCardmarketService(cardmarket_service),
+    )
+    service.run("1", on_progress=lambda progress, stage: None)
+    cardmarket_service.wants_items = [
+        wants_item("c1"),
+        wants_item("c2", min_condition=CardCondition.EXCELLENT),
+    ]
+    cardmarket_service.requested_card_ids = []
+    cardmarket_service.requested_seller_ids = []
+
+    result = service.run("1", on_progress=lambda progress, stage: None)
+
+    assert cardmarket_service.requested_card_ids == ["c2"]
+    # seller 2 is pruned, because it is more expensive for every card
+    assert cardmarket_service.requested_seller_ids == ["s1"]
+    assert result.total_price_euro_cents == 2 + 200
+    assert sorted(offer.card_id for offer in result.sellers[0].offers) == ["c1", "c2"]
+
+
+def test_run_incremental_reuses_unchanged_wants_list():
+    cardmarket_service = FakeCardmarketService([wants_item("c1"), wants_item("c2")])
+    service = WizardOrchestratorService(
+        cardmarket_service,
+        shopping_wizard_service,
+        AsyncCardmarketService(cardmarket_service),
+    )
+    first_result = service.run("1", on_progress=lambda progress, stage: None)
+    cardmarket_service.requested_card_ids = []
+    cardmarket_service.requested_seller_ids = []
+
+    result = service.run("1", on_progress=lambda progress, stage: None)
+
+    assert cardmarket_service.requested_card_ids == []
+    assert cardmarket_service.requested_seller_ids == []
+    assert result == first_result
+
+
+def test_resume():
+    cardmarket_service = FakeCardmarketService([wants_item("c1"), wants_item("c2")])
+    cardmarket_service.failing_seller_id = "s1"
+    service = WizardOrchestratorService(
+        cardmarket_service,
+        shopping_wizard_service,
+        AsyncCardmarketService(cardmarket_service),
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        service.run_store = WizardRunStore(directory)
+        with pytest.raises(ConnectionError):
+            service.run("1", on_progress=lambda progress, stage: None)
+        run_id = service.find_unfinished_run_id("1")
+        assert run_id is not None
+        cardmarket_service.failing_seller_id = None
+        cardmarket_service.requested_card_ids = []
+
+        result = service.resume(run_id, on_progress=lambda progress, stage: None)
+
+        assert service.find_unfinished_run_id("1") is None
+    assert cardmarket_service.requested_card_ids == []
+    assert cardmarket_service.requested_seller_ids == ["s1"]
+    assert result.total_price_euro_cents == 2 + 200
+
+
+def test_run_with_amounts():
+    cardmarket_service = FakeCardmarketService(
+        [wants_item("c1", amount=2), wants_item("c2")]
+    )
+    service = WizardOrchestratorService(
+        cardmarket_service,
+        shopping_wizard_service,
+        AsyncCardmarketService(cardmarket_service),
+    )
+
+    result = service.run("1", on_progress=lambda progress, stage: None)
+
+    # each seller offers a single copy of c1
+    assert result.missing_cards == []
+    assert result.total_price_euro_cents == 1 + 1 + 2 + 2 * 200
+    assert sorted(
+        offer.card_id for seller in result.sellers for offer in seller.offers
+    ) == ["c1", "c1", "c2"]
+
+
+def test_run_report():
+    cardmarket_service = FakeCardmarketService([wants_item("c1"), wants_item("c2")])
+    service = WizardOrchestratorService(
+        cardmarket_service,
+        shopping_wizard_service,
+        AsyncCardmarketService(cardmarket_service),
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        service.metrics_export_path = os.path.join(directory, "metrics.prom")
+
+        service.run("1", on_progress=lambda progress, stage: None)
+
+        with open(service.metrics_export_path) as f:
+            assert "cm_wizard_stage_seconds_count" in f.read()
+    assert service.report is not None
+    for stage in WizardOrchestratorStage:
+        assert service.report.timer("stage", stage=stage.name).count == 1
+    assert service.report.timer("solve", solver="BRANCH_AND_BOUND").count == 1
+    assert service.report.timer("match").count == 1
+    assert service.report.timer("local_search").count == 1
+    assert service.report.counter("pruned_sellers") == 1
+
+
+class PartialCardPagesFakeCardmarketService(FakeCardmarketService):
+    """
+    Offers every wanted card by sellers 1 and 2 for 1 cent,
+    but card pages list only one seller's offer of each card.
+    """
+
+    def get_card_offers(
+        self, query: CardQuery, max_offers: int | None = None
+    ) -> list[CardOffer]:
+        self.requested_card_ids.append(query.id)
+        seller_id = "s1" if query.id == "c1" else "s2"
+        return [
+            CardOffer(price_euro_cents=1, quantity=1, seller=CardOfferSeller(seller_id))
+        ]
+
+    def get_seller_offers(
+        self,
+        seller_id: str,
+        wants_list_id: str,
+        wanted_queries: Sequence[CardQuery] | None = None,
+    ) -> list[SellerOffer]:
+        return [
+            replace(offer, price_euro_cents=1)
+            for offer in super().get_seller_offers(
+                seller_id, wants_list_id, wanted_queries
+            )
+        ]
+
+
+def test_run_with_request_budget(monkeypatch):
+    monkeypatch.setattr(wizard_orchestrator_service_module, "max_seller_requests", 1)
+    monkeypatch.setattr(
+        wizard_orchestrator_service_module, "interim_result_interval_seconds", 0
+    )
+    cardmarket_service = PartialCardPagesFakeCardmarketService(
+        [wants_item("c1"), wants_item("c2")]
+    )
+    service = WizardOrchestratorService(
+        cardmarket_service,
+        shopping_wizard_service,
+        AsyncCardmarketService(cardmarket_service),
+    )
+    interim_results: list[WizardOrchestratorResult] = []
+
+    result = service.run(
+        "1",
+        on_progress=lambda progress, stage: None,
+        on_result=interim_results.append,
+    )
+
+    assert cardmarket_service.requested_seller_ids == ["s1"]
+    assert [
+        interim_result.total_price_euro_cents for interim_result in interim_results
+    ] == [2 + 2 * 200, 2 + 200]
+    assert result.total_price_euro_cents == 2 + 200
+
+
+def test_run_with_multi_start_solver(monkeypatch):
+    monkeypatch.setattr(
+        wizard_orchestrator_service_module,
+        "wizard_solver",
+        WizardSolver.MULTI_START,
+    )
+    cardmarket_service = FakeCardmarketService([wants_item("c1"), wants_item("c2")])
+    service = WizardOrchestratorService(
+        cardmarket_service,
+        shopping_wizard_service,
+        AsyncCardmarketService(cardmarket_service),
+    )
+
+    result = service.run("1", on_progress=lambda progress, stage: None)
+
+    assert result.total_price_euro_cents == 2 + 200
+    assert service.report is not None
+    assert service.report.timer("solve", solver="MULTI_START").count == 1
+
+
+def test_interim_results_update_async_does_not_block_requests():
+    results = []
+
+    def solve(sellers_offers):
+        time.sleep(0.2)
+        return shopping_wizard_service.find_best_offers(["c1"], {"s1": {"c1": [1]}})
+
+    interim_results = _InterimResults(solve, results.append)
+    request_times: list[float] = []
+
+    async def request():
+        for _ in range(3):
+            request_times.append(time.monotonic())
+            # skipped while the first solve is running
+            await interim_results.update_async({}, force=True)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(interim_results.update_async({}, force=True), request())
+        return start
+
+    start = asyncio.run(run())
+
+    assert len(results) == 1
+    assert request_times[-1] - start < 0.2
+
+
+def test_run_with_dynamic_programming_solver_and_interim_results(monkeypatch):
+    monkeypatch.setattr(
+        wizard_orchestrator_service_module,
+        "wizard_solver",
+        WizardSolver.DYNAMIC_PROGRAMMING,
+    )
+    monkeypatch.setattr(
+        shopping_wizard_service,
+        "find_best_offers_anytime",
+        lambda *args, **kwargs: pytest.fail("Searched by branch and bound."),
+    )
+    cardmarket_service = FakeCardmarketService([wants_item("c1"), wants_item("c2")])
+    service = WizardOrchestratorService(
+        cardmarket_service,
+        shopping_wizard_service,
+        AsyncCardmarketService(cardmarket_service),
+    )
+    interim_results: list[WizardOrchestratorResult] = []
+
+    result = service.run(
+        "1",
+        on_progress=lambda progress, stage: None,
+        on_result=interim_results.append,
+    )
+
+    assert result.total_price_euro_cents == 2 + 200
+    assert interim_results[-1] == result
@@ -0,0 +1,93 @@
+from cm_wizard.services.cardmarket.card_query import CardQuery
+from cm_wizard.services.cardmarket.enums.card_condition import CardCondition
+from cm_wizard.services.cardmarket.enums.card_language import CardLanguage
+from cm_wizard.services.cardmarket.offer_records import (
+    CardOffer,
+    CardOfferSeller,
+    SellerOffer,
+)
+from cm_wizard.services.solvers.wizard_result import WizardResult
+from cm_wizard.services.wizard_snapshot import WantsListDiff, WizardSnapshot
+
+
+def card_query(id: str, languages: list[CardLanguage] | None = None) -> CardQuery:
+    return CardQuery(
+        id=id,
+        expansions=None,
+        languages=languages,
+        min_condition=CardCondition.NEAR_MINT,
+        is_reverse_holo=None,
+        is_signed=None,
+        is_first_edition=None,
+        is_altered=None,
+    )
+
+
+def card_offer(seller_id: str) -> CardOffer:
+    return CardOffer(
+        price_euro_cents=1, quantity=1, seller=CardOfferSeller(id=seller_id)
+    )
+
+
+def seller_offer(card_id: str) -> SellerOffer:
+    return SellerOffer(
+        card_id=card_id,
+        price_euro_cents=1,
+        quantity=1,
+        condition=CardCondition.NEAR_MINT,
+        language=CardLanguage.ENGLISH,
+    )
+
+
+snapshot = WizardSnapshot(
+    card_queries={
+        "c1": card_query("c1"),
+        "c2": card_query("c2"),
+        "c3": card_query("c3"),
+    },
+    cards_offers={
+        "c1": [card_offer("s1")],
+        "c2": [card_offer("s2")],
+        "c3": [card_offer("s1")],
+    },
+    sellers_offers={
+        "s1": [seller_offer("c1"), seller_offer("c3")],
+        "s2": [seller_offer("c1"), seller_offer("c2")],
+    },
+    result=WizardResult(total_price=0, sellers={}),
+)
+
+
+def test_diff():
+    diff = snapshot.diff(
+        [
+            card_query("c1"),
+            card_query("c2", languages=[CardLanguage.ENGLISH]),
+            card_query("c4"),
+        ]
+    )
+
+    assert diff == WantsListDiff(
+        changed_card_ids={"c2", "c4"},
+        removed_card_ids={"c3"},
+    )
+
+
+def test_reusable_cards_offers():
+    diff = WantsListDiff(changed_card_ids={"c2"}, removed_card_ids={"c3"})
+
+    assert snapshot.reusable_cards_offers(diff) == {"c1": [card_offer("s1")]}
+
+
+def test_reusable_sellers_offers():
+    diff = WantsListDiff(changed_card_ids={"c4"}, removed_card_ids={"c3"})
+    cards_offers = {
+        "c1": [card_offer("s1")],
+        "c2": [card_offer("s2")],
+        "c4": [card_offer("s2"), card_offer("s3")],
+    }
+
+    result = snapshot.reusable_sellers_offers(diff, {"s1", "s2", "s3"}, cards_offers)
+
+    # s2 offers the added card and s3 was not queried before
+    assert result == {"s1": [seller_offer("c1")]}